@@ -0,0 +1,230 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+This script benchmarks ProcedureConverter_xlsx2pluto.py, SE_structureConverter_xlsx2seXml.py and
+MATIS_MIB_MISC_dyn2dat_converter.py on synthetic data generated by SyntheticExcelTree_generator.py.
+Each converter is run in its own process at several scales, wall-clock time and peak memory (RSS) are recorded and
+compared against a stored baseline.
+Usage:
+python Benchmark_converters.py --save-baseline      (record the baseline of the current machine and converter version)
+python Benchmark_converters.py                      (compare against the baseline, exit code 1 on a regression)
+Output:
+A table with time and peak memory per converter and scale. With --output the results are also written as json.
+
+INFO: Baselines are machine specific. Record a new one after changing the machine or the benchmark scales.
+'''
+
+import argparse
+import json
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import SyntheticExcelTree_generator as generator
+
+
+def get_peak_memory_in_kB():
+    '''
+    Returns the peak resident set size of the current process in kB or None if it cannot be determined.
+    :return peak_memory_in_kB:
+    '''
+    try:
+        import resource
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            peak_memory = peak_memory // 1024
+        return peak_memory
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset // 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def run_measured_child(result_file, script, script_arguments):
+    '''
+    Runs a converter script as __main__ inside of this process and writes its peak memory into the result file.
+    Used by run_converter() through the --measure-child option.
+    :param result_file, script, script_arguments:
+    :return :
+    '''
+    sys.argv = [script] + script_arguments
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    try:
+        runpy.run_path(script, run_name='__main__')
+    finally:
+        fo = open(result_file, 'w')
+        json.dump({'peak_memory_kB': get_peak_memory_in_kB()}, fo)
+        fo.close()
+    return
+
+
+def run_converter(script, script_arguments, workspace):
+    '''
+    Runs one converter in a new process with the workspace as working directory.
+    :param script, script_arguments, workspace:
+    :return seconds, peak_memory_kB:
+    '''
+    result_file = os.path.join(workspace, 'benchmark_result.json')
+    command = [sys.executable, os.path.abspath(__file__), '--measure-child', result_file, os.path.join(_SCRIPT_DIRECTORY, script)] + script_arguments
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=workspace, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    seconds = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError('{SCRIPT} failed:\n{ERROR}'.format(SCRIPT=script, ERROR=completed.stderr))
+    fi = open(result_file, 'r')
+    peak_memory_kB = json.load(fi)['peak_memory_kB']
+    fi.close()
+    return seconds, peak_memory_kB
+
+
+def prepare_workspace(workspace, scale):
+    '''
+    Generates the synthetic Excel tree and .dyn file for one scale.
+    :param workspace, scale:
+    :return :
+    '''
+    generator.generate_excel_tree(workspace, scale['workbooks'], scale['rows'], scale['folders'], seed=_SEED)
+    os.makedirs(os.path.join(workspace, 'MISC'), exist_ok=True)
+    generator.generate_dyn_file(os.path.join(workspace, 'MISC', 'MISCcontext.dyn'), scale['dyn_lines'], seed=_SEED)
+    return
+
+
+def reset_output_folder(workspace):
+    '''
+    Recreates generated_MATIS_Files with the folder structure of the Excel folder, since the SE converter expects it.
+    :param workspace:
+    :return :
+    '''
+    output_folder = os.path.join(workspace, 'generated_MATIS_Files')
+    shutil.rmtree(output_folder, ignore_errors=True)
+    for subdir, dirs, files in os.walk(os.path.join(workspace, 'Excel')):
+        os.makedirs(os.path.join(output_folder, os.path.relpath(subdir, os.path.join(workspace, 'Excel'))), exist_ok=True)
+    return
+
+
+def benchmark_scale(scale_name, repetitions):
+    '''
+    Benchmarks all converters at one scale. The best time and the highest peak memory of all repetitions are kept.
+    :param scale_name, repetitions:
+    :return results:
+    '''
+    scale = _SCALES[scale_name]
+    workspace = tempfile.mkdtemp(prefix='matis_benchmark_' + scale_name + '_')
+    results = {}
+    try:
+        prepare_workspace(workspace, scale)
+        for converter_name, script, script_arguments in _CONVERTERS:
+            best_seconds, highest_peak_memory_kB = None, None
+            for repetition in range(repetitions):
+                reset_output_folder(workspace)
+                if converter_name == 'se_xml':
+                    # se.xml files are written next to the generated PLUTO files
+                    run_converter('ProcedureConverter_xlsx2pluto.py', [], workspace)
+                seconds, peak_memory_kB = run_converter(script, script_arguments, workspace)
+                if best_seconds is None or seconds < best_seconds:
+                    best_seconds = seconds
+                if peak_memory_kB is not None and (highest_peak_memory_kB is None or peak_memory_kB > highest_peak_memory_kB):
+                    highest_peak_memory_kB = peak_memory_kB
+            results[converter_name] = {'seconds': round(best_seconds, 4), 'peak_memory_kB': highest_peak_memory_kB}
+            print('{SCALE:<8} {CONVERTER:<8} {SECONDS:>10.3f} s {MEMORY:>10} kB'.format(SCALE=scale_name, CONVERTER=converter_name, SECONDS=best_seconds, MEMORY=str(highest_peak_memory_kB)))
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+    return results
+
+
+def compare_with_baseline(results, baseline, time_tolerance, memory_tolerance):
+    '''
+    Compares the results with the baseline and returns a list of human readable regressions.
+    :param results, baseline, time_tolerance, memory_tolerance:
+    :return regressions:
+    '''
+    regressions = []
+    for scale_name in results:
+        for converter_name in results[scale_name]:
+            try:
+                reference = baseline['results'][scale_name][converter_name]
+            except KeyError:
+                print('WARNING: no baseline for {SCALE}/{CONVERTER}'.format(SCALE=scale_name, CONVERTER=converter_name))
+                continue
+            current = results[scale_name][converter_name]
+            if current['seconds'] > reference['seconds'] * (1 + time_tolerance) and current['seconds'] - reference['seconds'] > _MINIMUM_TIME_DIFFERENCE:
+                regressions.append('{SCALE}/{CONVERTER}: time {CURRENT:.3f} s > baseline {REFERENCE:.3f} s (+{PERCENT:.0f}%)'.format(
+                    SCALE=scale_name, CONVERTER=converter_name, CURRENT=current['seconds'], REFERENCE=reference['seconds'],
+                    PERCENT=100 * (current['seconds'] / reference['seconds'] - 1)))
+            if current['peak_memory_kB'] and reference['peak_memory_kB'] and current['peak_memory_kB'] > reference['peak_memory_kB'] * (1 + memory_tolerance):
+                regressions.append('{SCALE}/{CONVERTER}: peak memory {CURRENT} kB > baseline {REFERENCE} kB (+{PERCENT:.0f}%)'.format(
+                    SCALE=scale_name, CONVERTER=converter_name, CURRENT=current['peak_memory_kB'], REFERENCE=reference['peak_memory_kB'],
+                    PERCENT=100 * (current['peak_memory_kB'] / reference['peak_memory_kB'] - 1)))
+    return regressions
+
+
+##############################
+# Definitions of global variables
+_SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+_BASELINE_FILE = os.path.join(_SCRIPT_DIRECTORY, 'benchmark_baseline.json')
+_SEED = 2019
+# slowdowns below this number of seconds are regarded as noise of the process start-up
+_MINIMUM_TIME_DIFFERENCE = 0.1
+# scales of the synthetic data: number of workbooks, rows per Procedure sheet, subsystem folders, lines per .dyn file
+_SCALES = {'small': {'workbooks': 5, 'rows': 100, 'folders': 2, 'dyn_lines': 2000},
+           'medium': {'workbooks': 25, 'rows': 400, 'folders': 5, 'dyn_lines': 20000},
+           'large': {'workbooks': 100, 'rows': 1500, 'folders': 10, 'dyn_lines': 200000}}
+# (name, script, arguments) of the benchmarked converters, the arguments are relative to the workspace
+_CONVERTERS = [('pluto', 'ProcedureConverter_xlsx2pluto.py', []),
+               ('se_xml', 'SE_structureConverter_xlsx2seXml.py', []),
+               ('dyn2dat', 'MATIS_MIB_MISC_dyn2dat_converter.py', ['-i', os.path.join('MISC', 'MISCcontext.dyn'), '-o', os.path.join('MISC', 'MISCconfig.dat')])]
+##############################
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure-child':
+        run_measured_child(sys.argv[2], sys.argv[3], sys.argv[4:])
+        sys.exit(0)
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--scales', nargs='+', default=['small', 'medium'], choices=sorted(_SCALES), help='scales to benchmark')
+    ap.add_argument('--repetitions', type=int, default=3, help='runs per converter and scale, the fastest run is kept')
+    ap.add_argument('--baseline', default=_BASELINE_FILE, help='path to the baseline file')
+    ap.add_argument('--save-baseline', action='store_true', help='store the results as new baseline instead of comparing')
+    ap.add_argument('--time-tolerance', type=float, default=0.25, help='allowed relative slowdown before failing (0.25 = 25%%)')
+    ap.add_argument('--memory-tolerance', type=float, default=0.25, help='allowed relative peak memory growth before failing')
+    ap.add_argument('--output', help='write the results as json into this file')
+    args = vars(ap.parse_args())
+
+    print('{SCALE:<8} {CONVERTER:<8} {SECONDS:>12} {MEMORY:>13}'.format(SCALE='scale', CONVERTER='converter', SECONDS='time', MEMORY='peak memory'))
+    results = {}
+    for scale_name in args['scales']:
+        results[scale_name] = benchmark_scale(scale_name, args['repetitions'])
+    if args['output']:
+        fo = open(args['output'], 'w')
+        json.dump({'scales': _SCALES, 'results': results}, fo, indent=2, sort_keys=True)
+        fo.close()
+    if args['save_baseline']:
+        fo = open(args['baseline'], 'w')
+        json.dump({'scales': _SCALES, 'python': sys.version.split()[0], 'results': results}, fo, indent=2, sort_keys=True)
+        fo.close()
+        print('Baseline saved to ' + args['baseline'])
+        sys.exit(0)
+    if not os.path.exists(args['baseline']):
+        print('No baseline found at {BASELINE}, run with --save-baseline first.'.format(BASELINE=args['baseline']))
+        sys.exit(2)
+    fi = open(args['baseline'], 'r')
+    baseline = json.load(fi)
+    fi.close()
+    if baseline.get('scales') != _SCALES:
+        print('WARNING: the baseline was recorded with different scales, the comparison might be meaningless.')
+    regressions = compare_with_baseline(results, baseline, args['time_tolerance'], args['memory_tolerance'])
+    if regressions:
+        print('\n!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
+        print('PERFORMANCE REGRESSION(S) DETECTED:')
+        for regression in regressions:
+            print('  ' + regression)
+        print('!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!')
+        sys.exit(1)
+    print('No regression compared to the baseline.')
@@ -0,0 +1,455 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+This script builds the complete MATIS artefact set of a workspace with one command, instead of running
+ProcedureConverter_xlsx2pluto.py, SE_structureConverter_xlsx2seXml.py and MATIS_MIB_MISC_dyn2dat_converter.py by hand:
+    .pluto per Excel procedure, .se.xml per folder of Excel procedures and .dat per .dyn file of the MISC folder.
+The build is a task graph:
+    discovery -> extract (per workbook) -> pluto (per workbook)
+                                        -> se_xml (per folder, needs all workbooks of the folder)
+              -> dat (per .dyn file)
+Independent tasks run in parallel worker processes. A task is up to date if its outputs exist and neither its inputs
+(modification time and size) nor the converter it uses changed since the last build; only the tasks that are not up to
+date and the extract tasks they need are run. Outputs of workbooks and folders that do not exist anymore are removed.
+At the end the critical path (the chain of dependent tasks that determined the build time) is printed.
+Usage:
+python Build_MATIS.py                           (build the "Excel" and "MISC" folders of the current workspace)
+python Build_MATIS.py -j 4 --force              (rebuild everything with 4 worker processes)
+python Build_MATIS.py --check                   (build and check the structure of all PLUTO files)
+python Build_MATIS.py --output_archive MATIS.zip (build everything into one zip archive, see Output_archive.py)
+Output:
+The MATIS files inside of the output folder (default: generated_MATIS_Files) and its build state .build_state.json .
+With --output_archive all tasks are run and their files are written into the archive instead, in the order of the
+tasks (workbooks, folders and .dyn files sorted by path) as soon as all tasks before them are done. The output folder
+is not touched and no build state is kept.
+'''
+
+import argparse
+import collections
+import concurrent.futures
+import copy
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+
+import Conversion_cache as conversion_cache
+import MATIS_MIB_MISC_dyn2dat_converter as dyn2dat_converter
+import PLUTO_structure_checker as structure_checker
+import Output_archive as output_archive
+import Procedure_readers as procedure_readers
+import ProcedureConverter_xlsx2pluto as procedure_converter
+import SE_structureConverter_xlsx2seXml as se_converter
+
+
+# one node of the task graph; the results of the dependencies are appended to the arguments of the function
+Task = collections.namedtuple('Task', ['name', 'function', 'arguments', 'dependencies', 'inputs', 'outputs', 'converter'])
+
+
+def get_file_signature(paths):
+    '''
+    Returns a hash over path, modification time and size of the files.
+    :param paths:
+    :return signature:
+    '''
+    sha1 = hashlib.sha1()
+    for path in paths:
+        stat = procedure_readers.stat_workbook(path)
+        sha1.update('{PATH}\0{MTIME}\0{SIZE}\0'.format(PATH=path, MTIME=stat.st_mtime_ns, SIZE=stat.st_size).encode('utf-8'))
+    return sha1.hexdigest()
+
+
+def get_converter_version(module):
+    '''
+    Returns a hash of the source files of a converter module, so changing a converter or one of the modules it uses
+    (e.g. MATIS_type_registry.py) rebuilds its outputs.
+    :param module:
+    :return converter_version:
+    '''
+    if hasattr(module, 'get_converter_source_file_paths'):
+        source_file_paths = module.get_converter_source_file_paths()
+    else:
+        source_file_paths = [os.path.abspath(module.__file__)]
+    return conversion_cache.get_source_version(source_file_paths)
+
+
+def get_dat_file_name(dyn_file):
+    '''
+    Returns the name of the .dat file of a .dyn file: MISCcontext.dyn -> MISCconfig.dat
+    :param dyn_file:
+    :return dat_file_name:
+    '''
+    return os.path.splitext(os.path.basename(dyn_file))[0].replace('context', 'config') + '.dat'
+
+
+def discover_tasks(procedure_ctx, se_ctx, misc_folder, sort=False):
+    '''
+    Discovers the Excel procedures and .dyn files and creates the task graph.
+    :param procedure_ctx, se_ctx, misc_folder:
+    :param sort: the tasks of the workbooks and folders are sorted by path (the .dyn files always are)
+    :return tasks: OrderedDict name -> Task, dependencies before the tasks depending on them
+    '''
+    tasks = collections.OrderedDict()
+    folders = collections.OrderedDict()
+    list_of_excelsheet_paths = procedure_converter.get_list_of_excelsheet_paths(procedure_ctx.excel_folder)
+    if sort:
+        list_of_excelsheet_paths.sort()
+    for file in list_of_excelsheet_paths:
+        input_file_path = os.path.join(procedure_ctx.excel_folder, file)
+        tasks['extract:' + file] = Task('extract:' + file, extract_workbook, (input_file_path, file), [], [input_file_path], [], None)
+        output_file_path = procedure_converter.get_output_file_path(procedure_ctx, file)
+        outputs = [output_file_path, procedure_converter.get_line_map_file_path(output_file_path)] if procedure_ctx.output_profile == 'lean' else [output_file_path]
+        tasks['pluto:' + file] = Task('pluto:' + file, write_pluto_file, (input_file_path, output_file_path), ['extract:' + file], [input_file_path], outputs, procedure_converter)
+        folders.setdefault(os.path.dirname(file), []).append(file)
+    for folder in folders:
+        input_file_paths = [os.path.join(procedure_ctx.excel_folder, file) for file in folders[folder]]
+        output_file_path = se_converter.get_se_xml_file_path(se_ctx, folder)
+        tasks['se_xml:' + folder] = Task('se_xml:' + folder, write_se_xml_file, (output_file_path,),
+                                         ['extract:' + file for file in folders[folder]], input_file_paths, [output_file_path], se_converter)
+    if os.path.isdir(misc_folder):
+        for file in sorted(os.listdir(misc_folder)):
+            if file.endswith('.dyn'):
+                input_file_path = os.path.join(misc_folder, file)
+                output_file_path = os.path.join(procedure_ctx.output_folder, os.path.basename(os.path.normpath(misc_folder)), get_dat_file_name(file))
+                tasks['dat:' + file] = Task('dat:' + file, write_dat_file, (input_file_path, output_file_path), [], [input_file_path], [output_file_path], dyn2dat_converter)
+    return tasks
+
+
+def get_tasks_to_run(tasks, build_state, force=False):
+    '''
+    Selects the tasks that are not up to date and the extract tasks they need.
+    :param tasks, build_state, force:
+    :return tasks_to_run: set of names
+    :return signatures: name -> signature of the tasks producing outputs
+    '''
+    converter_versions = {}
+    tasks_to_run, signatures = set(), {}
+    for task in tasks.values():
+        if task.converter is None:
+            continue
+        if task.converter not in converter_versions:
+            converter_versions[task.converter] = get_converter_version(task.converter)
+        signatures[task.name] = get_file_signature(task.inputs) + converter_versions[task.converter]
+        if force or build_state.get(task.name, {}).get('signature') != signatures[task.name] or build_state[task.name]['outputs'] != task.outputs or not all(os.path.exists(output) for output in task.outputs):
+            tasks_to_run.add(task.name)
+            tasks_to_run.update(task.dependencies)
+    return tasks_to_run, signatures
+
+
+def remove_stale_outputs(tasks, build_state):
+    '''
+    Removes the outputs of tasks of the last build that do not exist anymore (deleted workbooks, folders or .dyn files)
+    and outputs a task does not have anymore (e.g. the line maps after switching back to the verbose output profile).
+    :param tasks, build_state:
+    :return removed_outputs:
+    '''
+    removed_outputs = []
+    for name in list(build_state):
+        if name in tasks:
+            stale_outputs = [output for output in build_state[name]['outputs'] if output not in tasks[name].outputs]
+        else:
+            stale_outputs = build_state.pop(name)['outputs']
+        for output in stale_outputs:
+            if os.path.exists(output):
+                os.remove(output)
+                removed_outputs.append(output)
+    return removed_outputs
+
+
+def run_tasks(tasks, tasks_to_run, executor, archive=None):
+    '''
+    Runs the tasks as soon as their dependencies are done, as many at once as the executor has workers.
+    Tasks depending on a failed task are not run.
+    :param tasks, tasks_to_run, executor:
+    :param archive: Output_archive.OutputArchive the files of the tasks are written into, in the order of the tasks:
+                    the files of a task are kept until all tasks before it are done
+    :return timings: name -> (start, end) in seconds since the start of the build
+    :return results: name -> result of the task function
+    :return errors: name -> error message of the failed and skipped tasks
+    '''
+    start = time.perf_counter()
+    timings, results, errors, running = {}, {}, {}, {}
+    waiting = [name for name in tasks if name in tasks_to_run]
+    unwritten, files_of_tasks = list(waiting), {}
+    while waiting or running:
+        while archive is not None and unwritten and (unwritten[0] in results or unwritten[0] in errors):
+            for output_file_path, content in files_of_tasks.pop(unwritten.pop(0), []):
+                archive.write_file(output_file_path, content)
+        for name in list(waiting):
+            task = tasks[name]
+            failed_dependencies = [dependency for dependency in task.dependencies if dependency in errors]
+            if failed_dependencies:
+                waiting.remove(name)
+                errors[name] = 'not run, {DEPENDENCY} failed'.format(DEPENDENCY=failed_dependencies[0])
+            elif all(dependency in results for dependency in task.dependencies):
+                waiting.remove(name)
+                arguments = task.arguments + tuple(results[dependency] for dependency in task.dependencies)
+                running[executor.submit(run_task, task.function, arguments)] = name
+        if not running:
+            continue
+        done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            try:
+                results[name], task_start, task_end, files_of_tasks[name] = future.result()
+                timings[name] = (task_start - start, task_end - start)
+            except Exception as error:
+                errors[name] = '{TYPE}: {ERROR}'.format(TYPE=type(error).__name__, ERROR=error)
+    for name in unwritten:
+        for output_file_path, content in files_of_tasks.pop(name, []):
+            archive.write_file(output_file_path, content)
+    return timings, results, errors
+
+
+def run_task(function, arguments):
+    '''
+    Runs one task inside of a worker process and measures it.
+    :param function, arguments:
+    :return result, start, end:
+    :return files: files written into the OutputBuffer of the worker (output archive builds), else empty
+    '''
+    start = time.perf_counter()
+    procedure_ctx, se_ctx = _BUILD_WORKER_CONTEXTS
+    if procedure_ctx.output_archive is not None:
+        procedure_ctx.output_archive.pop_files()     # files of a failed task before
+    result = function(*arguments)
+    end = time.perf_counter()
+    return result, start, end, procedure_ctx.output_archive.pop_files() if procedure_ctx.output_archive is not None else []
+
+
+def get_critical_path(tasks, timings):
+    '''
+    Returns the chain of dependent tasks ending last: starting with the task that ended last, the dependency that
+    ended last is followed back.
+    :param tasks, timings:
+    :return critical_path: names, first task first
+    '''
+    if not timings:
+        return []
+    name = max(timings, key=lambda name_: timings[name_][1])
+    critical_path = [name]
+    while True:
+        dependencies = [dependency for dependency in tasks[name].dependencies if dependency in timings]
+        if not dependencies:
+            break
+        name = max(dependencies, key=lambda name_: timings[name_][1])
+        critical_path.insert(0, name)
+    return critical_path
+
+
+def print_summary(tasks, timings, wall_time, discovery_time, jobs):
+    '''
+    Prints the number of run tasks and the timing of the critical path.
+    :param tasks, timings, wall_time, discovery_time, jobs:
+    :return :
+    '''
+    busy_time = sum(end - start for start, end in timings.values())
+    print('{RUN} of {TOTAL} task(s) run in {WALL:.2f} s with {JOBS} worker(s), {BUSY:.2f} s of task time, discovery and up-to-date checks {DISCOVERY:.2f} s'.format(
+        RUN=len(timings), TOTAL=len(tasks), WALL=wall_time, JOBS=jobs, BUSY=busy_time, DISCOVERY=discovery_time))
+    critical_path = get_critical_path(tasks, timings)
+    if critical_path:
+        print('critical path:')
+        for name in critical_path:
+            print('  {START:7.2f} s  {DURATION:6.2f} s  {NAME}'.format(START=timings[name][0], DURATION=timings[name][1] - timings[name][0], NAME=name))
+    return
+
+
+# task functions, run inside of the worker processes
+def initialize_build_worker(procedure_ctx, se_ctx):
+    '''
+    Keeps the contexts in the worker process, so the MATIS dictionaries are sent once per worker.
+    :param procedure_ctx, se_ctx:
+    :return :
+    '''
+    global _BUILD_WORKER_CONTEXTS
+    _BUILD_WORKER_CONTEXTS = (procedure_ctx, se_ctx)
+    return
+
+
+def extract_workbook(input_file_path, file):
+    '''
+    Reads an Excel procedure with the streaming reader.
+    :param input_file_path, file:
+    :return wb, model: WorkbookSnapshot and ProcedureModel of the se.xml file (None if it has no parameter block)
+    '''
+    procedure_ctx, se_ctx = _BUILD_WORKER_CONTEXTS
+    wb = procedure_converter.read_workbook_snapshot(procedure_ctx, input_file_path)
+    try:
+        model = se_converter.get_procedure_model_of_worksheet(wb['Procedure'], file, se_ctx)
+    except ValueError:
+        model = None
+    return wb, model
+
+
+def write_pluto_file(input_file_path, output_file_path, extracted_workbook):
+    '''
+    Generates the PLUTO file of an extracted Excel procedure.
+    :param input_file_path, output_file_path, extracted_workbook:
+    :return diagnostics:
+    '''
+    procedure_ctx, se_ctx = _BUILD_WORKER_CONTEXTS
+    pluto_text, line_map, diagnostics = procedure_converter.convert_workbook_with_line_map(extracted_workbook[0], procedure_ctx, input_file_path)
+    return procedure_converter.write_stage(procedure_ctx, (input_file_path, output_file_path, pluto_text, diagnostics, line_map))
+
+
+def write_se_xml_file(output_file_path, *extracted_workbooks):
+    '''
+    Generates the se.xml file of a folder from its extracted Excel procedures.
+    :param output_file_path, extracted_workbooks:
+    :return diagnostics:
+    '''
+    diagnostics = []
+    for wb, model in extracted_workbooks:
+        if model is None:
+            diagnostics.append(procedure_converter.Diagnostic(output_file_path, 'Procedure', None, 'error', 'NO_PARAMETERS_ROW', 'a procedure of the folder has no "Parameters:" row'))
+    if diagnostics:
+        return diagnostics
+    procedure_ctx, se_ctx = _BUILD_WORKER_CONTEXTS
+    output_archive.write_output_file(se_ctx.output_archive, output_file_path, se_converter.build_se_xml([model for wb, model in extracted_workbooks]).decode('utf-8'))
+    return diagnostics
+
+
+def write_dat_file(input_file_path, output_file_path):
+    '''
+    Converts a .dyn file into a .dat file.
+    :param input_file_path, output_file_path:
+    :return diagnostics:
+    '''
+    procedure_ctx, se_ctx = _BUILD_WORKER_CONTEXTS
+    fi = open(input_file_path, 'r')
+    fo = io.StringIO()
+    dyn2dat_converter.convert_dyn_to_dat(fi, fo)
+    fi.close()
+    output_archive.write_output_file(procedure_ctx.output_archive, output_file_path, fo.getvalue())
+    return []
+
+
+def check_archive(archive_path):
+    '''
+    Checks the structure of all PLUTO files of an output archive.
+    :param archive_path:
+    :return findings: the files are named <archive path>/<entry name>
+    '''
+    findings = []
+    archive = zipfile.ZipFile(archive_path)
+    for entry_name in archive.namelist():
+        if entry_name.endswith('.pluto'):
+            findings.extend(structure_checker.check_text(archive_path + '/' + entry_name, archive.read(entry_name).decode('utf-8')))
+    archive.close()
+    return findings
+
+
+def read_build_state(state_file):
+    '''
+    Reads the build state of the last build.
+    :param state_file:
+    :return build_state: name -> {"signature": ..., "outputs": [...]}
+    '''
+    if not os.path.exists(state_file):
+        return {}
+    fi = open(state_file, 'r')
+    build_state = json.load(fi)
+    fi.close()
+    return build_state
+
+
+def write_build_state(state_file, build_state):
+    '''
+    Writes the build state.
+    :param state_file, build_state:
+    :return :
+    '''
+    os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+    fo = open(state_file, 'w')
+    json.dump(build_state, fo, indent=1, sort_keys=True)
+    fo.close()
+    return
+
+
+def build(procedure_ctx, se_ctx, misc_folder, jobs=None, force=False, check=False, archive_path=None):
+    '''
+    Brings the MATIS files of the output folder up to date.
+    :param procedure_ctx, se_ctx, misc_folder, jobs, force:
+    :param check: check the structure of all PLUTO files of the output folder afterwards (PLUTO_structure_checker.py)
+    :param archive_path: build everything into this zip archive (see Output_archive.py) instead of the output folder
+    :return diagnostics, exit_code:
+    '''
+    start = time.perf_counter()
+    state_file = os.path.join(procedure_ctx.output_folder, _BUILD_STATE_FILE)
+    build_state = read_build_state(state_file) if archive_path is None else {}
+    tasks = discover_tasks(procedure_ctx, se_ctx, misc_folder, sort=archive_path is not None)
+    for output in remove_stale_outputs(tasks, build_state):
+        print('removed: ' + output)
+    tasks_to_run, signatures = get_tasks_to_run(tasks, build_state, force or archive_path is not None)
+    discovery_time = time.perf_counter() - start
+    jobs = jobs or os.cpu_count() or 1
+    worker_contexts = (procedure_ctx, se_ctx)
+    archive = None
+    if archive_path is not None:
+        archive = output_archive.OutputArchive(archive_path, procedure_ctx.output_folder)
+        worker_contexts = (copy.copy(procedure_ctx), copy.copy(se_ctx))
+        worker_contexts[0].output_archive = worker_contexts[1].output_archive = output_archive.OutputBuffer()
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=initialize_build_worker, initargs=worker_contexts)
+    try:
+        timings, results, errors = run_tasks(tasks, tasks_to_run, executor, archive)
+    except BaseException:
+        if archive is not None:
+            archive.discard()
+        raise
+    finally:
+        executor.shutdown()
+    if archive is not None:
+        archive.close()
+    diagnostics = []
+    for name in tasks:
+        if name in errors:
+            build_state.pop(name, None)
+            diagnostics.append(procedure_converter.Diagnostic(tasks[name].inputs[0] if tasks[name].inputs else name, None, None, 'error', 'TASK_FAILED', name + ': ' + errors[name]))
+    for name in tasks:
+        if name not in results or name not in signatures:
+            continue
+        diagnostics.extend(results[name])
+        if not any(diagnostic.severity == 'error' for diagnostic in results[name]):
+            build_state[name] = {'signature': signatures[name], 'outputs': tasks[name].outputs}
+        else:
+            build_state.pop(name, None)
+    if archive is None:
+        write_build_state(state_file, build_state)
+    if check and archive is not None:
+        for finding in check_archive(archive_path):
+            diagnostics.append(procedure_converter.Diagnostic(finding.file, None, finding.line, finding.severity, finding.code, finding.message))
+    elif check:
+        pluto_files = [output for name in sorted(tasks) for output in tasks[name].outputs if output.endswith('.pluto') and os.path.isfile(output)]
+        for finding in structure_checker.check_files(pluto_files, jobs=jobs):
+            diagnostics.append(procedure_converter.Diagnostic(finding.file, None, finding.line, finding.severity, finding.code, finding.message))
+    print_summary(tasks, timings, time.perf_counter() - start, discovery_time, jobs)
+    return diagnostics, 1 if any(diagnostic.severity == 'error' for diagnostic in diagnostics) else 0
+
+
+##############################
+# Definitions of global variables
+_BUILD_STATE_FILE = '.build_state.json'
+_BUILD_WORKER_CONTEXTS = None
+##############################
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Builds all MATIS files of the workspace, only what changed since the last build.')
+    ap.add_argument('-i', '--excel_folder', default='Excel', help='folder containing the Excel procedures')
+    ap.add_argument('-m', '--misc_folder', default='MISC', help='folder containing the .dyn files')
+    ap.add_argument('-o', '--output_folder', default='generated_MATIS_Files', help='folder for the generated MATIS files')
+    ap.add_argument('-j', '--jobs', type=int, help='number of worker processes (default: all processors)')
+    ap.add_argument('-f', '--force', action='store_true', help='run all tasks, also the ones that are up to date')
+    ap.add_argument('--profile', choices=['verbose', 'lean'], default='verbose', help='output profile of the PLUTO files (see ProcedureConverter_xlsx2pluto.py)')
+    ap.add_argument('--check', action='store_true', help='check the structure of all generated PLUTO files (PLUTO_structure_checker.py)')
+    ap.add_argument('--output_archive', metavar='ZIP', help='build everything into this zip archive with a manifest of the hashes instead of the output folder')
+    args = vars(ap.parse_args())
+    procedure_ctx = procedure_converter.ConversionContext(excel_folder=args['excel_folder'], output_folder=args['output_folder'], output_profile=args['profile'])
+    se_ctx = se_converter.SEConversionContext(excel_folder=args['excel_folder'], output_folder=args['output_folder'])
+    diagnostics, exit_code = build(procedure_ctx, se_ctx, args['misc_folder'], args['jobs'], args['force'], args['check'], args['output_archive'])
+    for diagnostic in diagnostics:
+        print(procedure_converter.format_diagnostic(diagnostic))
+    sys.exit(exit_code)
@@ -0,0 +1,313 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+This script maintains a local SQLite full-text index of the cells of the Excel procedures, so procedures with certain
+patterns or characteristics (e.g. "@$" in the RAW column) can be found before bulk-editing them, without editing the
+converter and converting the whole tree.
+For every non-empty cell of the Front Page and Procedure work sheets the index stores workbook, sheet, row, column and
+text, plus an inverted token table (text -> tokens). In addition, every operation of the identifier matrix is stored with
+its kind (e.g. CHECKTM range check, SELECT CASE) for statistics.
+The index is updated incrementally, only workbooks whose modification time or size changed are read again (with the
+streaming reader of ProcedureConverter_xlsx2pluto.py).
+Usage:
+python CellText_index.py update                             (update the index of the "Excel" folder)
+python CellText_index.py search "@$"                        (cells containing the substring, case-insensitive)
+python CellText_index.py search --token CAM8711             (cells containing the token, "CAM87*" for a prefix; "VAL" also
+                                                             finds "@$VAL")
+python CellText_index.py search --files "@$"                (only the workbooks)
+python CellText_index.py stats                              (number of operations per kind, e.g. CHECKTM range)
+python CellText_index.py stats CHECKTM range                (only this operation and kind)
+python CellText_index.py stats CHECKTM --files              (workbooks using the operation)
+Output:
+The index file (default: cells.sqlite inside the current workspace) and the query results, one per line.
+'''
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import Procedure_readers as procedure_readers
+import ProcedureConverter_xlsx2pluto as procedure_converter
+
+
+def open_index(database_path):
+    '''
+    Opens the index and creates its tables if needed. An index written by an older version of this script (other
+    tokens) is emptied, so the next update reads all workbooks again.
+    :param database_path:
+    :return connection:
+    '''
+    connection = sqlite3.connect(database_path)
+    connection.executescript(_SCHEMA)
+    if connection.execute('PRAGMA user_version').fetchone()[0] != _INDEX_VERSION:
+        for table in ['workbooks', 'texts', 'tokens', 'cells', 'operations']:
+            connection.execute('DELETE FROM {TABLE}'.format(TABLE=table))
+        connection.execute('PRAGMA user_version = {VERSION}'.format(VERSION=_INDEX_VERSION))
+        connection.commit()
+    return connection
+
+
+def get_tokens(text):
+    '''
+    Splits a cell text into the upper case tokens of the inverted index: "CHECK TM $VAL_1" -> CHECK, TM, $VAL_1, VAL_1
+    (variables are also indexed without their @ and $ prefix).
+    :param text:
+    :return tokens: set
+    '''
+    tokens = set()
+    for token in _TOKEN_PATTERN.findall(text):
+        tokens.add(token.upper())
+        tokens.add(token.lstrip('@$').upper())
+    return tokens
+
+
+def get_CHECKTM_kind(current_RAW_cell_value, current_ENG_cell_value):
+    '''
+    Returns the kind of a CHECK TM row with the same case distinction write_CHECKTM() uses.
+    :param current_RAW_cell_value, current_ENG_cell_value:
+    :return kind: assignment, range, enumeration, comparison, variable or value
+    '''
+    value_cell = str(current_ENG_cell_value) if str(current_ENG_cell_value) != 'None' else str(current_RAW_cell_value)
+    if '@' in value_cell:
+        return 'assignment'
+    elif '[' in value_cell:
+        return 'range'
+    elif '{' in value_cell:
+        return 'enumeration'
+    elif any(x in value_cell for x in ['>', '>=', '<', '<=']):
+        return 'comparison'
+    elif value_cell.replace(' ', '').startswith('$'):
+        return 'variable'
+    return 'value'
+
+
+def extract_operations(ctx, ws_procedure):
+    '''
+    Classifies the rows of the identifier matrix the way generate_code() dispatches them. Rows inside a CALL PROCEDURE
+    block are counted as part of the call.
+    :param ctx, ws_procedure:
+    :return operations: list of (row, operation, kind)
+    '''
+    operations = []
+    flag_in_CALL_PROCEDURE = 0
+    for matrix_row_number, matrix_indicator1, matrix_indicator_operator in procedure_converter.create_identifier_matrix(ctx, ws_procedure)[1:]:
+        operator = str(matrix_indicator_operator).replace(' ', '')
+        _, current_OPERATIONS_cell_value, _, _, _, current_RAW_cell_value, current_ENG_cell_value, _ = procedure_converter.get_current_row_cells(ctx, ws_procedure, matrix_row_number)
+        if matrix_indicator1 == 'NEW_OPERATION_STEP':
+            operations.append((matrix_row_number, 'OPERATION STEP', ''))
+        elif str(current_OPERATIONS_cell_value).replace(' ', '').startswith('CALLPROCEDURE'):
+            operations.append((matrix_row_number, 'CALL PROCEDURE', ''))
+            flag_in_CALL_PROCEDURE = 1
+        elif flag_in_CALL_PROCEDURE == 1:
+            if operator.startswith('THENRETURN'):
+                flag_in_CALL_PROCEDURE = 0
+        elif operator.startswith('CHECKTM'):
+            operations.append((matrix_row_number, 'CHECKTM', get_CHECKTM_kind(current_RAW_cell_value, current_ENG_cell_value)))
+        else:
+            for prefix, operation in _OPERATION_NAMES:
+                if operator.startswith(prefix):
+                    operations.append((matrix_row_number, operation, ''))
+                    break
+            else:
+                operations.append((matrix_row_number, 'UNKNOWN', ''))
+    return operations
+
+
+def extract_cells(ctx, wb):
+    '''
+    Extracts the texts of all non-empty cells and the operations of one workbook. The workbook is closed afterwards.
+    :param ctx, wb: WorkbookSnapshot
+    :return cells, operations: cells are (sheet, row, column, text)
+    '''
+    cells = []
+    try:
+        for sheet_name in ['Front Page', 'Procedure']:
+            for coordinate, cell in wb[sheet_name].cells.items():
+                if cell.value is None or str(cell.value).strip() == '':
+                    continue
+                column, row = re.match(r'([A-Z]+)(\d+)$', coordinate).groups()
+                cells.append((sheet_name, int(row), column, str(cell.value)))
+        operations = extract_operations(ctx, wb['Procedure'])
+    finally:
+        wb.close()
+    return cells, operations
+
+
+def get_text_id(connection, text):
+    '''
+    Returns the id of a text and adds the text with its tokens to the index, if it is new.
+    :param connection, text:
+    :return text_id:
+    '''
+    row = connection.execute('SELECT id FROM texts WHERE text = ?', (text,)).fetchone()
+    if row is not None:
+        return row[0]
+    text_id = connection.execute('INSERT INTO texts (text) VALUES (?)', (text,)).lastrowid
+    connection.executemany('INSERT INTO tokens VALUES (?, ?)', [(token, text_id) for token in get_tokens(text)])
+    return text_id
+
+
+def update_index(connection, ctx, verbose=False):
+    '''
+    Brings the index up to date with the Excel folder. Workbooks with unchanged modification time and size are skipped.
+    :param connection, ctx, verbose:
+    :return changed_workbooks:
+    '''
+    known_workbooks = dict((row[0], (row[1], row[2])) for row in connection.execute('SELECT workbook, mtime_ns, size FROM workbooks'))
+    current_workbooks = procedure_converter.get_list_of_excelsheet_paths(ctx.excel_folder)
+    changed_workbooks = []
+    for workbook in set(known_workbooks) - set(current_workbooks):
+        delete_workbook(connection, workbook)
+        changed_workbooks.append(workbook)
+    for workbook in current_workbooks:
+        stat = procedure_readers.stat_workbook(os.path.join(ctx.excel_folder, workbook))
+        if known_workbooks.get(workbook) == (stat.st_mtime_ns, stat.st_size):
+            continue
+        if verbose:
+            print('indexing: ' + workbook)
+        cells, operations = extract_cells(ctx, procedure_converter.read_workbook_snapshot(ctx, os.path.join(ctx.excel_folder, workbook)))
+        delete_workbook(connection, workbook)
+        connection.execute('INSERT INTO workbooks VALUES (?, ?, ?)', (workbook, stat.st_mtime_ns, stat.st_size))
+        connection.executemany('INSERT INTO cells VALUES (?, ?, ?, ?, ?)', [(workbook, sheet, row, column, get_text_id(connection, text)) for sheet, row, column, text in cells])
+        connection.executemany('INSERT INTO operations VALUES (?, ?, ?, ?)', [(workbook, row, operation, kind) for row, operation, kind in operations])
+        changed_workbooks.append(workbook)
+    if changed_workbooks:
+        # texts of changed cells that are not used anywhere anymore
+        connection.execute('DELETE FROM tokens WHERE text_id NOT IN (SELECT text_id FROM cells)')
+        connection.execute('DELETE FROM texts WHERE id NOT IN (SELECT text_id FROM cells)')
+    connection.commit()
+    return changed_workbooks
+
+
+def delete_workbook(connection, workbook):
+    '''
+    Removes all entries of a workbook from the index.
+    :param connection, workbook:
+    :return :
+    '''
+    for table in ['workbooks', 'cells', 'operations']:
+        connection.execute('DELETE FROM {TABLE} WHERE workbook = ?'.format(TABLE=table), (workbook,))
+    return
+
+
+def search(connection, pattern, token=False):
+    '''
+    Searches the cell texts. Substrings are matched case-insensitive against the distinct texts, tokens are looked up in
+    the inverted index ("CAM87*" matches all tokens starting with CAM87).
+    :param connection, pattern, token:
+    :return rows: list of (workbook, sheet, row, column, text)
+    '''
+    if token:
+        pattern = pattern.upper()
+        if pattern.endswith('*'):
+            condition, value = 'k.token >= ? AND k.token < ?', (pattern[:-1], pattern[:-1] + '\uffff')
+        else:
+            condition, value = 'k.token = ?', (pattern,)
+        return connection.execute('SELECT c.workbook, c.sheet, c.row, c.column, t.text FROM tokens k JOIN texts t ON t.id = k.text_id JOIN cells c ON c.text_id = k.text_id '
+                                  'WHERE ' + condition + ' ORDER BY c.workbook, c.sheet, c.row, c.column', value).fetchall()
+    escaped_pattern = pattern.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return connection.execute('SELECT c.workbook, c.sheet, c.row, c.column, t.text FROM texts t JOIN cells c ON c.text_id = t.id '
+                              'WHERE t.text LIKE ? ESCAPE \'\\\' ORDER BY c.workbook, c.sheet, c.row, c.column', ('%' + escaped_pattern + '%',)).fetchall()
+
+
+def get_statistics(connection, operation=None, kind=None):
+    '''
+    Counts the operations per kind over the whole tree.
+    :param connection, operation: only this operation (e.g. CHECKTM), all if None
+    :param kind: only this kind of the operation (e.g. range), all if None
+    :return rows: list of (operation, kind, number of operations, number of workbooks)
+    '''
+    if operation and kind:
+        condition, value = 'WHERE operation = ? AND kind = ?', (operation.upper(), kind)
+    elif operation:
+        condition, value = 'WHERE operation = ?', (operation.upper(),)
+    else:
+        condition, value = '', ()
+    return connection.execute('SELECT operation, kind, COUNT(*), COUNT(DISTINCT workbook) FROM operations ' + condition +
+                              ' GROUP BY operation, kind ORDER BY operation, kind', value).fetchall()
+
+
+def get_workbooks_with_operation(connection, operation, kind=None):
+    '''
+    Returns the workbooks using an operation (of a kind) and how often.
+    :param connection, operation, kind:
+    :return rows: list of (workbook, number of operations)
+    '''
+    condition, value = ('AND kind = ?', (operation.upper(), kind)) if kind else ('', (operation.upper(),))
+    return connection.execute('SELECT workbook, COUNT(*) FROM operations WHERE operation = ? ' + condition +
+                              ' GROUP BY workbook ORDER BY workbook', value).fetchall()
+
+
+##############################
+# Definitions of global variables
+_DATABASE_FILE = 'cells.sqlite'
+# changed whenever the content of the index changes (e.g. the tokens), older indexes are read again
+_INDEX_VERSION = 2
+_TOKEN_PATTERN = re.compile(r'[@$]*[A-Za-z0-9_.]+')
+# operator prefixes of the identifier matrix (without spaces) in the order generate_code() checks them
+_OPERATION_NAMES = [('SENDTIMETAG_', 'SEND TIMETAG_'), ('SENDTIMETAG', 'SEND TIMETAG'), ('SENDANDCHECKTCV_', 'SEND AND CHECK TCV_'),
+                    ('SENDANDCHECKTCV', 'SEND AND CHECK TCV'), ('SEND_', 'SEND_'), ('SEND', 'SEND'), ('DECLAREVARIABLES', 'DECLARE VARIABLES'),
+                    ('SELECTCASE', 'SELECT CASE'), ('CASE:', 'CASE'), ('$', 'ASSIGNMENT'), ('CASEELSE:', 'CASE ELSE'), ('ENDCASE', 'END CASE'),
+                    ('IF', 'IF'), ('THEN', 'THEN'), ('ELSEIF', 'ELSE IF'), ('ELSE', 'ELSE'), ('ENDIF', 'END IF'),
+                    ('EXECUTEINTERMINALONMCSMACHINE', 'EXECUTE IN TERMINAL ON MCS MACHINE'), ('CALLENGINEER', 'CALL ENGINEER'), ('WAIT', 'WAIT')]
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS workbooks (workbook TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS texts (id INTEGER PRIMARY KEY, text TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS tokens (token TEXT, text_id INTEGER);
+CREATE TABLE IF NOT EXISTS cells (workbook TEXT, sheet TEXT, row INTEGER, column TEXT, text_id INTEGER);
+CREATE TABLE IF NOT EXISTS operations (workbook TEXT, row INTEGER, operation TEXT, kind TEXT);
+CREATE INDEX IF NOT EXISTS tokens_token ON tokens (token);
+CREATE INDEX IF NOT EXISTS tokens_text_id ON tokens (text_id);
+CREATE INDEX IF NOT EXISTS cells_workbook ON cells (workbook);
+CREATE INDEX IF NOT EXISTS cells_text_id ON cells (text_id);
+CREATE INDEX IF NOT EXISTS operations_workbook ON operations (workbook);
+CREATE INDEX IF NOT EXISTS operations_operation ON operations (operation, kind);
+'''
+##############################
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Full-text index of the cells of the Excel procedures.')
+    ap.add_argument('command', choices=['update', 'search', 'stats'])
+    ap.add_argument('query', nargs='*', help='search: <text> | stats: [<operation> [<kind>]]')
+    ap.add_argument('-i', '--excel_folder', default='Excel', help='folder containing the Excel procedures')
+    ap.add_argument('-d', '--database', default=_DATABASE_FILE, help='index file')
+    ap.add_argument('-t', '--token', action='store_true', help='search: match whole tokens instead of substrings')
+    ap.add_argument('-f', '--files', action='store_true', help='search, stats: only print the workbooks')
+    ap.add_argument('-v', '--verbose', action='store_true', help='print every indexed workbook')
+    args = vars(ap.parse_intermixed_args())
+
+    connection = open_index(args['database'])
+    start = time.perf_counter()
+    if args['command'] == 'update':
+        ctx = procedure_converter.ConversionContext(excel_folder=args['excel_folder'])
+        changed_workbooks = update_index(connection, ctx, args['verbose'])
+        print('updated {CHANGED} workbook(s) in {SECONDS:.2f} s'.format(CHANGED=len(changed_workbooks), SECONDS=time.perf_counter() - start))
+    elif args['command'] == 'search':
+        if len(args['query']) != 1:
+            ap.error('search needs exactly one text, e.g. search "@$"')
+        rows = search(connection, args['query'][0], args['token'])
+        if args['files']:
+            for workbook in sorted(set(row[0] for row in rows)):
+                print(os.path.join(args['excel_folder'], workbook))
+        else:
+            for workbook, sheet, row, column, text in rows:
+                print('{WORKBOOK}:{SHEET}:{COLUMN}{ROW}: {TEXT}'.format(WORKBOOK=os.path.join(args['excel_folder'], workbook), SHEET=sheet, COLUMN=column, ROW=row, TEXT=text.replace('\n', ' ')))
+    else:
+        if args['files']:
+            if not 1 <= len(args['query']) <= 2:
+                ap.error('stats --files needs an operation, e.g. stats CHECKTM range --files')
+            for workbook, number in get_workbooks_with_operation(connection, *args['query']):
+                print('{NUMBER}\t{WORKBOOK}'.format(NUMBER=number, WORKBOOK=os.path.join(args['excel_folder'], workbook)))
+        else:
+            if len(args['query']) > 2:
+                ap.error('stats takes at most an operation and a kind, e.g. stats CHECKTM range')
+            print('operation\tkind\toperations\tworkbooks')
+            for row in get_statistics(connection, *args['query']):
+                print('\t'.join(str(value) for value in row))
+    if args['command'] != 'update':
+        print('({SECONDS:.1f} ms)'.format(SECONDS=1000 * (time.perf_counter() - start)), file=sys.stderr)
+    connection.close()
@@ -0,0 +1,240 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+This script runs a long-living local conversion service, so single procedures can be regenerated while editing without
+paying Python start-up, openpyxl import, dictionary construction and a tree walk each time.
+The service keeps one ConversionContext of ProcedureConverter_xlsx2pluto.py and SE_structureConverter_xlsx2seXml.py
+warm and caches the results per workbook (path, modification time and size), so unchanged workbooks are not parsed
+again.
+Usage:
+python ConversionServer.py                          (serve the "Excel" folder of the current workspace)
+python ConversionServer_client.py convert Excel/Routine_nominal/ADC/R-ADC-N210_Activate_cADCS.xlsx
+Protocol:
+HTTP on localhost, JSON in both directions.
+    GET  /status                                    -> cache and request statistics
+    POST /convert   {"workbook": <path>, "write": <bool>}   -> {"pluto": <text>, "diagnostics": [...], "output_file": ...}
+    POST /se_xml    {"folder": <path>, "write": <bool>}     -> {"se_xml": <text>, "procedures": [...], "output_file": ...}
+    POST /shutdown
+Relative paths are relative to the working directory of the service. A workbook or folder can also be inside of an
+archive, e.g. release.zip/Excel/ADC (see Procedure_readers.py). With "write" the result is also written into the output
+folder the same way the command line converters do it (written to a temporary file and renamed).
+
+INFO: The service only listens on 127.0.0.1 and is meant for a single workstation.
+'''
+
+import argparse
+import collections
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+
+import Output_archive as output_archive
+import Procedure_readers as procedure_readers
+import ProcedureConverter_xlsx2pluto as procedure_converter
+import SE_structureConverter_xlsx2seXml as se_converter
+
+
+class ConversionService:
+    '''
+    Converts workbooks with warm contexts and caches the results of unchanged workbooks.
+    Safe to be used from several threads.
+    :param excel_folder, output_folder, cache_size:
+    '''
+    def __init__(self, excel_folder='Excel', output_folder='generated_MATIS_Files', cache_size=256):
+        self.procedure_context = procedure_converter.ConversionContext(excel_folder=excel_folder, output_folder=output_folder)
+        self.se_context = se_converter.SEConversionContext(excel_folder=excel_folder, output_folder=output_folder)
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.statistics = {'requests': 0, 'cache_hits': 0, 'cache_misses': 0, 'started': time.time()}
+
+    def get_cached(self, kind, path, create):
+        '''
+        Returns the cached result of create(path) or creates it, if the workbook has changed since.
+        :param kind, path, create:
+        :return result:
+        '''
+        stat = procedure_readers.stat_workbook(path)
+        key = (kind, os.path.abspath(path))
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is not None and entry[0] == (stat.st_mtime_ns, stat.st_size):
+                self.cache.move_to_end(key)
+                self.statistics['cache_hits'] += 1
+                return entry[1]
+            self.statistics['cache_misses'] += 1
+        result = create(path)
+        with self.lock:
+            self.cache[key] = ((stat.st_mtime_ns, stat.st_size), result)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    def get_relative_path(self, path):
+        '''
+        Returns the path relative to the Excel folder or None if it is outside of it.
+        :param path:
+        :return relative_path:
+        '''
+        relative_path = os.path.relpath(os.path.abspath(path), os.path.abspath(self.procedure_context.excel_folder))
+        if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+            return None
+        return relative_path
+
+    def convert(self, workbook, write=False):
+        '''
+        Converts one workbook into PLUTO code.
+        :param workbook, write:
+        :return response:
+        '''
+        pluto_text, diagnostics = self.get_cached('pluto', workbook, lambda path: procedure_converter.convert_procedure(path, self.procedure_context))
+        response = {'pluto': pluto_text, 'diagnostics': [diagnostic._asdict() for diagnostic in diagnostics], 'output_file': None}
+        if write:
+            relative_path = self.get_relative_path(workbook)
+            if relative_path is None:
+                raise ValueError('{WORKBOOK} is not inside of the Excel folder {EXCEL_FOLDER}'.format(WORKBOOK=workbook, EXCEL_FOLDER=self.procedure_context.excel_folder))
+            output_file_path = procedure_converter.get_output_file_path(self.procedure_context, relative_path)
+            output_archive.write_output_file(None, output_file_path, pluto_text)
+            response['output_file'] = output_file_path
+        return response
+
+    def se_xml(self, folder, write=False):
+        '''
+        Builds the se.xml file of one folder from its procedures sorted by path, chosen like the se.xml converter does
+        it: inside of the Excel folder a folder below an "old" folder has no procedures.
+        :param folder, write:
+        :return response:
+        '''
+        relative_path = self.get_relative_path(folder)
+        if relative_path is None:
+            files = [os.path.join(folder, file) for file in se_converter.get_list_of_excelsheet_paths(folder) if not os.path.dirname(file)]
+        else:
+            relative_path = '' if relative_path == os.curdir else relative_path
+            files = [os.path.join(self.se_context.excel_folder, file) for file in se_converter.get_list_of_excelsheet_paths(self.se_context.excel_folder) if os.path.dirname(file) == relative_path]
+        folder_models = []
+        for file_with_path in sorted(files):
+            folder_models.append(self.get_cached('se_xml', file_with_path, lambda path: se_converter.read_procedure_model(path, path, self.se_context)))
+        se_xml_text = se_converter.build_se_xml(folder_models).decode('utf-8')
+        response = {'se_xml': se_xml_text, 'procedures': [model.name for model in folder_models], 'output_file': None}
+        if write:
+            if relative_path is None:
+                raise ValueError('{FOLDER} is not inside of the Excel folder {EXCEL_FOLDER}'.format(FOLDER=folder, EXCEL_FOLDER=self.se_context.excel_folder))
+            output_file_path = se_converter.get_se_xml_file_path(self.se_context, relative_path)
+            output_archive.write_output_file(None, output_file_path, se_xml_text)
+            response['output_file'] = output_file_path
+        return response
+
+    def status(self):
+        '''
+        Returns statistics about the service.
+        :return response:
+        '''
+        with self.lock:
+            response = dict(self.statistics)
+            response['cached_workbooks'] = len(self.cache)
+        response['uptime_seconds'] = round(time.time() - response.pop('started'), 1)
+        response['excel_folder'] = os.path.abspath(self.procedure_context.excel_folder)
+        response['output_folder'] = os.path.abspath(self.procedure_context.output_folder)
+        return response
+
+
+class ConversionRequestHandler(http.server.BaseHTTPRequestHandler):
+    '''
+    Maps the HTTP requests onto the ConversionService of the server.
+    '''
+    def send_json(self, status, response):
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/status':
+            self.send_json(200, self.server.service.status())
+        else:
+            self.send_json(404, {'error': 'unknown path ' + self.path})
+
+    def do_POST(self):
+        service = self.server.service
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            request = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+        except ValueError as error:
+            self.send_json(400, {'error': 'invalid json: ' + str(error)})
+            return
+        with service.lock:
+            service.statistics['requests'] += 1
+        start = time.perf_counter()
+        try:
+            if self.path == '/convert':
+                response = service.convert(request['workbook'], request.get('write', False))
+            elif self.path == '/se_xml':
+                response = service.se_xml(request['folder'], request.get('write', False))
+            elif self.path == '/shutdown':
+                self.send_json(200, {'shutdown': True})
+                threading.Thread(target=self.server.shutdown).start()
+                return
+            else:
+                self.send_json(404, {'error': 'unknown path ' + self.path})
+                return
+        except KeyError as error:
+            self.send_json(400, {'error': 'missing field ' + str(error)})
+            return
+        except Exception as error:
+            self.send_json(500, {'error': '{TYPE}: {ERROR}'.format(TYPE=type(error).__name__, ERROR=error)})
+            return
+        response['milliseconds'] = round(1000 * (time.perf_counter() - start), 1)
+        self.send_json(200, response)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            http.server.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+def create_server(service, port=None, verbose=False):
+    '''
+    Creates the HTTP server for the service on localhost.
+    :param service, port, verbose:
+    :return server:
+    '''
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', _DEFAULT_PORT if port is None else port), ConversionRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Runs the local conversion service.')
+    ap.add_argument('-i', '--excel_folder', default='Excel', help='folder containing the Excel procedures')
+    ap.add_argument('-o', '--output_folder', default='generated_MATIS_Files', help='output folder used for requests with "write"')
+    ap.add_argument('-p', '--port', type=int, default=_DEFAULT_PORT, help='port on 127.0.0.1')
+    ap.add_argument('--cache_size', type=int, default=_CACHE_SIZE, help='number of cached workbook results')
+    ap.add_argument('-v', '--verbose', action='store_true', help='log every request')
+    args = vars(ap.parse_args(argv))
+    service = ConversionService(args['excel_folder'], args['output_folder'], args['cache_size'])
+    server = create_server(service, args['port'], args['verbose'])
+    print('Conversion service listening on http://127.0.0.1:{PORT}'.format(PORT=server.server_address[1]), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    return 0
+
+
+##############################
+# Definitions of global variables
+_DEFAULT_PORT = 8765
+_CACHE_SIZE = 256
+##############################
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+Command line client for ConversionServer.py. It only uses the standard library, so it starts fast.
+Usage:
+python ConversionServer_client.py convert <workbook.xlsx> [--write] [-o <file.pluto>]
+python ConversionServer_client.py se_xml <folder> [--write] [-o <file.se.xml>]
+python ConversionServer_client.py status
+python ConversionServer_client.py shutdown
+Output:
+The generated text on stdout (or in the -o file) and the diagnostics on stderr. Exit code 1 if the request failed or a
+diagnostic of severity "error" was reported.
+'''
+
+import argparse
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+
+def send_request(port, path, request=None):
+    '''
+    Sends one request to the conversion service and returns the decoded response.
+    :param port, path, request: GET if request is None, else POST with the request as json
+    :return response:
+    '''
+    url = 'http://127.0.0.1:{PORT}{PATH}'.format(PORT=port, PATH=path)
+    data = None if request is None else json.dumps(request).encode('utf-8')
+    http_request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        http_response = urllib.request.urlopen(http_request)
+    except urllib.error.HTTPError as error:
+        http_response = error
+    return json.loads(http_response.read().decode('utf-8'))
+
+
+def print_diagnostics(diagnostics):
+    '''
+    Prints the diagnostics to stderr and returns if one of them is an error.
+    :param diagnostics:
+    :return error_found:
+    '''
+    error_found = False
+    for diagnostic in diagnostics:
+        print('{workbook}:{sheet}:{row}: {severity}: {code}: {message}'.format(**dict(diagnostic, row=diagnostic['row'] if diagnostic['row'] is not None else '')), file=sys.stderr)
+        error_found = error_found or diagnostic['severity'] == 'error'
+    return error_found
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Client of the local conversion service.')
+    ap.add_argument('command', choices=['convert', 'se_xml', 'status', 'shutdown'])
+    ap.add_argument('path', nargs='?', help='workbook (convert) or folder (se_xml)')
+    ap.add_argument('-o', '--output_file_name', help='write the generated text into this file instead of stdout')
+    ap.add_argument('-w', '--write', action='store_true', help='let the service write into its output folder')
+    ap.add_argument('-p', '--port', type=int, default=_DEFAULT_PORT, help='port of the service')
+    args = vars(ap.parse_args(argv))
+    try:
+        if args['command'] == 'status':
+            response = send_request(args['port'], '/status')
+        elif args['command'] == 'shutdown':
+            response = send_request(args['port'], '/shutdown', {})
+        else:
+            if args['path'] is None:
+                ap.error('{COMMAND} needs a path'.format(COMMAND=args['command']))
+            field = 'workbook' if args['command'] == 'convert' else 'folder'
+            response = send_request(args['port'], '/' + args['command'], {field: os.path.abspath(args['path']), 'write': args['write']})
+    except urllib.error.URLError as error:
+        print('Conversion service not reachable on port {PORT}: {ERROR}'.format(PORT=args['port'], ERROR=error.reason), file=sys.stderr)
+        return 1
+    if 'error' in response:
+        print(response['error'], file=sys.stderr)
+        return 1
+    if args['command'] in ['status', 'shutdown']:
+        print(json.dumps(response, indent=2, sort_keys=True))
+        return 0
+    text = response['pluto'] if args['command'] == 'convert' else response['se_xml']
+    if args['output_file_name']:
+        fo = open(args['output_file_name'], 'w')
+        fo.write(text)
+        fo.close()
+    elif not args['write']:
+        sys.stdout.write(text)
+    if response['output_file']:
+        print('written: ' + response['output_file'], file=sys.stderr)
+    print('{MILLISECONDS} ms'.format(MILLISECONDS=response['milliseconds']), file=sys.stderr)
+    return 1 if print_diagnostics(response.get('diagnostics', [])) else 0
+
+
+##############################
+# Definitions of global variables
+_DEFAULT_PORT = 8765
+##############################
+
+if __name__ == '__main__':
+    sys.exit(main())
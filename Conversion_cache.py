@@ -0,0 +1,209 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+Content-addressed cache of conversion results, shared by ProcedureConverter_xlsx2pluto.py (PLUTO code per workbook)
+and SE_structureConverter_xlsx2seXml.py (argument block per workbook).
+The key of a result is a hash over the bytes of the workbook, the source files of the converter and every setting that
+changes the output (layout constants like ID_COLUMN or COLOR_DIVIDING_OPERATION_STEPS, output options, ...). Neither
+paths nor modification times are part of the key, so the cache folder can be on a shared file system and be used by
+several machines and processes at the same time:
+    <cache folder>/<first two characters of the key>/<key>.json
+Entries are written to a temporary file and renamed, so a reader never sees a half written entry. Reading an entry
+updates its modification time; if the cache grows above its size limit, the least recently used entries are deleted.
+Library usage:
+cache = ConversionCache('conversion_cache', max_size_MB=1024)
+key = cache.get_key(workbook_bytes, [converter source files], settings)
+value = cache.load(key)            (None if not cached)
+cache.store(key, value)            (any json serializable value)
+Usage:
+python Conversion_cache.py -c conversion_cache                  (print number and size of the entries)
+python Conversion_cache.py -c conversion_cache --evict 500      (delete least recently used entries down to 500 MB)
+python Conversion_cache.py -c conversion_cache --clear          (delete all entries)
+'''
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+
+class ConversionCache:
+    '''
+    Cache folder of conversion results. Holds only the folder and the size limit, so it can be sent to worker
+    processes together with the conversion contexts.
+    :param cache_folder:
+    :param max_size_MB: size limit of all entries, _MAX_SIZE_MB if None
+    '''
+    def __init__(self, cache_folder, max_size_MB=None):
+        self.cache_folder = cache_folder
+        self.max_size_MB = _MAX_SIZE_MB if max_size_MB is None else max_size_MB
+        self.size = None        # size of all entries as measured by this process plus what it stored since, None: not measured
+        self.stored_bytes = 0   # bytes stored by this process since the size was measured
+
+    def get_key(self, workbook_bytes, source_file_paths, settings):
+        '''
+        Returns the key of the conversion result of a workbook.
+        :param workbook_bytes: content of the workbook
+        :param source_file_paths: source files of the converter, changing one of them invalidates its results
+        :param settings: json serializable settings of the conversion
+        :return key: hex digest
+        '''
+        sha256 = hashlib.sha256()
+        sha256.update(get_source_version(source_file_paths).encode('ascii'))
+        sha256.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+        sha256.update(hashlib.sha256(workbook_bytes).digest())
+        return sha256.hexdigest()
+
+    def get_entry_path(self, key):
+        '''
+        Returns the path of the entry of a key.
+        :param key:
+        :return entry_path:
+        '''
+        return os.path.join(self.cache_folder, key[:2], key + '.json')
+
+    def load(self, key):
+        '''
+        Returns the cached value of a key and marks it as recently used.
+        :param key:
+        :return value: None if the key is not cached (or the entry was evicted meanwhile)
+        '''
+        entry_path = self.get_entry_path(key)
+        try:
+            fi = open(entry_path, 'r', encoding='utf-8')
+            try:
+                entry = json.load(fi)
+            finally:
+                fi.close()
+            os.utime(entry_path)
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        return entry['value']
+
+    def store(self, key, value):
+        '''
+        Stores the value of a key atomically and evicts the least recently used entries, if the cache is larger than
+        the size limit. The size of the cache folder is measured at the first store of a process and again whenever
+        this process stored a tenth of the size limit since (other processes might have stored entries meanwhile).
+        :param key, value: value has to be json serializable
+        :return :
+        '''
+        entry_path = self.get_entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        entry_text = json.dumps({'key': key, 'value': value})
+        fd, temporary_file_path = tempfile.mkstemp(suffix=_TEMPORARY_SUFFIX, dir=os.path.dirname(entry_path))
+        try:
+            fo = os.fdopen(fd, 'w', encoding='utf-8')
+            fo.write(entry_text)
+            fo.close()
+            os.replace(temporary_file_path, entry_path)
+        except BaseException:
+            if os.path.exists(temporary_file_path):
+                os.remove(temporary_file_path)
+            raise
+        self.stored_bytes += len(entry_text)
+        if self.size is None or self.stored_bytes * 10 > self.max_size_MB * 1024 * 1024:
+            self.size = sum(entry[1] for entry in self.get_entries())
+            self.stored_bytes = 0
+        else:
+            self.size += len(entry_text)
+        if self.size > self.max_size_MB * 1024 * 1024:
+            self.evict()
+        return
+
+    def get_entries(self):
+        '''
+        Returns all entries of the cache folder.
+        :return entries: list of (modification time, size, entry path), least recently used first
+        '''
+        entries = []
+        for subdir, dirs, files in os.walk(self.cache_folder):
+            for file in files:
+                if not file.endswith('.json'):
+                    continue
+                entry_path = os.path.join(subdir, file)
+                try:
+                    stat = os.stat(entry_path)
+                except OSError:
+                    continue    # evicted by another process meanwhile
+                entries.append((stat.st_mtime_ns, stat.st_size, entry_path))
+        entries.sort()
+        return entries
+
+    def evict(self, max_size_MB=None):
+        '''
+        Deletes the least recently used entries until the cache is not larger than the size limit.
+        :param max_size_MB: size limit, the one of the cache if None
+        :return number_of_deleted_entries:
+        '''
+        max_size = (self.max_size_MB if max_size_MB is None else max_size_MB) * 1024 * 1024
+        entries = self.get_entries()
+        size = sum(entry[1] for entry in entries)
+        number_of_deleted_entries = 0
+        for mtime, entry_size, entry_path in entries:
+            if size <= max_size:
+                break
+            try:
+                os.remove(entry_path)
+                number_of_deleted_entries += 1
+            except OSError:
+                pass
+            size -= entry_size
+        self.size = size
+        self.stored_bytes = 0
+        return number_of_deleted_entries
+
+
+def get_source_version(source_file_paths):
+    '''
+    Returns a hash over the content of the source files of a converter. It is computed once per process.
+    :param source_file_paths:
+    :return source_version:
+    '''
+    memo_key = tuple(source_file_paths)
+    if memo_key not in _SOURCE_VERSION_MEMO:
+        sha256 = hashlib.sha256()
+        for source_file_path in source_file_paths:
+            fi = open(source_file_path, 'rb')
+            sha256.update(hashlib.sha256(fi.read()).digest())
+            fi.close()
+        _SOURCE_VERSION_MEMO[memo_key] = sha256.hexdigest()
+    return _SOURCE_VERSION_MEMO[memo_key]
+
+
+def get_layout_settings(ctx):
+    '''
+    Returns the layout constants of a conversion context (all upper case attributes, e.g. ID_COLUMN).
+    :param ctx:
+    :return layout: dictionary
+    '''
+    return dict((name, value) for name, value in vars(ctx).items() if name.isupper())
+
+
+##############################
+# Definitions of global variables
+_MAX_SIZE_MB = 1024
+_TEMPORARY_SUFFIX = '.tmp'
+# source file paths -> hash
+_SOURCE_VERSION_MEMO = {}
+##############################
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Shows, evicts or clears a conversion cache folder.')
+    ap.add_argument('-c', '--cache_folder', required=True, help='cache folder of the converters (--cache_folder)')
+    ap.add_argument('--evict', type=float, metavar='MB', help='delete the least recently used entries until the cache is not larger than this')
+    ap.add_argument('--clear', action='store_true', help='delete all entries')
+    args = vars(ap.parse_args())
+    cache = ConversionCache(args['cache_folder'])
+    if args['clear']:
+        print('{NUMBER} entries deleted'.format(NUMBER=cache.evict(0)))
+    elif args['evict'] is not None:
+        print('{NUMBER} entries deleted'.format(NUMBER=cache.evict(args['evict'])))
+    entries = cache.get_entries()
+    print('{NUMBER} entries, {SIZE:.1f} MB'.format(NUMBER=len(entries), SIZE=sum(entry[1] for entry in entries) / 1024 / 1024))
+    sys.exit(0)
@@ -0,0 +1,153 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+Journal of a batch conversion of ProcedureConverter_xlsx2pluto.py (--journal, --resume). After the output files of a
+workbook are written, one json line with the workbook and the SHA-256 hashes of its output files is appended to
+    <output folder>/.conversion_journal.jsonl
+The first line holds the settings key of the conversion (converter version and every setting changing the PLUTO code).
+If a conversion is interrupted (an exception in workbook 400 of 500, Ctrl+C, a killed process), --resume keeps the
+output folder and converts only the workbooks that are not completed: workbooks without journal line and workbooks
+whose output files are missing or changed since. A journal written with other settings is not resumed.
+The output files themselves are written to a temporary file and renamed (see Output_archive.write_output_file()), so
+an interrupted conversion never leaves half written PLUTO files behind.
+Library usage:
+journal = ConversionJournal(get_journal_file_path(output_folder), settings_key, resume=True)
+journal.is_completed(workbook)      (journal line exists and the output files are unchanged)
+journal.open()                      (starts a new journal unless an existing one was resumed)
+journal.record(workbook, output_file_paths)
+journal.close()
+'''
+
+import hashlib
+import json
+import os
+
+
+class ConversionJournal:
+    '''
+    Journal of the completed workbooks of a batch conversion.
+    :param journal_file_path:
+    :param settings_key: text identifying converter version and settings, a journal is only resumed with the same key
+    :param resume: read the completed workbooks of an existing journal, which is continued by open()
+    '''
+    def __init__(self, journal_file_path, settings_key, resume=False):
+        self.journal_file_path = journal_file_path
+        self.settings_key = settings_key
+        self.completed = {}     # workbook -> {output file path: SHA-256 hash}
+        self.resumed = False
+        self.cut_off = False    # the last line of the resumed journal was cut off
+        self.fo = None
+        if resume:
+            self.read()
+
+    def read(self):
+        '''
+        Reads the completed workbooks of the journal file. A missing journal file is not resumed; a journal line cut off
+        by an interruption is ignored.
+        :return :
+        '''
+        if not os.path.exists(self.journal_file_path):
+            return
+        fi = open(self.journal_file_path, 'r', encoding='utf-8')
+        text = fi.read()
+        fi.close()
+        lines = text.splitlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            header = {}
+        if header.get('settings') != self.settings_key:
+            raise ValueError('{FILE} was written by another converter version or with other settings, convert without resuming'.format(FILE=self.journal_file_path))
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self.completed[entry['workbook']] = entry['outputs']
+        self.resumed = True
+        self.cut_off = not text.endswith('\n')
+        return
+
+    def is_completed(self, workbook):
+        '''
+        Returns whether a workbook is completed: it has a journal line and its output files still have the recorded
+        hashes.
+        :param workbook:
+        :return is_completed:
+        '''
+        outputs = self.completed.get(workbook)
+        if outputs is None:
+            return False
+        return all(os.path.isfile(output_file_path) and get_file_hash(output_file_path) == sha256 for output_file_path, sha256 in outputs.items())
+
+    def open(self):
+        '''
+        Opens the journal file for recording: a resumed journal is continued, otherwise a new journal is started.
+        :return :
+        '''
+        os.makedirs(os.path.dirname(self.journal_file_path) or '.', exist_ok=True)
+        if self.resumed:
+            self.fo = open(self.journal_file_path, 'a', encoding='utf-8')
+            if self.cut_off:
+                self.fo.write('\n')
+        else:
+            self.completed = {}
+            self.fo = open(self.journal_file_path, 'w', encoding='utf-8')
+            self.write_line({'settings': self.settings_key})
+        return
+
+    def record(self, workbook, output_file_paths):
+        '''
+        Records a completed workbook with the hashes of its output files, which have to be written completely.
+        :param workbook, output_file_paths:
+        :return :
+        '''
+        outputs = dict((output_file_path, get_file_hash(output_file_path)) for output_file_path in output_file_paths)
+        self.write_line({'workbook': workbook, 'outputs': outputs})
+        self.completed[workbook] = outputs
+        return
+
+    def write_line(self, entry):
+        '''
+        Appends one json line and forces it to the disk, so it survives an interruption right after.
+        :param entry:
+        :return :
+        '''
+        self.fo.write(json.dumps(entry, sort_keys=True) + '\n')
+        self.fo.flush()
+        os.fsync(self.fo.fileno())
+        return
+
+    def close(self):
+        if self.fo is not None:
+            self.fo.close()
+            self.fo = None
+        return
+
+
+def get_journal_file_path(output_folder):
+    '''
+    Returns the path of the journal of a batch conversion into an output folder.
+    :param output_folder:
+    :return journal_file_path:
+    '''
+    return os.path.join(output_folder, _JOURNAL_FILE_NAME)
+
+
+def get_file_hash(file_path):
+    '''
+    Returns the SHA-256 hash of the content of a file.
+    :param file_path:
+    :return sha256: hex digest
+    '''
+    fi = open(file_path, 'rb')
+    sha256 = hashlib.sha256(fi.read()).hexdigest()
+    fi.close()
+    return sha256
+
+
+##############################
+# Definitions of global variables
+_JOURNAL_FILE_NAME = '.conversion_journal.jsonl'
+##############################
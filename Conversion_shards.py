@@ -0,0 +1,213 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+Splits the conversion of an Excel tree over several machines without any coordination (--shard i/n of
+ProcedureConverter_xlsx2pluto.py and SE_structureConverter_xlsx2seXml.py) and merges the manifests of the shards.
+A workbook belongs to shard
+    (SHA-256 of its folder relative to the Excel folder, separated by /) modulo n, plus 1
+so all workbooks of a folder (one System Element, one se.xml file) always land on the same shard, on every machine and
+operating system. Each shard writes the outputs of its workbooks and a manifest
+    <output folder>/.shard_<converter>_<i>_of_<n>.json     (next to the archive with --output_archive)
+with the workbooks of the shard, the fingerprint of the whole tree (number and hash of all workbook paths) and the
+SHA-256 hashes of its output files (paths relative to the output folder).
+The merge command checks, per converter, that the manifests of shards 1..n are all there exactly once, that they were
+made from the same tree, that every workbook of the tree belongs to exactly one shard (no gap, no overlap) and that no
+output file was written by two shards, and writes the merged manifest.
+Usage:
+python ProcedureConverter_xlsx2pluto.py --shard 2/4              (on the second of four machines)
+python Conversion_shards.py -o merged_manifest.json shard1/.shard_pluto_1_of_4.json ... shard4/.shard_se_xml_4_of_4.json
+Output:
+The merged manifest (json, one entry per converter) and the problems found; exit code 1 if there is a problem.
+'''
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+
+def parse_shard(text):
+    '''
+    Parses a shard given as i/n, 1 <= i <= n.
+    :param text:
+    :return shard: (i, n)
+    '''
+    try:
+        index, count = [int(number) for number in text.split('/')]
+    except ValueError:
+        raise ValueError('shard has to be given as i/n, e.g. 2/4: ' + text)
+    if not 1 <= index <= count:
+        raise ValueError('shard {TEXT}: i has to be between 1 and n'.format(TEXT=text))
+    return index, count
+
+
+def get_path_key(path):
+    '''
+    Returns a path relative to the Excel folder in the same form on every operating system.
+    :param path: folder or workbook relative to the Excel folder
+    :return path_key: separated by /, '' for the Excel folder itself
+    '''
+    return '/'.join(part for part in path.replace('\\', '/').split('/') if part not in ('', '.'))
+
+
+def get_shard_of_folder(folder, count):
+    '''
+    Returns the shard of the workbooks of a folder.
+    :param folder: relative to the Excel folder
+    :param count: number of shards
+    :return index: 1..count
+    '''
+    return int(hashlib.sha256(get_path_key(folder).encode('utf-8')).hexdigest(), 16) % count + 1
+
+
+def select_shard(list_of_workbook_paths, shard):
+    '''
+    Returns the workbooks of one shard.
+    :param list_of_workbook_paths: relative to the Excel folder
+    :param shard: (i, n)
+    :return list_of_workbook_paths_of_shard: in the order of list_of_workbook_paths
+    '''
+    index, count = shard
+    return [file for file in list_of_workbook_paths if get_shard_of_folder(os.path.dirname(file), count) == index]
+
+
+def get_tree_fingerprint(list_of_workbook_paths):
+    '''
+    Returns the fingerprint of the complete tree, which all shards of one conversion have in common.
+    :param list_of_workbook_paths: relative to the Excel folder
+    :return fingerprint: {'workbooks': number, 'hash': SHA-256 of the sorted workbook paths}
+    '''
+    workbook_keys = sorted(get_path_key(file) for file in list_of_workbook_paths)
+    return {'workbooks': len(workbook_keys), 'hash': hashlib.sha256('\n'.join(workbook_keys).encode('utf-8')).hexdigest()}
+
+
+def get_shard_manifest_file_path(folder, converter, shard):
+    '''
+    Returns the path of the manifest of a shard.
+    :param folder: output folder, or folder of the output archive
+    :param converter: 'pluto' or 'se_xml'
+    :param shard: (i, n)
+    :return manifest_file_path:
+    '''
+    return os.path.join(folder, _MANIFEST_NAME.format(CONVERTER=converter, INDEX=shard[0], COUNT=shard[1]))
+
+
+def get_output_hashes(output_folder, output_file_paths, archive=None):
+    '''
+    Returns the hashes of the output files of a shard.
+    :param output_folder:
+    :param output_file_paths: outputs of the workbooks of the shard, missing ones (failed workbooks) are left out
+    :param archive: Output_archive.OutputArchive the outputs were written into instead, its entries are taken
+    :return output_hashes: path relative to the output folder (separated by /) -> SHA-256 hash
+    '''
+    if archive is not None:
+        return dict(archive.manifest)
+    output_hashes = {}
+    for output_file_path in output_file_paths:
+        if not os.path.isfile(output_file_path):
+            continue
+        fi = open(output_file_path, 'rb')
+        output_hashes[os.path.relpath(output_file_path, output_folder).replace(os.sep, '/')] = hashlib.sha256(fi.read()).hexdigest()
+        fi.close()
+    return output_hashes
+
+
+def write_shard_manifest(manifest_file_path, converter, shard, list_of_workbook_paths, output_hashes):
+    '''
+    Writes the manifest of a shard.
+    :param manifest_file_path, converter, shard:
+    :param list_of_workbook_paths: all workbooks of the tree, relative to the Excel folder
+    :param output_hashes: see get_output_hashes()
+    :return :
+    '''
+    manifest = {'converter': converter,
+                'shard': shard[0],
+                'shards': shard[1],
+                'tree': get_tree_fingerprint(list_of_workbook_paths),
+                'workbooks': sorted(get_path_key(file) for file in select_shard(list_of_workbook_paths, shard)),
+                'outputs': output_hashes}
+    os.makedirs(os.path.dirname(manifest_file_path) or '.', exist_ok=True)
+    fo = open(manifest_file_path, 'w')
+    json.dump(manifest, fo, indent=1, sort_keys=True)
+    fo.close()
+    return
+
+
+def merge_manifests(manifests):
+    '''
+    Merges the manifests of the shards of one or more converters and checks them.
+    :param manifests: list of (manifest file path, manifest)
+    :return merged: converter -> merged manifest
+    :return problems: list of texts, empty if the shards cover the tree exactly
+    '''
+    merged, problems = {}, []
+    manifests_of_converters = {}
+    for manifest_file_path, manifest in manifests:
+        manifests_of_converters.setdefault(manifest['converter'], []).append((manifest_file_path, manifest))
+    for converter in sorted(manifests_of_converters):
+        converter_manifests = manifests_of_converters[converter]
+        first_file_path, first = converter_manifests[0]
+        for manifest_file_path, manifest in converter_manifests[1:]:
+            for key in ('shards', 'tree'):
+                if manifest[key] != first[key]:
+                    problems.append('{CONVERTER}: {FILE} has other {KEY} than {FIRST}'.format(CONVERTER=converter, FILE=manifest_file_path, KEY=key, FIRST=first_file_path))
+        shard_files = {}
+        for manifest_file_path, manifest in converter_manifests:
+            shard_files.setdefault(manifest['shard'], []).append(manifest_file_path)
+        for index in range(1, first['shards'] + 1):
+            if index not in shard_files:
+                problems.append('{CONVERTER}: gap, the manifest of shard {INDEX}/{COUNT} is missing'.format(CONVERTER=converter, INDEX=index, COUNT=first['shards']))
+            elif len(shard_files[index]) > 1:
+                problems.append('{CONVERTER}: overlap, shard {INDEX}/{COUNT} is given {NUMBER} times: {FILES}'.format(CONVERTER=converter, INDEX=index, COUNT=first['shards'], NUMBER=len(shard_files[index]), FILES=', '.join(shard_files[index])))
+        for index in sorted(index for index in shard_files if not 1 <= index <= first['shards']):
+            problems.append('{CONVERTER}: shard {INDEX} is not between 1 and {COUNT}: {FILES}'.format(CONVERTER=converter, INDEX=index, COUNT=first['shards'], FILES=', '.join(shard_files[index])))
+        shards_of_workbooks, shards_of_outputs, outputs = {}, {}, {}
+        for manifest_file_path, manifest in converter_manifests:
+            for workbook in manifest['workbooks']:
+                shards_of_workbooks.setdefault(workbook, []).append(manifest_file_path)
+            for output, sha256 in manifest['outputs'].items():
+                shards_of_outputs.setdefault(output, []).append(manifest_file_path)
+                outputs[output] = sha256
+        for workbook in sorted(shards_of_workbooks):
+            if len(shards_of_workbooks[workbook]) > 1:
+                problems.append('{CONVERTER}: overlap, workbook {WORKBOOK} belongs to {FILES}'.format(CONVERTER=converter, WORKBOOK=workbook, FILES=', '.join(shards_of_workbooks[workbook])))
+        for output in sorted(shards_of_outputs):
+            if len(shards_of_outputs[output]) > 1:
+                problems.append('{CONVERTER}: overlap, output {OUTPUT} was written by {FILES}'.format(CONVERTER=converter, OUTPUT=output, FILES=', '.join(shards_of_outputs[output])))
+        workbooks = sorted(shards_of_workbooks)
+        if get_tree_fingerprint(workbooks) != first['tree']:
+            problems.append('{CONVERTER}: gap, the shards cover {NUMBER} of the {TOTAL} workbooks of the tree'.format(CONVERTER=converter, NUMBER=len(workbooks), TOTAL=first['tree']['workbooks']))
+        merged[converter] = {'converter': converter, 'shards': first['shards'], 'tree': first['tree'], 'workbooks': workbooks, 'outputs': outputs}
+    return merged, problems
+
+
+def read_manifest(manifest_file_path):
+    fi = open(manifest_file_path, 'r')
+    manifest = json.load(fi)
+    fi.close()
+    return manifest
+
+
+##############################
+# Definitions of global variables
+_MANIFEST_NAME = '.shard_{CONVERTER}_{INDEX}_of_{COUNT}.json'
+##############################
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Merges the manifests of the shards of a conversion and checks that they cover the Excel tree exactly.')
+    ap.add_argument('manifests', nargs='+', help='manifest files of all shards (.shard_<converter>_<i>_of_<n>.json)')
+    ap.add_argument('-o', '--output', help='file for the merged manifest')
+    args = vars(ap.parse_args())
+    merged, problems = merge_manifests([(manifest_file_path, read_manifest(manifest_file_path)) for manifest_file_path in args['manifests']])
+    for problem in problems:
+        print(problem)
+    if args['output']:
+        fo = open(args['output'], 'w')
+        json.dump(merged, fo, indent=1, sort_keys=True)
+        fo.close()
+    for converter in sorted(merged):
+        print('{CONVERTER}: {SHARDS} shard(s), {WORKBOOKS} of {TOTAL} workbooks, {OUTPUTS} output file(s)'.format(
+            CONVERTER=converter, SHARDS=merged[converter]['shards'], WORKBOOKS=len(merged[converter]['workbooks']), TOTAL=merged[converter]['tree']['workbooks'], OUTPUTS=len(merged[converter]['outputs'])))
+    sys.exit(1 if problems else 0)
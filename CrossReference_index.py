@@ -0,0 +1,317 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+This script maintains a local SQLite cross-reference index of the Excel procedures:
+procedure -> called procedures, procedure -> TC/TM IDs and procedure -> arguments of its parameter block.
+The index is updated incrementally, only workbooks whose modification time or size changed are read again (with the
+streaming reader of ProcedureConverter_xlsx2pluto.py).
+Usage:
+python CrossReference_index.py update                       (update the index of the "Excel" folder)
+python CrossReference_index.py update --rebuild             (also regenerate the PLUTO files of changed procedures and
+                                                             of the procedures calling a procedure whose arguments changed,
+                                                             and the se.xml files of the folders of changed procedures)
+python CrossReference_index.py query tm CAM8711             (which procedures check this TM?)
+python CrossReference_index.py query tc|calls|callers|arguments <ID>
+Output:
+The index file (default: xref.sqlite inside the current workspace) and the query results, one per line.
+'''
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import Output_archive as output_archive
+import Procedure_readers as procedure_readers
+import ProcedureConverter_xlsx2pluto as procedure_converter
+import SE_structureConverter_xlsx2seXml as se_converter
+
+
+def open_index(database_path):
+    '''
+    Opens the index and creates its tables if needed.
+    :param database_path:
+    :return connection:
+    '''
+    connection = sqlite3.connect(database_path)
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def get_procedure_name(file):
+    '''
+    Returns the procedure name of an Excel file the same way the se.xml converter does: R-ADC-N210_Activate.xlsx -> R_ADC_N210
+    :param file:
+    :return procedure_name:
+    '''
+    file_name = os.path.basename(file)
+    return file_name[0:file_name.find('_')].replace('-', '_')
+
+
+def get_procedure_arguments(ctx, ws_procedure):
+    '''
+    Returns the arguments of the parameter block (row starting with "Parameters:" within the first 20 rows).
+    :param ctx, ws_procedure:
+    :return arguments: list of (ID, description, type)
+    '''
+    arguments = []
+    for row_number in range(1, 21):
+        if str(ws_procedure[ctx.OPERATIONS_COLUMN + str(row_number)].internal_value).startswith('Parameters:'):
+            break
+    else:
+        return arguments
+    while ws_procedure[ctx.ID_COLUMN + str(row_number)].internal_value != None:
+        arguments.append((str(ws_procedure[ctx.ID_COLUMN + str(row_number)].internal_value).replace('$', ''),
+                          ws_procedure[ctx.DESCRIPTION_COLUMN + str(row_number)].internal_value,
+                          ws_procedure[ctx.TYPE_COLUMN + str(row_number)].internal_value))
+        row_number += 1
+    return arguments
+
+
+def extract_cross_references(ctx, wb):
+    '''
+    Extracts the cross references of one workbook from its identifier matrix, the same rows write_PROCEDURE(),
+    write_SEND*() and write_CHECKTM() work on. The workbook is closed afterwards.
+    :param ctx, wb: openpyxl workbook or WorkbookSnapshot
+    :return arguments, calls, parameters: calls are (called procedure, row, passed arguments), parameters (ID, TC or TM, row)
+    '''
+    calls, parameters = [], []
+    try:
+        ws_procedure = wb['Procedure']
+        arguments = get_procedure_arguments(ctx, ws_procedure)
+        identifier_matrix = procedure_converter.create_identifier_matrix(ctx, ws_procedure)
+        for matrix_iteration in range(1, len(identifier_matrix)):
+            matrix_row_number, matrix_indicator1, matrix_indicator_operator = identifier_matrix[matrix_iteration]
+            operator = str(matrix_indicator_operator).replace(' ', '')
+            if matrix_indicator1 == 'NEW_OPERATION_STEP':
+                continue
+            _, current_OPERATIONS_cell_value, current_ID_cell_value, _, _, _, _, _ = procedure_converter.get_current_row_cells(ctx, ws_procedure, matrix_row_number)
+            if operator.startswith('SEND') and not operator.endswith('_') and current_ID_cell_value != None:
+                parameters.append((str(current_ID_cell_value).strip(), 'TC', matrix_row_number))
+            elif operator.startswith('CHECKTM') and current_ID_cell_value != None:
+                parameters.append((str(current_ID_cell_value).strip(), 'TM', matrix_row_number))
+            elif str(current_OPERATIONS_cell_value).replace(' ', '').startswith('CALLPROCEDURE'):
+                call = get_call(identifier_matrix, matrix_iteration)
+                if call is not None:
+                    calls.append(call)
+    finally:
+        wb.close()
+    return arguments, calls, parameters
+
+
+def get_call(identifier_matrix, matrix_iteration_):
+    '''
+    Reads a CALL PROCEDURE block the way write_PROCEDURE() does.
+    :param identifier_matrix, matrix_iteration_:
+    :return called_procedure, row, passed_arguments: None if the block is incomplete
+    '''
+    row_number_CALL_PROCEDURE = identifier_matrix[matrix_iteration_][0]
+    try:
+        called_procedure = str(identifier_matrix[matrix_iteration_ + 1][2]).split('ID:')[1].replace(' ', '').replace('-', '_')
+    except IndexError:
+        return None
+    passed_arguments = []
+    matrix_iteration_ += 5
+    while matrix_iteration_ < len(identifier_matrix) and not str(identifier_matrix[matrix_iteration_][2]).replace(' ', '').startswith('THENRETURN'):
+        try:
+            passed_arguments.append(str(identifier_matrix[matrix_iteration_][2]).split('.', 1)[1].split('=', 1)[0].replace('$', '').strip())
+        except IndexError:
+            pass
+        matrix_iteration_ += 1
+    return called_procedure, row_number_CALL_PROCEDURE, ','.join(passed_arguments)
+
+
+def get_signature(arguments):
+    '''
+    Returns the part of the arguments callers depend on: names and types.
+    :param arguments:
+    :return signature:
+    '''
+    return ';'.join('{ID}:{TYPE}'.format(ID=argument_ID, TYPE=argument_TYPE) for argument_ID, argument_DESCRIPTION, argument_TYPE in arguments)
+
+
+def update_index(connection, ctx, verbose=False):
+    '''
+    Brings the index up to date with the Excel folder. Workbooks with unchanged modification time and size are skipped.
+    :param connection, ctx, verbose:
+    :return changed_procedures, procedures_with_changed_signature:
+    :return changed_folders: folders (relative to the Excel folder) of the added, changed and deleted workbooks
+    '''
+    known_workbooks = dict((row[0], (row[1], row[2], row[3], row[4])) for row in connection.execute('SELECT workbook, procedure, mtime_ns, size, signature FROM procedures'))
+    current_workbooks = procedure_converter.get_list_of_excelsheet_paths(ctx.excel_folder)
+    changed_procedures, procedures_with_changed_signature, changed_folders = [], [], set()
+    for workbook in set(known_workbooks) - set(current_workbooks):
+        procedure = known_workbooks[workbook][0]
+        delete_procedure(connection, procedure)
+        changed_procedures.append(procedure)
+        procedures_with_changed_signature.append(procedure)
+        changed_folders.add(os.path.dirname(workbook))
+    for workbook in current_workbooks:
+        stat = procedure_readers.stat_workbook(os.path.join(ctx.excel_folder, workbook))
+        if workbook in known_workbooks and known_workbooks[workbook][1:3] == (stat.st_mtime_ns, stat.st_size):
+            continue
+        if verbose:
+            print('indexing: ' + workbook)
+        procedure = get_procedure_name(workbook)
+        arguments, calls, parameters = extract_cross_references(ctx, procedure_converter.read_workbook_snapshot(ctx, os.path.join(ctx.excel_folder, workbook)))
+        signature = get_signature(arguments)
+        if workbook not in known_workbooks or known_workbooks[workbook][3] != signature:
+            procedures_with_changed_signature.append(procedure)
+        delete_procedure(connection, procedure)
+        connection.execute('INSERT INTO procedures VALUES (?, ?, ?, ?, ?)', (procedure, workbook, stat.st_mtime_ns, stat.st_size, signature))
+        connection.executemany('INSERT INTO arguments VALUES (?, ?, ?, ?, ?)', [(procedure, position, argument_ID, str(argument_DESCRIPTION), str(argument_TYPE)) for position, (argument_ID, argument_DESCRIPTION, argument_TYPE) in enumerate(arguments)])
+        connection.executemany('INSERT INTO calls VALUES (?, ?, ?, ?)', [(procedure, called_procedure, row, passed_arguments) for called_procedure, row, passed_arguments in calls])
+        connection.executemany('INSERT INTO parameters VALUES (?, ?, ?, ?)', [(procedure, parameter_ID, kind, row) for parameter_ID, kind, row in parameters])
+        changed_procedures.append(procedure)
+        changed_folders.add(os.path.dirname(workbook))
+    connection.commit()
+    return changed_procedures, procedures_with_changed_signature, sorted(changed_folders)
+
+
+def delete_procedure(connection, procedure):
+    '''
+    Removes all entries of a procedure from the index.
+    :param connection, procedure:
+    :return :
+    '''
+    for table in ['procedures', 'arguments', 'calls', 'parameters']:
+        connection.execute('DELETE FROM {TABLE} WHERE procedure = ?'.format(TABLE=table), (procedure,))
+    return
+
+
+def get_callers(connection, procedure):
+    '''
+    Returns the procedures calling the given procedure.
+    :param connection, procedure:
+    :return callers:
+    '''
+    return [row[0] for row in connection.execute('SELECT DISTINCT procedure FROM calls WHERE called_procedure = ? ORDER BY procedure', (procedure,))]
+
+
+def check_calls(connection, procedure):
+    '''
+    Returns the calls of a procedure passing arguments the called procedure does not have.
+    :param connection, procedure:
+    :return mismatches: list of (called procedure, row, unknown arguments)
+    '''
+    mismatches = []
+    for called_procedure, row, passed_arguments in connection.execute('SELECT called_procedure, row, passed_arguments FROM calls WHERE procedure = ?', (procedure,)).fetchall():
+        if connection.execute('SELECT 1 FROM procedures WHERE procedure = ?', (called_procedure,)).fetchone() is None:
+            continue
+        arguments = set(row_[0] for row_ in connection.execute('SELECT argument FROM arguments WHERE procedure = ?', (called_procedure,)))
+        unknown_arguments = [argument for argument in passed_arguments.split(',') if argument and argument not in arguments]
+        if unknown_arguments:
+            mismatches.append((called_procedure, row, unknown_arguments))
+    return mismatches
+
+
+def rebuild(connection, ctx, changed_procedures, procedures_with_changed_signature, changed_folders=()):
+    '''
+    Regenerates the PLUTO files of the changed procedures and of all procedures calling a procedure whose arguments
+    changed and reports calls that do not match the arguments any more. The se.xml files of the changed folders, which
+    list the procedures and their arguments, are regenerated as well.
+    :param connection, ctx, changed_procedures, procedures_with_changed_signature, changed_folders:
+    :return rebuilt_procedures:
+    '''
+    procedures_to_rebuild = set(changed_procedures)
+    for procedure in procedures_with_changed_signature:
+        procedures_to_rebuild.update(get_callers(connection, procedure))
+    rebuilt_procedures = []
+    for procedure, workbook in connection.execute('SELECT procedure, workbook FROM procedures ORDER BY procedure').fetchall():
+        if procedure not in procedures_to_rebuild:
+            continue
+        output_file_path = procedure_converter.get_output_file_path(ctx, workbook)
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        procedure_converter.main_function(ctx, os.path.join(ctx.excel_folder, workbook), output_file_path)
+        for called_procedure, row, unknown_arguments in check_calls(connection, procedure):
+            print('{WORKBOOK}:Procedure:{ROW}: warning: ARGUMENT_MISMATCH: {CALLED} has no argument(s) {ARGUMENTS}'.format(
+                WORKBOOK=os.path.join(ctx.excel_folder, workbook), ROW=row, CALLED=called_procedure, ARGUMENTS=', '.join(unknown_arguments)))
+        rebuilt_procedures.append(procedure)
+    rebuild_se_xml_files(ctx, changed_folders)
+    return rebuilt_procedures
+
+
+def rebuild_se_xml_files(ctx, folders):
+    '''
+    Regenerates the se.xml files of folders; the se.xml file of a folder without procedures left is deleted.
+    :param ctx, folders: folders relative to the Excel folder
+    :return :
+    '''
+    if not folders:
+        return
+    se_ctx = se_converter.SEConversionContext(excel_folder=ctx.excel_folder, output_folder=ctx.output_folder)
+    all_files = se_converter.get_list_of_excelsheet_paths(se_ctx.excel_folder)
+    for folder in folders:
+        folder_models = [se_converter.read_procedure_model(os.path.join(se_ctx.excel_folder, file), file, se_ctx) for file in all_files if os.path.dirname(file) == folder]
+        output_file_path = se_converter.get_se_xml_file_path(se_ctx, folder)
+        if folder_models:
+            output_archive.write_output_file(None, output_file_path, se_converter.build_se_xml(folder_models).decode('utf-8'))
+        elif os.path.exists(output_file_path):
+            os.remove(output_file_path)
+    return
+
+
+def query(connection, kind, value):
+    '''
+    Answers an impact query.
+    :param connection, kind: tm, tc, calls, callers or arguments
+    :param value: ID or procedure name
+    :return rows:
+    '''
+    if kind in ['tm', 'tc']:
+        return connection.execute('SELECT p.procedure, p.workbook, x.row FROM parameters x JOIN procedures p ON p.procedure = x.procedure WHERE x.parameter = ? AND x.kind = ? ORDER BY p.procedure, x.row', (value, kind.upper())).fetchall()
+    if kind == 'calls':
+        return connection.execute('SELECT called_procedure, row, passed_arguments FROM calls WHERE procedure = ? ORDER BY row', (value,)).fetchall()
+    if kind == 'callers':
+        return connection.execute('SELECT c.procedure, p.workbook, c.row FROM calls c JOIN procedures p ON p.procedure = c.procedure WHERE c.called_procedure = ? ORDER BY c.procedure, c.row', (value,)).fetchall()
+    if kind == 'arguments':
+        return connection.execute('SELECT argument, type, description FROM arguments WHERE procedure = ? ORDER BY position', (value,)).fetchall()
+    raise ValueError('Unknown query: ' + kind)
+
+
+##############################
+# Definitions of global variables
+_DATABASE_FILE = 'xref.sqlite'
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS procedures (procedure TEXT PRIMARY KEY, workbook TEXT, mtime_ns INTEGER, size INTEGER, signature TEXT);
+CREATE TABLE IF NOT EXISTS arguments (procedure TEXT, position INTEGER, argument TEXT, description TEXT, type TEXT);
+CREATE TABLE IF NOT EXISTS calls (procedure TEXT, called_procedure TEXT, row INTEGER, passed_arguments TEXT);
+CREATE TABLE IF NOT EXISTS parameters (procedure TEXT, parameter TEXT, kind TEXT, row INTEGER);
+CREATE INDEX IF NOT EXISTS arguments_procedure ON arguments (procedure);
+CREATE INDEX IF NOT EXISTS calls_procedure ON calls (procedure);
+CREATE INDEX IF NOT EXISTS calls_called_procedure ON calls (called_procedure);
+CREATE INDEX IF NOT EXISTS parameters_procedure ON parameters (procedure);
+CREATE INDEX IF NOT EXISTS parameters_parameter ON parameters (parameter, kind);
+'''
+##############################
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Cross-reference index of the Excel procedures.')
+    ap.add_argument('command', choices=['update', 'query'])
+    ap.add_argument('query', nargs='*', help='query: tm <ID> | tc <ID> | calls <procedure> | callers <procedure> | arguments <procedure>')
+    ap.add_argument('-i', '--excel_folder', default='Excel', help='folder containing the Excel procedures')
+    ap.add_argument('-o', '--output_folder', default='generated_MATIS_Files', help='folder of the generated PLUTO files (for --rebuild)')
+    ap.add_argument('-d', '--database', default=_DATABASE_FILE, help='index file')
+    ap.add_argument('--rebuild', action='store_true', help='regenerate changed procedures and the callers of procedures whose arguments changed')
+    ap.add_argument('-v', '--verbose', action='store_true', help='print every indexed workbook')
+    args = vars(ap.parse_args())
+
+    connection = open_index(args['database'])
+    start = time.perf_counter()
+    if args['command'] == 'update':
+        ctx = procedure_converter.ConversionContext(excel_folder=args['excel_folder'], output_folder=args['output_folder'])
+        changed_procedures, procedures_with_changed_signature, changed_folders = update_index(connection, ctx, args['verbose'])
+        print('updated {CHANGED} procedure(s), {SIGNATURES} with changed arguments in {SECONDS:.2f} s'.format(
+            CHANGED=len(changed_procedures), SIGNATURES=len(procedures_with_changed_signature), SECONDS=time.perf_counter() - start))
+        if args['rebuild']:
+            rebuilt_procedures = rebuild(connection, ctx, changed_procedures, procedures_with_changed_signature, changed_folders)
+            print('rebuilt: ' + ', '.join(rebuilt_procedures))
+    else:
+        if len(args['query']) != 2:
+            ap.error('query needs a kind and a value, e.g. query tm CAM8711')
+        for row in query(connection, args['query'][0], args['query'][1]):
+            print('\t'.join(str(value) for value in row))
+        print('({SECONDS:.1f} ms)'.format(SECONDS=1000 * (time.perf_counter() - start)), file=sys.stderr)
+    connection.close()
@@ -0,0 +1,266 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+Runs a function for many workbooks in isolated worker processes with a time and memory budget per workbook, used by
+ProcedureConverter_xlsx2pluto.py and SE_structureConverter_xlsx2seXml.py with --isolate. A workbook that raises, runs
+longer than the time budget, exceeds the memory budget or crashes its worker process is reported as failure, while the
+other workers keep converting:
+    status   diagnostic code          exit code bit
+    error    WORKBOOK_FAILED          1     the function raised an exception
+    timeout  WORKBOOK_TIMEOUT         4     the workbook took longer than the time budget, the worker is killed
+    memory   WORKBOOK_MEMORY_BUDGET   8     the worker ran out of its memory budget (MemoryError or zlib Z_MEM_ERROR)
+    crashed  WORKER_CRASHED           16    the worker process ended without result (e.g. killed by the system)
+The exit code of a run is the sum of the bits of all failures that occurred (bit 2 is left to argparse, which exits
+with 2 on wrong arguments). A killed or crashed worker is replaced by a new one.
+The memory budget limits the address space of the workers (resource.RLIMIT_AS), which is only available on Linux and
+other POSIX systems; elsewhere it is not enforced.
+Library usage:
+for result in run_isolated(function, items, WorkerBudget(jobs=4, timeout=60, memory_MB=2048), initializer, initargs):
+    result.item, result.status ('ok' or a failure above), result.value (return value if ok), result.message
+The results are returned in the order of the items. function, initializer and initargs have to be picklable.
+'''
+
+import collections
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+import zlib
+
+
+# jobs: number of worker processes (all processors if None), timeout: seconds per item, memory_MB: per worker process
+WorkerBudget = collections.namedtuple('WorkerBudget', ['jobs', 'timeout', 'memory_MB'])
+# status: 'ok', 'error', 'timeout', 'memory' or 'crashed'; value: return value of the function if ok
+IsolatedResult = collections.namedtuple('IsolatedResult', ['item', 'status', 'value', 'message', 'seconds'])
+
+
+class IsolatedWorker:
+    '''
+    One worker process running the function for one item at a time.
+    :param function, initializer, initargs, memory_MB:
+    '''
+    def __init__(self, function, initializer, initargs, memory_MB):
+        self.function = function
+        self.initializer = initializer
+        self.initargs = initargs
+        self.memory_MB = memory_MB
+        self.process = None
+        self.connection = None
+        self.index = None       # index of the item in work, None if idle
+        self.item = None
+        self.start_time = None
+        self.start()
+
+    def start(self):
+        parent_connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=run_worker, args=(child_connection, self.function, self.initializer, self.initargs, self.memory_MB), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.connection = parent_connection
+
+    def restart(self):
+        self.connection.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.start()
+
+    def submit(self, index, item):
+        self.index, self.item, self.start_time = index, item, time.monotonic()
+        self.connection.send(item)
+
+    def receive(self):
+        '''
+        Receives the result of the item in work; the worker is replaced if it crashed or ran out of memory.
+        :return result: IsolatedResult
+        '''
+        try:
+            status, value, message = self.connection.recv()
+        except (EOFError, OSError):
+            self.process.join()
+            status, value, message = 'crashed', None, 'worker process ended with exit code {EXIT_CODE}'.format(EXIT_CODE=self.process.exitcode)
+            self.restart()
+        else:
+            if status == 'memory':
+                self.restart()
+        return self.finish(status, value, message)
+
+    def kill(self, timeout):
+        '''
+        Kills the worker after the time budget of its item elapsed and replaces it.
+        :param timeout:
+        :return result: IsolatedResult
+        '''
+        self.restart()
+        return self.finish('timeout', None, 'not done after the time budget of {TIMEOUT} s, worker killed'.format(TIMEOUT=timeout))
+
+    def finish(self, status, value, message):
+        result = IsolatedResult(self.item, status, value, message, time.monotonic() - self.start_time)
+        self.index, self.item, self.start_time = None, None, None
+        return result
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+def run_worker(connection, function, initializer, initargs, memory_MB):
+    '''
+    Main function of a worker process: runs the function for each item received until None is received.
+    :param connection: multiprocessing connection to the parent process
+    :param function, initializer, initargs, memory_MB:
+    :return :
+    '''
+    if memory_MB is not None:
+        set_memory_limit(memory_MB)
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        item = connection.recv()
+        if item is None:
+            break
+        try:
+            result = ('ok', function(item), None)
+        except Exception as error:
+            message = '{TYPE}: {ERROR}'.format(TYPE=type(error).__name__, ERROR=error) if str(error) else type(error).__name__
+            if is_memory_error(error):
+                result = ('memory', None, '{MESSAGE}: above the memory budget of {MEMORY} MB'.format(MESSAGE=message, MEMORY=memory_MB))
+            else:
+                result = ('error', None, message)
+        connection.send(result)
+        if result[0] == 'memory':
+            break   # the heap might be fragmented, the parent starts a new worker
+    connection.close()
+    return
+
+
+def is_memory_error(error):
+    '''
+    Returns if an exception (or an exception it was raised from) means that the memory ran out: MemoryError, or
+    zlib.error Z_MEM_ERROR ("Error -4 while decompressing data"), which zlib raises instead when the address space limit
+    is reached while a workbook is unzipped.
+    :param error:
+    :return is_memory_error:
+    '''
+    while error is not None:
+        if isinstance(error, MemoryError) or (isinstance(error, zlib.error) and str(error).startswith(_Z_MEM_ERROR_PREFIX)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def set_memory_limit(memory_MB):
+    '''
+    Limits the address space of the current process, where the operating system allows it.
+    :param memory_MB:
+    :return is_limited:
+    '''
+    try:
+        import resource
+    except ImportError:
+        return False
+    limit = int(memory_MB * 1024 * 1024)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, resource.getrlimit(resource.RLIMIT_AS)[1]))
+    return True
+
+
+def run_isolated(function, items, budget, initializer=None, initargs=()):
+    '''
+    Runs function(item) for all items in isolated worker processes within the budget.
+    :param function: picklable function of one item
+    :param items: picklable items
+    :param budget: WorkerBudget
+    :param initializer, initargs: run once in each worker process before the first item
+    :return results: generator of IsolatedResult in the order of the items, each one as soon as it and all items
+                     before it are done
+    '''
+    items = list(items)
+    if not items:
+        return
+    jobs = max(1, min(budget.jobs or os.cpu_count() or 1, len(items)))
+    workers = [IsolatedWorker(function, initializer, initargs, budget.memory_MB) for job in range(jobs)]
+    results, next_index, next_result_index = {}, 0, 0
+    try:
+        while next_result_index < len(items):
+            for worker in workers:
+                if worker.index is None and next_index < len(items):
+                    worker.submit(next_index, items[next_index])
+                    next_index += 1
+            busy_workers = [worker for worker in workers if worker.index is not None]
+            wait_time = None
+            if budget.timeout is not None:
+                wait_time = max(0, min(worker.start_time for worker in busy_workers) + budget.timeout - time.monotonic())
+            ready_connections = multiprocessing.connection.wait([worker.connection for worker in busy_workers], wait_time)
+            for worker in busy_workers:
+                index = worker.index
+                if worker.connection in ready_connections:
+                    results[index] = worker.receive()
+                elif budget.timeout is not None and time.monotonic() - worker.start_time >= budget.timeout:
+                    results[index] = worker.kill(budget.timeout)
+            while next_result_index in results:
+                yield results.pop(next_result_index)
+                next_result_index += 1
+    finally:
+        for worker in workers:
+            worker.stop()
+    return
+
+
+def get_failure_code(status):
+    '''
+    Returns the diagnostic code of a failure status.
+    :param status: status of an IsolatedResult other than ok
+    :return code:
+    '''
+    return _FAILURE_CODES[status]
+
+
+def is_failure_code(code):
+    return code in _EXIT_CODE_BITS
+
+
+def get_exit_code(codes):
+    '''
+    Returns the exit code summarising the failures: the bits of all failure codes (see the module description).
+    :param codes: diagnostic codes, the ones of no failure are ignored
+    :return exit_code: 0 if there is no failure
+    '''
+    exit_code = 0
+    for code in codes:
+        exit_code |= _EXIT_CODE_BITS.get(code, 0)
+    return exit_code
+
+
+def write_error_report(report_file_path, failures):
+    '''
+    Writes the failures of a run as json list.
+    :param report_file_path:
+    :param failures: list of (workbook, code, message)
+    :return :
+    '''
+    report = [{'workbook': workbook, 'code': code, 'message': message} for workbook, code, message in failures]
+    os.makedirs(os.path.dirname(report_file_path) or '.', exist_ok=True)
+    fo = open(report_file_path, 'w')
+    json.dump(report, fo, indent=1)
+    fo.close()
+    return
+
+
+##############################
+# Definitions of global variables
+_FAILURE_CODES = {'error': 'WORKBOOK_FAILED', 'timeout': 'WORKBOOK_TIMEOUT', 'memory': 'WORKBOOK_MEMORY_BUDGET', 'crashed': 'WORKER_CRASHED'}
+_EXIT_CODE_BITS = {'WORKBOOK_FAILED': 1, 'WORKBOOK_TIMEOUT': 4, 'WORKBOOK_MEMORY_BUDGET': 8, 'WORKER_CRASHED': 16}
+# seconds a worker gets to end after the last item
+_STOP_TIMEOUT = 5
+# start of the message of zlib.error for Z_MEM_ERROR
+_Z_MEM_ERROR_PREFIX = 'Error -4 '
+##############################
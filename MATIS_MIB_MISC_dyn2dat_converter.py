@@ -7,40 +7,66 @@ Date: 10/04/2019
 This script converts MISCcontext.dyn files from SCOS to MISCconfig.dat files. MISCconfig.dat files are used by MATIS
 to read parameters from SCOS in MATIS and to react accordingly.
 (The script can also be used for other .dyn to .dat conversions)
+Usage:
+python MATIS_MIB_MISC_dyn2dat_converter.py -i MISCcontext.dyn -o MISCconfig.dat
+python MATIS_MIB_MISC_dyn2dat_converter.py -i - < MISCcontext.dyn > MISCconfig.dat      (pipe mode: stdin to stdout)
 
 DISCLAIMER: It is just a tool to make life easier. Please check each generated file for errors before implementing it.
             This code might contain overseen bugs.
 '''
 
 import argparse
+import sys
+
+
+def convert_dyn_to_dat(fi, fo):
+    '''
+    Converts the lines of a .dyn file into the lines of a .dat file.
+    :param fi: iterable of lines (e.g. open input file)
+    :param fo: file object to write into
+    :return :
+    '''
+    fcomment = False
+    first_line = True
+    descriptionMISC = ""
+    for line in fi:
+        if not first_line:
+            if line.startswith("###"):
+                fcomment = True
+            if not line.startswith("#"):
+                fcomment = False
+                nameMISC = (str(line.split("\t", 1)[0]) + "\t")
+                if "====" in descriptionMISC:
+                    descriptionMISC = ""
+                fo.write(nameMISC + descriptionMISC + "\n")
+                descriptionMISC = ""
+            if fcomment:
+                descriptionMISC += (line.replace("# ", "").replace("#", "").replace("\n", " "))
+        first_line = False
+    return
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-i", "--input_file_name", required=True, help="path to input file (<name>.dyn), - for stdin")
+    ap.add_argument("-o", "--output_file_name", default="-", help="path to output file (<name>.dat), - for stdout (default)")
+    args = vars(ap.parse_args(argv))
+
+    fi = sys.stdin if args["input_file_name"] == "-" else open(args["input_file_name"], "r")
+    fo = sys.stdout if args["output_file_name"] == "-" else open(args["output_file_name"], "w+")
+    convert_dyn_to_dat(fi, fo)
+    if fi is not sys.stdin:
+        fi.close()
+    if fo is not sys.stdout:
+        fo.close()
+    else:
+        fo.flush()
+    return 0
+
+
 ########################
 # Start Script
-ap = argparse.ArgumentParser()
-ap.add_argument("-i", "--input_file_name", required=True, help="path to input file (<name>.dyn)")
-ap.add_argument("-o", "--output_file_name", required=False, help="path to output file (<name>.dat)")
-args = vars(ap.parse_args())
-
-fcomment = False
-fname = False
-first_line = True
-descriptionMISC = ""
-fi = open(args["input_file_name"], "r")
-fo = open(args["output_file_name"], "w+")
-for line in fi:
-    if not first_line:
-        if line.startswith("###"):
-            fcomment = True
-        if not line.startswith("#"):
-            fcomment = False
-            nameMISC = (str(line.split("\t", 1)[0]) + "\t")
-            if "====" in descriptionMISC:
-                descriptionMISC = ""
-            fo.write(nameMISC + descriptionMISC + "\n")
-            descriptionMISC = ""
-        if fcomment:
-            descriptionMISC += (line.replace("# ", "").replace("#", "").replace("\n", " "))
-    first_line = False
-fi.close()
-fo.close()
+if __name__ == '__main__':
+    sys.exit(main())
 # End script
 ########################
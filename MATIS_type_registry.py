@@ -0,0 +1,107 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+Registry of the SCOS parameter types (TYPE column of the Excel procedures) and their MATIS scalar types, shared by
+ProcedureConverter_xlsx2pluto.py and SE_structureConverter_xlsx2seXml.py, so both converters always agree.
+A TYPE cell is resolved with one compiled prefix table and the result is memoized per TYPE text, so repeated lookups
+(every row, including the lookahead reads of the procedure converter) are a dictionary hit.
+Each scalar type has its name in PLUTO code, in se.xml files and the suffix of the VAL_ variables of TM checks.
+Library usage:
+get_scalar_type('U8 (unsigned integer)') -> 'unsignedInteger'
+get_PLUTO_type('U8 (unsigned integer)') -> 'Unsigned integer'
+get_se_xml_type('U8 (unsigned integer)') -> 'unsignedInteger'
+get_variable_type_addon('Unsigned integer') -> 'UI'
+'''
+
+import re
+
+
+def get_scalar_type(TYPE_cell_value):
+    '''
+    Returns the MATIS scalar type of a SCOS TYPE cell.
+    :param TYPE_cell_value:
+    :return scalar_type: e.g. unsignedInteger, None if the type is unknown
+    '''
+    TYPE_text = str(TYPE_cell_value)
+    try:
+        return _SCALAR_TYPE_MEMO[TYPE_text]
+    except KeyError:
+        pass
+    match = _SCALAR_TYPE_PREFIX_PATTERN.match(TYPE_text)
+    scalar_type = _SCALAR_TYPE_PREFIXES[match.group(0)] if match else None
+    _SCALAR_TYPE_MEMO[TYPE_text] = scalar_type
+    return scalar_type
+
+
+def get_PLUTO_type(TYPE_cell_value):
+    '''
+    Returns the type of a SCOS TYPE cell as it is written into PLUTO code.
+    :param TYPE_cell_value:
+    :return PLUTO_type: e.g. Unsigned integer, 'None' if the type is unknown
+    '''
+    return _PLUTO_TYPES[get_scalar_type(TYPE_cell_value)]
+
+
+def get_se_xml_type(TYPE_cell_value):
+    '''
+    Returns the type of a SCOS TYPE cell as it is written into se.xml files.
+    :param TYPE_cell_value:
+    :return se_xml_type: e.g. unsignedInteger, string if the type is unknown
+    '''
+    return _SE_XML_TYPES[get_scalar_type(TYPE_cell_value)]
+
+
+def get_scalar_type_of_PLUTO_type(PLUTO_type):
+    '''
+    Returns the scalar type of a type already converted by get_PLUTO_type().
+    :param PLUTO_type:
+    :return scalar_type: None if unknown
+    '''
+    return _SCALAR_TYPES_OF_PLUTO_TYPES.get(str(PLUTO_type))
+
+
+def get_variable_type_addon(PLUTO_type):
+    '''
+    Returns the suffix of the VAL_ variable holding TM values of a type already converted by get_PLUTO_type().
+    :param PLUTO_type:
+    :return type_addon: e.g. UI, '' if the type is unknown
+    '''
+    return _VARIABLE_TYPE_ADDONS[get_scalar_type_of_PLUTO_type(PLUTO_type)]
+
+
+def get_TM_check_variable_index(PLUTO_type):
+    '''
+    Returns the position of a type already converted by get_PLUTO_type() in flag_array_TM_CHECK_VARIABLES
+    of the procedure converter (one flag per VAL_ variable: UI, SI, BOOL, REAL, STR, ABST, RELT).
+    :param PLUTO_type:
+    :return index: None if the type is unknown
+    '''
+    scalar_type = get_scalar_type_of_PLUTO_type(PLUTO_type)
+    return None if scalar_type is None else _SCALAR_TYPES.index(scalar_type)
+
+
+##############################
+# Definitions of global variables
+# SCOS type prefixes -> MATIS scalar types
+_SCALAR_TYPE_PREFIXES = {'Enum': 'unsignedInteger', 'U8': 'unsignedInteger', 'U16': 'unsignedInteger', 'U32': 'unsignedInteger', 'U64': 'unsignedInteger',
+                         'S8': 'signedInteger', 'S16': 'signedInteger', 'S32': 'signedInteger', 'S64': 'signedInteger',
+                         'Boolean': 'boolean',
+                         'Float': 'real',
+                         'Octet Str': 'string', 'Char Str': 'string',
+                         'Abs Time': 'absoluteTime', 'Abs time': 'absoluteTime',
+                         'Del Time': 'relativeTime', 'Del time': 'relativeTime'}
+_SCALAR_TYPE_PREFIX_PATTERN = re.compile('|'.join(re.escape(prefix) for prefix in _SCALAR_TYPE_PREFIXES))
+# names of the scalar types (None: unknown type)
+_PLUTO_TYPES = {'unsignedInteger': 'Unsigned integer', 'signedInteger': 'Signed integer', 'boolean': 'Boolean', 'real': 'Real',
+                'string': 'String', 'absoluteTime': 'Absolute time', 'relativeTime': 'Relative time', None: 'None'}
+#TODO: change this to something that is working but unique, so that MATIS does not complain but user can identify "wrong" value type
+_SE_XML_TYPES = {'unsignedInteger': 'unsignedInteger', 'signedInteger': 'signedInteger', 'boolean': 'boolean', 'real': 'real',
+                 'string': 'string', 'absoluteTime': 'absoluteTime', 'relativeTime': 'relativeTime', None: 'string'}
+_VARIABLE_TYPE_ADDONS = {'unsignedInteger': 'UI', 'signedInteger': 'SI', 'boolean': 'BOOL', 'real': 'REAL',
+                         'string': 'STR', 'absoluteTime': 'ABST', 'relativeTime': 'RELT', None: ''}
+_SCALAR_TYPES = ['unsignedInteger', 'signedInteger', 'boolean', 'real', 'string', 'absoluteTime', 'relativeTime']
+_SCALAR_TYPES_OF_PLUTO_TYPES = dict((PLUTO_type, scalar_type) for scalar_type, PLUTO_type in _PLUTO_TYPES.items() if scalar_type is not None)
+# TYPE text -> scalar type
+_SCALAR_TYPE_MEMO = {}
+##############################
@@ -0,0 +1,157 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+Output sink writing the generated MATIS files (.pluto, .pluto.map, .se.xml, .dat) into one zip archive instead of the
+output folder, used by ProcedureConverter_xlsx2pluto.py, SE_structureConverter_xlsx2seXml.py and Build_MATIS.py with
+--output_archive. No folder and no single file is created on the file system except the archive itself.
+The archive is reproducible: the entries keep the order they are written in (the converters write the workbooks and
+folders sorted by path), all entries have the same timestamp and permissions, and the last entry MANIFEST.sha256
+lists the SHA-256 hash of every entry in the format of sha256sum, so the extracted tree can be verified with
+    sha256sum -c MANIFEST.sha256
+The archive is written to a temporary file next to it and renamed by close(), so an interrupted conversion never
+leaves a half written archive behind.
+Library usage:
+output_archive = OutputArchive('generated_MATIS_Files.zip', 'generated_MATIS_Files')
+ProcedureConverter_xlsx2pluto.convert_tree(ConversionContext(..., output_archive=output_archive))
+SE_structureConverter_xlsx2seXml.convert_tree(SEConversionContext(..., output_archive=output_archive))
+output_archive.close()      (or output_archive.discard() if the conversion failed)
+Output:
+A zip archive with the same folder structure as the output folder, paths relative to the output folder.
+'''
+
+import hashlib
+import os
+import tempfile
+import zipfile
+
+
+class OutputArchive:
+    '''
+    Zip archive the generated files are streamed into.
+    :param archive_path:
+    :param output_folder: the output file paths of the converters are relative to it inside of the archive
+    '''
+    def __init__(self, archive_path, output_folder):
+        self.archive_path = archive_path
+        self.output_folder = output_folder
+        self.manifest = []      # (entry name, SHA-256 hash) in the order of the entries
+        fd, self.temporary_file_path = tempfile.mkstemp(suffix=_TEMPORARY_SUFFIX, dir=os.path.dirname(os.path.abspath(archive_path)))
+        self.fo = os.fdopen(fd, 'w+b')
+        self.archive = zipfile.ZipFile(self.fo, 'w')
+
+    def get_entry_name(self, output_file_path):
+        '''
+        Returns the name of the entry of an output file path: relative to the output folder, separated by /.
+        :param output_file_path:
+        :return entry_name:
+        '''
+        return os.path.relpath(output_file_path, self.output_folder).replace(os.sep, '/')
+
+    def write_file(self, output_file_path, content):
+        '''
+        Writes one generated file into the archive.
+        :param output_file_path: path the file would have inside of the output folder
+        :param content: text (written UTF-8 encoded) or bytes
+        :return :
+        '''
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        entry_name = self.get_entry_name(output_file_path)
+        self.write_entry(entry_name, content)
+        self.manifest.append((entry_name, hashlib.sha256(content).hexdigest()))
+        return
+
+    def write_entry(self, entry_name, content):
+        '''
+        Writes one entry with the fixed timestamp and permissions.
+        :param entry_name, content:
+        :return :
+        '''
+        zip_info = zipfile.ZipInfo(entry_name, date_time=_ENTRY_DATE_TIME)
+        zip_info.compress_type = zipfile.ZIP_DEFLATED
+        zip_info.external_attr = _ENTRY_PERMISSIONS << 16
+        self.archive.writestr(zip_info, content)
+        return
+
+    def close(self):
+        '''
+        Writes the manifest and moves the archive to its path.
+        :return :
+        '''
+        manifest_text = ''.join('{HASH}  {NAME}\n'.format(HASH=sha256, NAME=entry_name) for entry_name, sha256 in self.manifest)
+        self.write_entry(_MANIFEST_NAME, manifest_text.encode('utf-8'))
+        self.archive.close()
+        self.fo.close()
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(self.temporary_file_path, 0o666 & ~umask)     # mkstemp creates the file readable by the owner only
+        os.replace(self.temporary_file_path, self.archive_path)
+        return
+
+    def discard(self):
+        '''
+        Deletes the unfinished archive, an existing archive of an earlier conversion is kept.
+        :return :
+        '''
+        self.archive.close()
+        self.fo.close()
+        if os.path.exists(self.temporary_file_path):
+            os.remove(self.temporary_file_path)
+        return
+
+
+class OutputBuffer:
+    '''
+    Collects the generated files of a worker process in memory, so the parent process can write them into its
+    OutputArchive (see Build_MATIS.py).
+    '''
+    def __init__(self):
+        self.files = []     # (output file path, content)
+
+    def write_file(self, output_file_path, content):
+        self.files.append((output_file_path, content))
+
+    def pop_files(self):
+        '''
+        Returns and forgets the files written since the last call.
+        :return files: list of (output file path, content)
+        '''
+        files, self.files = self.files, []
+        return files
+
+
+def write_output_file(output_archive, output_file_path, content):
+    '''
+    Writes one generated file into the output archive or, without archive, into the output folder, creating its folder.
+    A file of the output folder is written to <file>.tmp and renamed, so it is either complete or not changed at all.
+    :param output_archive: OutputArchive, OutputBuffer or None
+    :param output_file_path, content: content is text
+    :return :
+    '''
+    if output_archive is not None:
+        output_archive.write_file(output_file_path, content)
+        return
+    os.makedirs(os.path.dirname(output_file_path) or '.', exist_ok=True)
+    temporary_file_path = output_file_path + _TEMPORARY_SUFFIX
+    fo = open(temporary_file_path, 'w')
+    try:
+        fo.write(content)
+        fo.close()
+        os.replace(temporary_file_path, output_file_path)
+    except BaseException:
+        fo.close()
+        if os.path.exists(temporary_file_path):
+            os.remove(temporary_file_path)
+        raise
+    return
+
+
+##############################
+# Definitions of global variables
+_MANIFEST_NAME = 'MANIFEST.sha256'
+# earliest timestamp a zip entry can have
+_ENTRY_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+_ENTRY_PERMISSIONS = 0o644
+_TEMPORARY_SUFFIX = '.tmp'
+##############################
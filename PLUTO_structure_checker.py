@@ -0,0 +1,259 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+This script checks the structure of generated PLUTO files without MATIS and without any other package: the files are
+tokenized line by line (comments and string literals are skipped) and the nesting of the blocks
+    procedure/end procedure, declare/end declare, initiate and confirm step/end step;, if/else/end if;,
+    in case/is/or is/otherwise/end case;, initiate/with arguments/with directives/end with/end with;
+and the terminators of the statements (";" after statements, "," between the items of declare and with blocks) are
+validated as written by ProcedureConverter_xlsx2pluto.py. Optionally the indentation is checked as well, to find
+stray indents of the indent_add()/indent_remove() bookkeeping of the converter.
+All files of the folder are checked in parallel processes, so the full tree can be checked in every build.
+Usage:
+python PLUTO_structure_checker.py                                   (check all .pluto files of generated_MATIS_Files)
+python PLUTO_structure_checker.py -i some_folder --indentation
+python PLUTO_structure_checker.py generated_MATIS_Files/Routine_nominal/ADC/R_ADC_N100.pluto
+Output:
+One line per finding: <file>:<line>: <severity>: <code>: <message>, the exit code is 1 if an error was found.
+'''
+
+import argparse
+import collections
+import concurrent.futures
+import os
+import re
+import sys
+
+
+Finding = collections.namedtuple('Finding', ['file', 'line', 'severity', 'code', 'message'])
+# open block of check_text(): kind (see _BLOCK_ENDS), line and indentation of the opening line, has_default (else/otherwise seen)
+Block = collections.namedtuple('Block', ['kind', 'line', 'indent', 'has_default'])
+
+
+def tokenize_line(line):
+    '''
+    Splits one line of PLUTO code into tokens. Comments are dropped, string literals are one token.
+    :param line:
+    :return tokens, error: error is None or the message if the line could not be tokenized
+    '''
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(line):
+        if match.lastgroup == 'comment':
+            break
+        if match.lastgroup == 'unterminated':
+            return tokens, 'unterminated string literal'
+        if match.lastgroup != 'space':
+            tokens.append(match.group(0))
+    return tokens, None
+
+
+def get_token_lines(text):
+    '''
+    Returns the lines of a PLUTO text which contain code.
+    :param text:
+    :return token_lines, findings: token_lines is a list of (line number, indentation in tabs, tokens)
+    '''
+    token_lines, findings = [], []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        tokens, error = tokenize_line(line)
+        if error:
+            findings.append((line_number, 'error', 'UNTERMINATED_STRING', error))
+        if tokens:
+            token_lines.append((line_number, len(line) - len(line.lstrip('\t')), tokens))
+    return token_lines, findings
+
+
+def get_statement_kind(tokens):
+    '''
+    Classifies a line of tokens.
+    :param tokens:
+    :return kind, block: kind is 'open', 'branch', 'end' or 'statement', block the kind of block concerned
+    '''
+    words = [token.lower() for token in tokens]
+    if words[0] == 'end' and len(words) > 1:
+        return 'end', words[1]
+    if words in (['procedure'], ['declare']):
+        return 'open', words[0]
+    if words[:4] == ['initiate', 'and', 'confirm', 'step']:
+        return 'open', 'step'
+    if words[0] == 'if' and words[-1] == 'then':
+        return 'open', 'if'
+    if words == ['else'] or (words[:2] == ['else', 'if'] and words[-1] == 'then'):
+        return 'branch', 'if'
+    if words[:2] == ['in', 'case']:
+        return 'open', 'case'
+    if (words[0] == 'is' or words[:2] == ['or', 'is'] or words[0] == 'otherwise') and words[-1] == ':':
+        return 'branch', 'case'
+    if words[:2] in (['with', 'arguments'], ['with', 'directives']):
+        return 'open', 'with'
+    if words[0] == 'initiate' and words[-1] not in (';', ','):
+        return 'open', 'initiate'
+    return 'statement', None
+
+
+def check_text(file, text, check_indentation=False):
+    '''
+    Checks the block structure and the terminators of a PLUTO text.
+    :param file: name used in the findings
+    :param text, check_indentation:
+    :return findings: list of Finding sorted by line
+    '''
+    token_lines, findings = get_token_lines(text)
+    blocks = []
+    indentation_offset = 0
+    procedure_ended = False
+    for index, (line_number, indent, tokens) in enumerate(token_lines):
+        kind, block_kind = get_statement_kind(tokens)
+        words = [token.lower() for token in tokens]
+        expected_indent = len(blocks) - (1 if kind in ('branch', 'end') else 0)
+        if procedure_ended:
+            findings.append((line_number, 'error', 'CODE_AFTER_PROCEDURE', 'code after "end procedure"'))
+        elif not blocks and words != ['procedure']:
+            findings.append((line_number, 'error', 'CODE_OUTSIDE_PROCEDURE', 'code outside of "procedure" ... "end procedure"'))
+        if kind == 'open':
+            if block_kind == 'with' and (not blocks or blocks[-1].kind != 'initiate'):
+                findings.append((line_number, 'error', 'MISPLACED_WITH', '"{WITH}" without "initiate"'.format(WITH=' '.join(tokens[:2]))))
+            elif block_kind != 'with' and blocks and blocks[-1].kind in _LIST_BLOCKS:
+                findings.append((line_number, 'error', 'MISPLACED_BLOCK', '"{KIND}" block inside of the items of a "{BLOCK}" block'.format(KIND=block_kind, BLOCK=blocks[-1].kind)))
+            blocks.append(Block(block_kind, line_number, indent, False))
+        elif kind == 'branch':
+            if not blocks or blocks[-1].kind != block_kind:
+                findings.append((line_number, 'error', 'MISPLACED_BRANCH', '"{BRANCH}" outside of a "{KIND}" block'.format(BRANCH=' '.join(tokens), KIND=block_kind)))
+            elif blocks[-1].has_default:
+                findings.append((line_number, 'error', 'BRANCH_AFTER_DEFAULT', '"{BRANCH}" after the "{DEFAULT}" of the block opened in line {LINE}'.format(
+                    BRANCH=' '.join(tokens), DEFAULT=_DEFAULT_BRANCHES[block_kind], LINE=blocks[-1].line)))
+            elif words[0] == _DEFAULT_BRANCHES[block_kind] and (block_kind != 'if' or words == ['else']):
+                blocks[-1] = blocks[-1]._replace(has_default=True)
+        elif kind == 'end':
+            terminator = ';' if tokens[-1] == ';' else ''
+            closed_kind = block_kind
+            if block_kind == 'with' and terminator and blocks and blocks[-1].kind == 'initiate':
+                # "end with;" after the "end with" of the last with clause closes the initiate statement
+                closed_kind = 'initiate'
+            if block_kind not in _BLOCK_ENDS:
+                findings.append((line_number, 'error', 'UNKNOWN_END', 'unknown block end "{END}"'.format(END=' '.join(tokens))))
+            elif not any(block.kind == closed_kind for block in blocks):
+                findings.append((line_number, 'error', 'UNMATCHED_END', '"end {KIND}" without open "{KIND}" block'.format(KIND=block_kind)))
+            else:
+                while blocks[-1].kind != closed_kind:
+                    block = blocks.pop()
+                    findings.append((block.line, 'error', 'UNCLOSED_BLOCK', '"{KIND}" block is not closed before the "end {END}" in line {LINE}'.format(KIND=block.kind, END=block_kind, LINE=line_number)))
+                block = blocks.pop()
+                if closed_kind == 'with' and terminator and blocks and blocks[-1].kind == 'initiate':
+                    # "end with;" of the last with clause also closes the initiate statement
+                    blocks.pop()
+                elif closed_kind == 'procedure':
+                    procedure_ended = True
+            if block_kind in _BLOCK_ENDS and terminator not in _BLOCK_ENDS[block_kind]:
+                findings.append((line_number, 'error', 'WRONG_TERMINATOR', '"end {KIND}" has to be followed by "{TERMINATOR}"'.format(KIND=block_kind, TERMINATOR=_BLOCK_ENDS[block_kind][0] or 'nothing')))
+            if len(tokens) > 2 + len(terminator):
+                findings.append((line_number, 'error', 'UNEXPECTED_TOKEN', 'unexpected "{TOKENS}" after "end {KIND}"'.format(TOKENS=' '.join(tokens[2:len(tokens) - len(terminator)]), KIND=block_kind)))
+        else:
+            if blocks and blocks[-1].kind in _LIST_BLOCKS:
+                is_last_item = index + 1 == len(token_lines) or get_statement_kind(token_lines[index + 1][2])[0] == 'end'
+                if is_last_item and tokens[-1] in (',', ';'):
+                    findings.append((line_number, 'error', 'TRAILING_SEPARATOR', 'last item of the "{KIND}" block ends with "{TOKEN}"'.format(KIND=blocks[-1].kind, TOKEN=tokens[-1])))
+                elif not is_last_item and tokens[-1] != ',':
+                    findings.append((line_number, 'error', 'MISSING_SEPARATOR', 'item of the "{KIND}" block is not followed by ","'.format(KIND=blocks[-1].kind)))
+            elif tokens[-1] != ';':
+                findings.append((line_number, 'error', 'MISSING_TERMINATOR', 'statement is not terminated by ";"'))
+        if check_indentation and indent - expected_indent != indentation_offset:
+            # reported once where the indentation starts to deviate (again), not for every following line
+            if indent != expected_indent:
+                findings.append((line_number, 'warning', 'STRAY_INDENTATION', 'indented by {INDENT} tab(s) instead of {EXPECTED} (from here on)'.format(INDENT=indent, EXPECTED=expected_indent)))
+            indentation_offset = indent - expected_indent
+    for block in blocks:
+        findings.append((block.line, 'error', 'UNCLOSED_BLOCK', '"{KIND}" block is not closed'.format(KIND=block.kind)))
+    if not token_lines:
+        findings.append((1, 'error', 'EMPTY_FILE', 'the file contains no PLUTO code'))
+    elif not procedure_ended and not blocks:
+        findings.append((token_lines[-1][0], 'error', 'MISSING_PROCEDURE', 'no "procedure" ... "end procedure"'))
+    return [Finding(file, line, severity, code, message) for line, severity, code, message in sorted(findings, key=lambda finding: finding[0])]
+
+
+def check_file(file_path, check_indentation=False):
+    '''
+    Checks one PLUTO file. Runs inside of the worker processes of check_files().
+    :param file_path, check_indentation:
+    :return findings:
+    '''
+    try:
+        fo = open(file_path, 'r', encoding='utf-8', errors='replace')
+        text = fo.read()
+        fo.close()
+    except OSError as error:
+        return [Finding(file_path, None, 'error', 'UNREADABLE_FILE', str(error))]
+    return check_text(file_path, text, check_indentation)
+
+
+def get_list_of_pluto_file_paths(folder):
+    '''
+    Returns the paths of all .pluto files of a folder and its subfolders, sorted.
+    :param folder:
+    :return file_paths:
+    '''
+    file_paths = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        file_paths.extend(os.path.join(root, file) for file in sorted(files) if file.endswith('.pluto'))
+    return file_paths
+
+
+def check_files(file_paths, check_indentation=False, jobs=None):
+    '''
+    Checks PLUTO files in parallel processes.
+    :param file_paths, check_indentation:
+    :param jobs: number of processes, all processors if None
+    :return findings: in the order of the files
+    '''
+    if len(file_paths) < 2 or jobs == 1:
+        return [finding for file_path in file_paths for finding in check_file(file_path, check_indentation)]
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+    try:
+        chunksize = max(1, len(file_paths) // (4 * (jobs or os.cpu_count() or 1)))
+        results = executor.map(check_file, file_paths, [check_indentation] * len(file_paths), chunksize=chunksize)
+        return [finding for findings_of_file in results for finding in findings_of_file]
+    finally:
+        executor.shutdown()
+
+
+def format_finding(finding):
+    '''
+    Returns a finding as one line of text: <file>:<line>: <severity>: <code>: <message>
+    :param finding:
+    :return text:
+    '''
+    return '{FILE}:{LINE}: {SEVERITY}: {CODE}: {MESSAGE}'.format(FILE=finding.file, LINE=finding.line if finding.line is not None else '',
+                                                                 SEVERITY=finding.severity, CODE=finding.code, MESSAGE=finding.message)
+
+
+##############################
+# Definitions of global variables
+_TOKEN_PATTERN = re.compile(r'(?P<space>\s+)|(?P<comment>//.*)|(?P<string>"(?:[^"\\]|\\.)*")|(?P<unterminated>".*)|(?P<word>[A-Za-z0-9_.@$]+)|(?P<operator>:=|!=|<=|>=|.)')
+# block kinds with an "end <kind>" and the terminators allowed after it (the initiate statement is closed by "end with;")
+_BLOCK_ENDS = {'procedure': [''], 'declare': [''], 'step': [';'], 'if': [';'], 'case': [';'], 'with': ['', ';']}
+# blocks whose lines are items separated by ","
+_LIST_BLOCKS = ['declare', 'with']
+_DEFAULT_BRANCHES = {'if': 'else', 'case': 'otherwise'}
+##############################
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Checks the block structure and the terminators of generated PLUTO files.')
+    ap.add_argument('files', nargs='*', help='PLUTO files or folders (all their .pluto files) to check (default: all .pluto files of the input folder)')
+    ap.add_argument('-i', '--input_folder', default='generated_MATIS_Files', help='folder containing the PLUTO files')
+    ap.add_argument('--indentation', action='store_true', help='also report stray indentation (as warnings)')
+    ap.add_argument('-j', '--jobs', type=int, help='number of processes (default: all processors)')
+    args = vars(ap.parse_args())
+    file_paths = []
+    for path in args['files'] or [args['input_folder']]:
+        if os.path.isdir(path):
+            file_paths.extend(get_list_of_pluto_file_paths(path))
+        else:
+            file_paths.append(path)
+    findings = check_files(file_paths, args['indentation'], args['jobs'])
+    for finding in findings:
+        print(format_finding(finding))
+    errors = sum(1 for finding in findings if finding.severity == 'error')
+    print('{FILES} file(s) checked, {ERRORS} error(s), {WARNINGS} warning(s)'.format(FILES=len(file_paths), ERRORS=errors, WARNINGS=len(findings) - errors), file=sys.stderr)
+    sys.exit(1 if errors else 0)
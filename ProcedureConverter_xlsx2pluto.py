@@ -12,34 +12,73 @@ to MATIS.
 Input:
 "Excel" folder located inside the current workspace. It iterates through all sub-folders, reads-in each Excel procedures
 and extracts the needed information.
+Besides xlsx, procedures exported as json, csv/tsv (one file per work sheet) or ods are read, and the "Excel" folder can
+also be a zip or tar(.gz) archive of the Excel tree (see Procedure_readers.py).
 Output:
 A representative PLUTO procedure file to the Excel equivalent in the correct folder structure.
 The file name is the Excel file name without its description.
+With --output_archive generated_MATIS_Files.zip the PLUTO files are written into one zip archive with a manifest of
+their hashes instead of the output folder (see Output_archive.py).
+With --journal the completed workbooks are recorded in the output folder, so an interrupted conversion can be continued
+with --resume instead of starting over (see Conversion_journal.py).
+With --isolate each workbook is converted in an isolated worker process with the time and memory budget of --timeout
+and --memory_budget. Workbooks that fail, hang or crash are reported (--error_report) while the others are converted;
+the exit code summarises the failures (see Isolated_workers.py).
+With --shard i/n only the workbooks of shard i of n are converted (whole folders, by a stable hash of the folder path)
+and a manifest of the shard is written, see Conversion_shards.py.
+Pipe mode:
+python ProcedureConverter_xlsx2pluto.py --pipe < procedure.xlsx > procedure.pluto
+reads one workbook (xlsx, ods or json) from stdin and writes the PLUTO code to stdout and the diagnostics to stderr,
+without touching any folder.
+Library usage:
+convert_procedure(workbook_source, context) converts one workbook and returns the PLUTO code and a list of diagnostics
+without writing anything. All configuration lives in a ConversionContext, which can be reused for many workbooks.
 
 DISCLAIMER: It is just a tool to make life easier. Please check each generated file for errors before implementing it.
             This code might contain overseen bugs.
 '''
 
 import openpyxl as op  # use version 2.5.3, newer versions might not work
-import fileinput
+import argparse
+import bisect
+import collections
+import concurrent.futures
+import copy
+import gc
+import hashlib
+import io
+import json
 import re
 import os
+import queue
 import shutil
+import sys
+import threading
 import time
 import datetime
+import zipfile
+
+import Conversion_cache as conversion_cache
+import Conversion_journal as conversion_journal
+import Conversion_shards as conversion_shards
+import Isolated_workers as isolated_workers
+import MATIS_type_registry as type_registry
+import Output_archive as output_archive
+import Procedure_readers as procedure_readers
 
 
 # FUNCTION DEFINITIONS
-def write_DATE_of_autogeneration_and_initials():
+def write_DATE_of_autogeneration_and_initials(f, generation_date):
     '''
     Writes information about generation time, information about converter,
     contact information and disclaimer into the output file.
 
+    :param f:
+    :param generation_date: text of the generation time (see get_generation_date())
     :return:
     '''
-    f = open(_FILE_NAME, 'w+')
     f.write('////////////////////////////////////////////////////////////////////////////////////////\n')
-    f.write('// Date for Base Code auto-generation: ' + str(datetime.datetime.now()) + '\n')
+    f.write('// Date for Base Code auto-generation: ' + generation_date + '\n')
     f.write('// Converter designed by: Felix Tim Hessinger\n')
     f.write('//\n')
     f.write('// Last manually edited at: None\n')
@@ -54,26 +93,42 @@ def write_DATE_of_autogeneration_and_initials():
     f.write('//             for certain cases, so make sure to double-check the generated PLUTO code with procedure itself.\n')
     f.write('////////////////////////////////////////////////////////////////////////////////////////\n')
     f.write('////////////////////////////////////////////////////////////////////////////////////////\n')
-    f.close()
     return
 
 
-def write_front_page_documentation_as_comment_into_f(ws_front_page):
+def get_generation_date(ctx):
+    '''
+    Returns the generation time written into the header of the PLUTO files: the generation_date of the context, else
+    the time of SOURCE_DATE_EPOCH (seconds since 1970, UTC), else the current time. With a conversion cache the header
+    must not depend on the time of the conversion, so 'None' is written instead of the current time.
+    :param ctx:
+    :return generation_date:
+    '''
+    if ctx.generation_date is not None:
+        return ctx.generation_date
+    if os.environ.get('SOURCE_DATE_EPOCH'):
+        return str(datetime.datetime.fromtimestamp(int(os.environ['SOURCE_DATE_EPOCH']), datetime.timezone.utc).replace(tzinfo=None))
+    if ctx.cache is not None:
+        return 'None'
+    return str(datetime.datetime.now())
+
+
+def write_front_page_documentation_as_comment_into_f(ctx, f, ws_front_page):
     '''
     Writes the front page of the current Excel procedure into
     the output file as a comment.
 
-    :param ws_front_page:
+    :param ctx, f, ws_front_page:
     :return:
     '''
-    # open dump-f for generated Code
-    f = open(_FILE_NAME, 'a+')
+    # the front page is collected separately, since it is checked for lines without comment sign afterwards
+    f_front_page = io.StringIO()
     end_of_excel_sheet = False
     old_cell_value = None
     counter_row = 1
     counter = 0
     while not end_of_excel_sheet:
-        current_cell_value = ws_front_page[_INFORMATION_COLUMN_FRONT_PAGE + '{row}'.format(row=counter_row)].value
+        current_cell_value = ws_front_page[ctx.INFORMATION_COLUMN_FRONT_PAGE + '{row}'.format(row=counter_row)].value
         #print(current_cell_value)
         if current_cell_value == old_cell_value:
             counter += 1
@@ -85,110 +140,176 @@ def write_front_page_documentation_as_comment_into_f(ws_front_page):
         counter_row += 1
         old_cell_value = current_cell_value
     for cell_number in range(1, counter_row):
-        f.write('//')
-        for cell_ID in [_START_COLUMN_FRONT_PAGE, _FILLER_COLUMN1_FRONT_PAGE, _FILLER_COLUMN2_FRONT_PAGE, _INFORMATION_COLUMN_FRONT_PAGE, _END_COLUMN_FRONT_PAGE]:  # loop for column A to E (start to end)
+        f_front_page.write('//')
+        for cell_ID in [ctx.START_COLUMN_FRONT_PAGE, ctx.FILLER_COLUMN1_FRONT_PAGE, ctx.FILLER_COLUMN2_FRONT_PAGE, ctx.INFORMATION_COLUMN_FRONT_PAGE, ctx.END_COLUMN_FRONT_PAGE]:  # loop for column A to E (start to end)
             if ws_front_page[cell_ID + '{row}'.format(row=cell_number)].value != None:
-                f.write(ws_front_page[cell_ID + '{row}'.format(row=cell_number)].value)
+                f_front_page.write(ws_front_page[cell_ID + '{row}'.format(row=cell_number)].value)
             else:
-                f.write('\t\t\t\t\t')
-        f.write('\n')
-    f.close()
-    check_front_page_for_errors()
-    f = open(_FILE_NAME, 'a+')
+                f_front_page.write('\t\t\t\t\t')
+        f_front_page.write('\n')
+    f.write(check_front_page_for_errors(f_front_page.getvalue()))
     f.write('////////////////////////////////////////////////////////////////////////////////////////\n\n')
     f.write('////////////////////////////////////////////////////////////////////////////////////////\n')
     f.write('// START OF PROCEDURE CODE\n')
     f.write('////////////////////////////////////////////////////////////////////////////////////////\n')
-    f.close()
     return
 
 
-def check_front_page_for_errors():
+def check_front_page_for_errors(text):
     '''
-    Checks for uncommented lines in input files.
-    Usually used after writing the front page into the file and
+    Checks for uncommented lines in the given text.
+    Usually used after writing the front page and
     checking for errors due to returns in an input Excel cell.
 
-    :return:
+    :param text:
+    :return text:
     '''
-    for line in fileinput.FileInput(_FILE_NAME, inplace=1):
+    lines = []
+    for line in normalise_newlines(text).splitlines(True):
         if not line.startswith('//'):
             line = line.replace(line, '//\t\t\t\t\t\t\t\t\t\t\t\t\t\t\t'+line)
-            print(line, end='')
+        lines.append(line)
+    return ''.join(lines)
+
+
+def check_file_for_forbidden_characters(text):
+    '''
+    Checks text for non-ASCII characters and deletes them.
+
+    :param text:
+    :return text:
+    '''
+    return ''.join([char for char in normalise_newlines(text) if char in _ALLOWED_CHARACTERS])
+
+
+def check_file_for_empty_steps_and_delete(text):
+    '''
+    Checks text for empty steps and deletes them.
+
+    :param text:
+    :return text:
+    '''
+    lines = text.splitlines(True)
+    empty_step_line_numbers = get_empty_step_line_numbers(lines)
+    return ''.join([line for line_number, line in enumerate(lines) if line_number not in empty_step_line_numbers])
+
+
+def get_empty_step_line_numbers(lines):
+    '''
+    Returns the indices of the lines of empty steps ("initiate and confirm step" directly followed by "end step").
+    The last line is always kept.
+
+    :param lines:
+    :return empty_step_line_numbers: set
+    '''
+    empty_step_line_numbers = set()
+    for line_number in range(len(lines) - 2):
+        if lines[line_number].replace(' ', '').replace('\t', '').startswith('initiateandconfirmstep') and lines[line_number + 1].replace(' ', '').replace('\t', '').startswith('endstep'):
+            empty_step_line_numbers.update([line_number, line_number + 1])
+    return empty_step_line_numbers
+
+
+def get_lean_text_and_line_map(text, row_offsets):
+    '''
+    Applies the lean output profile to the generated text: all comments, empty lines and the CHECK TM log statements
+    are removed (the forbidden characters and empty steps are removed like in the verbose profile). The Excel row of
+    each remaining line is taken from the offsets recorded during the code generation (see ConversionContext).
+    Rows the converter could not handle are reported as diagnostics during the code generation (UNIDENTIFIED_ROWS,
+    UNDEFINED_WITH_DIRECTIVE), since their TODO comments are removed here.
+
+    :param text: generated text
+    :param row_offsets: list of (offset in text, Excel row) in the order of the offsets
+    :return text, line_map: line_map is a list of [first line, last line, Excel row], lines counted from 1
+    '''
+    offsets = [offset for offset, row in row_offsets]
+    lines, rows = [], []
+    offset = 0
+    for raw_line in text.split('\n'):
+        raw_line_end = offset + len(raw_line) + 1
+        index = bisect.bisect_right(offsets, offset) - 1
+        if index + 1 < len(offsets) and offsets[index + 1] < raw_line_end and (index < 0 or row_offsets[index][1] is None):
+            # the line is started before the first row (e.g. "initiate and confirm step" of an operation)
+            index += 1
+        row = row_offsets[index][1] if index >= 0 else None
+        for line in check_file_for_forbidden_characters(raw_line + '\n').splitlines(True):
+            lines.append(line)
+            rows.append(row)
+        offset = raw_line_end
+    empty_step_line_numbers = get_empty_step_line_numbers(lines)
+    lean_lines, line_map = [], []
+    for line_number, line in enumerate(lines):
+        line = strip_comment(line)
+        if line_number in empty_step_line_numbers or line.strip() == '' or line.strip().startswith(_LEAN_DROPPED_STATEMENTS):
+            continue
+        lean_lines.append(line)
+        if rows[line_number] is None:
+            continue
+        if line_map and line_map[-1][2] == rows[line_number] and line_map[-1][1] == len(lean_lines) - 1:
+            line_map[-1][1] = len(lean_lines)
         else:
-            print(line, end='')
-    return
+            line_map.append([len(lean_lines), len(lean_lines), rows[line_number]])
+    return ''.join(lean_lines), line_map
 
 
-def check_file_for_forbidden_characters(_FILE_NAME):
+def strip_comment(line):
     '''
-    Checks file for non-ASCII characters and deletes them.
+    Removes the // comment of a line of PLUTO code, // inside of string literals are kept.
 
-    :param _FILE_NAME:
-    :return:
+    :param line:
+    :return line:
     '''
-    for line in fileinput.FileInput(_FILE_NAME, inplace=1):
-        for char in line:
-            if not char in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ !\"#$%&\'()*+,-~./0123456789:;<=>?@[\\]^_\t\n`':
-                char = char.replace(char, '')
-                print(char, end='')
-            else:
-                print(char, end='')
-    return
+    in_string = False
+    for index, char in enumerate(line):
+        if char == '"':
+            in_string = not in_string
+        elif not in_string and line.startswith('//', index):
+            return line[:index].rstrip() + '\n'
+    return line
 
 
-def check_file_for_empty_steps_and_delete(_FILE_NAME):
+def normalise_newlines(text):
     '''
-    Checks file for empty steps and deletes them.
+    Converts carriage returns (e.g. from Excel cells) into newlines, the same way
+    reading a text file does.
 
-    :param _FILE_NAME:
-    :return:
+    :param text:
+    :return text:
     '''
-    old_old_line, old_line = '', ''
-    for current_line in fileinput.FileInput(_FILE_NAME, inplace=1):
-        current_line_ = current_line.replace(' ', '')
-        if not (str(old_line).replace(' ', '').replace('\t', '').startswith('initiateandconfirmstep') and str(current_line).replace(' ', '').replace('\t', '').startswith('endstep')) and not (str(old_old_line).replace(' ', '').replace('\t', '').startswith('initiateandconfirmstep') and str(old_line).replace(' ', '').replace('\t', '').startswith('endstep')):
-            print(old_line, end='')
-        old_old_line = old_line
-        old_line = current_line
-    f = open(_FILE_NAME, 'a')
-    f.write(current_line)
-    f.close()
-    return
+    return text.replace('\r\n', '\n').replace('\r', '\n')
 
 
-def get_operations_captions_row_number(ws_procedure):
+def get_operations_captions_row_number(ctx, ws_procedure):
     '''
     Gets operations caption row number.
 
-    :param ws_procedure:
+    :param ctx, ws_procedure:
     :return newOperations:
     '''
-    for i in [_STEP_COLUMN]:  # a sequence of columns could be initialised with: ['A','B','C','D','E','F','G']
+    for i in [ctx.STEP_COLUMN]:  # a sequence of columns could be initialised with: ['A','B','C','D','E','F','G']
         newOperations = []
 #TODO: change 10001 to end of excel file (low priority)
         for j in range(1, 10001):
             currentCell = '{col}{row}'.format(col=i, row=j)
             cellColor = ws_procedure[currentCell].fill.start_color.index
-            if (cellColor == _COLOR_DIVIDING_OPERATION_STEPS):       #blue-ish
+            if (cellColor == ctx.COLOR_DIVIDING_OPERATION_STEPS):       #blue-ish
                 newOperations.append(j)
     return newOperations
 
 
-def iterating_over_operation_topic(ws_procedure, new_operation_row_numbers, iterationNumber, identifier_matrix):
+def iterating_over_operation_topic(ctx, ws_procedure, new_operation_row_numbers, iterationNumber, identifier_matrix):
     '''
     iterates over the operation topics and decides if it is a FOLLOW_ID_FIELD, NEW_ID_FIELD, NEW_OPERATION_FIELD or FOLLOW_OPERATION_FIELD.
 
-    :param ws_procedure, new_operation_row_numbers, iterationNumber, identifier_matrix:
+    :param ctx, ws_procedure, new_operation_row_numbers, iterationNumber, identifier_matrix:
     :return identifier_matrix:
     '''
     flag_previous_ID_empty = None
     old_OPERATIONS_cell_value = None
     for rows_between_two_operations_topics in range((new_operation_row_numbers[iterationNumber]-1)+2, new_operation_row_numbers[iterationNumber+1]):
 #TODO: change _ID_COLUMN to _OPERATIONS_COLUMN to be able to get all the commands that have to be written into MATIS code. E.g. between PREPARATION and INITIAL_VERIFICATIONS
-        current_ID_cell_value = ws_procedure[_ID_COLUMN + '{rows_procedure}'.format(rows_procedure=rows_between_two_operations_topics)].value
-        current_OPERATIONS_cell_value = ws_procedure[_OPERATIONS_COLUMN + '{rows_procedure}'.format(rows_procedure=rows_between_two_operations_topics)].value
-        next_OPERATIONS_cell_value = ws_procedure[_OPERATIONS_COLUMN + '{rows_procedure}'.format(rows_procedure=rows_between_two_operations_topics)].value
+        current_ID_cell_value = ws_procedure[ctx.ID_COLUMN + '{rows_procedure}'.format(rows_procedure=rows_between_two_operations_topics)].value
+        current_OPERATIONS_cell_value = ws_procedure[ctx.OPERATIONS_COLUMN + '{rows_procedure}'.format(rows_procedure=rows_between_two_operations_topics)].value
+        next_OPERATIONS_cell_value = ws_procedure[ctx.OPERATIONS_COLUMN + '{rows_procedure}'.format(rows_procedure=rows_between_two_operations_topics)].value
         if current_ID_cell_value == None:
             flag_current_ID_empty = 1
         else:
@@ -381,18 +502,20 @@ def create_PROCEDURE_dictionary():
     return tree_structure_PROCEDURE_repository
 
 
-def generate_code(ws_front_page, ws_procedure, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS, identifier_matrix, tree_structure_params_repository, asdf_list):
+def generate_code(ctx, f, ws_front_page, ws_procedure, identifier_matrix, executor=None):
     '''
     Generates the PLUTO code and contains the overall logic how
     and when procedures are called.
-    Also outputs a text buffer for unknown commands and list that can be used for debugging.
-    :param ws_front_page, ws_procedure, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS, identifier_matrix, tree_structure_params_repository, asdf_list:
-    :return _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS, asdf_list:
+    Unknown commands are collected in a text buffer and written as comment.
+    :param ctx, f, ws_front_page, ws_procedure, identifier_matrix:
+    :param executor: TopicExecutor to generate the operation topics in parallel, serial if None
+    :return :
     '''
-    f = open(_FILE_NAME, 'a')
+    tree_structure_params_repository = ctx.tree_structure_params_repository
+    _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS = ''
     indents = 0
-    procedure_title = str(ws_front_page[_PROCEDURE_TITLE_CELL].value).replace(' ', '_').replace('-', '_').replace('\\', '_').replace('/', '_').replace('(', '').replace(')', '').replace(':', '').replace(';', '').replace('+', 'PLUS').replace(',', '').replace('$', '')
-    procedure_ID = str(ws_front_page[_PROCEDURE_ID_CELL].value).replace(' ', '_').replace('-', '_').replace('\\', '_').replace('/', '_').replace('(', '').replace(')', '').replace(':', '').replace(';', '').replace('+', 'PLUS').replace(',', '').replace('$', '')
+    procedure_title = str(ws_front_page[ctx.PROCEDURE_TITLE_CELL].value).replace(' ', '_').replace('-', '_').replace('\\', '_').replace('/', '_').replace('(', '').replace(')', '').replace(':', '').replace(';', '').replace('+', 'PLUS').replace(',', '').replace('$', '')
+    procedure_ID = str(ws_front_page[ctx.PROCEDURE_ID_CELL].value).replace(' ', '_').replace('-', '_').replace('\\', '_').replace('/', '_').replace('(', '').replace(')', '').replace(':', '').replace(';', '').replace('+', 'PLUS').replace(',', '').replace('$', '')
     write_into_f(f, indents, 'procedure\n')
     indents = indent_add(indents)
     write_into_f(f, indents, 'initiate and confirm step {ID}_{TITLE}\n'.format(ID=procedure_ID, TITLE=procedure_title))
@@ -406,6 +529,7 @@ def generate_code(ws_front_page, ws_procedure, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMM
     last_OPERATION_cell_value = 0
 ## Start: write "declaration of variables" into global step in PLUTO
     flag_array_TM_CHECK_VARIABLES = [1, 1, 1, 1, 1, 1, 1]
+    flag_array_TM_SAMPLE_VARIABLES = [1, 1, 1, 1, 1, 1, 1]
     flag_first_declarable_variable = 1
     array_declared_variables = []
     flag_DECLARE_VARIABLES = 0
@@ -413,13 +537,15 @@ def generate_code(ws_front_page, ws_procedure, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMM
     for matrix_line in identifier_matrix[1:]:
         matrix_row_number = matrix_line[0]
         matrix_indicator1 = matrix_line[1]
+        if ctx.row_offsets is not None:
+            ctx.row_offsets.append((f.tell(), matrix_row_number))
         try:
             future_matrix_indicator1 = identifier_matrix[matrix_iteration + 1][1]
-            future_STEP_cell_value, future_OPERATIONS_cell_value, future_ID_cell_value, future_DESCRIPTION_cell_value, future_TYPE_cell_value, future_RAW_cell_value, future_ENG_cell_value, future_UNIT_cell_value = get_current_row_cells(ws_procedure, identifier_matrix[matrix_iteration + 1][0])
+            future_STEP_cell_value, future_OPERATIONS_cell_value, future_ID_cell_value, future_DESCRIPTION_cell_value, future_TYPE_cell_value, future_RAW_cell_value, future_ENG_cell_value, future_UNIT_cell_value = get_current_row_cells(ctx, ws_procedure, identifier_matrix[matrix_iteration + 1][0])
         except:
             print('', end='')
         matrix_indicator_operator = matrix_line[2]
-        current_STEP_cell_value, current_OPERATIONS_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value = get_current_row_cells(ws_procedure, matrix_row_number)
+        current_STEP_cell_value, current_OPERATIONS_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value = get_current_row_cells(ctx, ws_procedure, matrix_row_number)
         # Start DECLARE_VARIABLES section in Excel
         if str(matrix_indicator_operator).replace(' ', '').startswith('DECLAREVARIABLES'):
                 flag_DECLARE_VARIABLES = 1
@@ -460,72 +586,113 @@ def generate_code(ws_front_page, ws_procedure, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMM
                                                                                                                 current_TYPE_cell_value,
                                                                                                                 matrix_iteration,
                                                                                                                 indents, flag_some_variable_declared)
+        # variables the TM of CHECK TM range and enumeration checks is sampled into (see get_TM_sample_variable())
+        elif str(matrix_indicator_operator).replace(' ', '').startswith('CHECKTM') and get_TM_sample_variable(ctx, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value) != None:
+            if flag_first_declarable_variable == 1:
+                flag_first_declarable_variable = 0
+                write_into_f(f, indents, 'declare\n')
+                indents = indent_add(indents)
+            indents, flag_array_TM_SAMPLE_VARIABLES, array_declared_variables, flag_some_variable_declared = write_DECLARE_TM_CHECK_VARIABLES(f,
+                                                                                                                array_declared_variables,
+                                                                                                                flag_array_TM_SAMPLE_VARIABLES,
+                                                                                                                identifier_matrix,
+                                                                                                                matrix_indicator_operator_old,
+                                                                                                                matrix_indicator_operator,
+                                                                                                                current_ID_cell_value,
+                                                                                                                current_DESCRIPTION_cell_value,
+                                                                                                                current_TYPE_cell_value,
+                                                                                                                matrix_iteration,
+                                                                                                                indents, flag_some_variable_declared,
+                                                                                                                'SAMPLE')
         # End declaring variables not declared in Excel
         matrix_iteration += 1
         matrix_indicator1_old = matrix_indicator1
         matrix_indicator_operator_old = matrix_indicator_operator
+    if ctx.row_offsets is not None:
+        ctx.row_offsets.append((f.tell(), None))
     #Remove indents and close variable declaration
     if flag_first_declarable_variable == 0:
         indents = indent_remove(indents)
         write_into_f(f, 0, '\n')
         write_into_f(f, indents, 'end declare\n')
 ## End: write "declaration of variables" into global step in PLUTO
-    matrix_indicator1_old = None
-    matrix_indicator_operator_old = None
-    flag_in_SELECT_CASE = 0
-    flag_in_CALL_PROCEDURE = 0
-    flag_in_LEN_loop = 0
-    matrix_iteration = 1
-    last_OPERATION_cell_value = 0
 # Write remaining content
-    while matrix_iteration <= len(identifier_matrix[1:]):
+    state = TopicState(indents, 1, None, 0, 0, 0, 0, 0, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS)
+    if executor is None:
+        state = generate_operation_topics(ctx, f, ws_procedure, identifier_matrix, array_declared_variables, state, len(identifier_matrix))
+    else:
+        state = generate_operation_topics_in_parallel(ctx, f, ws_procedure, identifier_matrix, array_declared_variables, state, executor)
+    indents = state.indents
+    if ctx.row_offsets is not None:
+        ctx.row_offsets.append((f.tell(), None))
+    indents = indent_remove(indents)
+    write_into_f(f, indents, 'end step;\n')
+    indents = indent_remove(indents)
+    write_into_f(f, indents, 'end procedure\n')
+    return
+
+
+def generate_operation_topics(ctx, f, ws_procedure, identifier_matrix, array_declared_variables, state, end_iteration):
+    '''
+    Writes the operation topics of the identifier matrix from state.matrix_iteration up to (excluding) end_iteration.
+    This is the main part of generate_code(), the declaration of variables has to be done beforehand.
+    :param ctx, f, ws_procedure, identifier_matrix, array_declared_variables:
+    :param state: TopicState at the first row to write
+    :param end_iteration: index of the identifier matrix to stop at, len(identifier_matrix) for the whole procedure
+    :return state: TopicState after the last written row
+    '''
+    tree_structure_params_repository = ctx.tree_structure_params_repository
+    indents, matrix_iteration, matrix_indicator_operator_old, flag_in_SELECT_CASE, flag_in_CALL_PROCEDURE, flag_in_LEN_loop, last_row_LEN_loop, last_OPERATION_cell_value, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS = state
+    while matrix_iteration <= len(identifier_matrix[1:]) and matrix_iteration < end_iteration:
         matrix_row_number = identifier_matrix[matrix_iteration][0]
         matrix_indicator1 = identifier_matrix[matrix_iteration][1]
+        if ctx.row_offsets is not None:
+            ctx.row_offsets.append((f.tell(), matrix_row_number))
         try:
             future_matrix_indicator1 = identifier_matrix[matrix_iteration+1][1]
-            future_STEP_cell_value, future_OPERATIONS_cell_value, future_ID_cell_value, future_DESCRIPTION_cell_value, future_TYPE_cell_value, future_RAW_cell_value, future_ENG_cell_value, future_UNIT_cell_value = get_current_row_cells(ws_procedure, identifier_matrix[matrix_iteration+1][0])
+            future_STEP_cell_value, future_OPERATIONS_cell_value, future_ID_cell_value, future_DESCRIPTION_cell_value, future_TYPE_cell_value, future_RAW_cell_value, future_ENG_cell_value, future_UNIT_cell_value = get_current_row_cells(ctx, ws_procedure, identifier_matrix[matrix_iteration+1][0])
         except:
             print('', end='')
         matrix_indicator_operator = identifier_matrix[matrix_iteration][2]
-        current_STEP_cell_value, current_OPERATIONS_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value = get_current_row_cells(ws_procedure, matrix_row_number)
+        current_STEP_cell_value, current_OPERATIONS_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value = get_current_row_cells(ctx, ws_procedure, matrix_row_number)
         if str(matrix_indicator_operator).replace(' ', '').startswith(tuple(_KNOWN_OPERATIONS_PARAMETER)) or matrix_indicator1 == 'NEW_OPERATION_STEP':
             if str(matrix_indicator_operator).replace(' ', '').startswith('SENDTIMETAG') and not str(matrix_indicator_operator).replace(' ', '').startswith('SENDTIMETAG_'):
                 # write into file
-                indents = write_SEND(f, ws_procedure, identifier_matrix, current_ID_cell_value,
+                indents = write_SEND(ctx, f, ws_procedure, identifier_matrix, current_ID_cell_value,
                                      tree_structure_params_repository,
                                      matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value,
                                      indents)
                 #TODO: ADD functionality for TC check of the command "INSERT OPERATION" -> see function write_CHECK_TCV()
             elif str(matrix_indicator_operator).replace(' ', '').startswith('SENDTIMETAG_'):
                 # write into file
-                write_SEND_(f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator,
+                write_SEND_(ctx, f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator,
                             current_ID_cell_value,
                             current_TYPE_cell_value, current_DESCRIPTION_cell_value,
                             current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure)
                 #TODO: ADD functionality for TC check of the command "INSERT OPERATION" -> see function write_CHECK_TCV()
             elif str(matrix_indicator_operator).replace(' ', '').startswith('SENDANDCHECKTCV') and not str(matrix_indicator_operator).replace(' ', '').startswith('SENDANDCHECKTCV_'):
                 # write into file
-                indents, flag_in_LEN_loop, last_row_LEN_loop = write_SEND_WITH_TCV(f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository,
+                indents, flag_in_LEN_loop, last_row_LEN_loop = write_SEND_WITH_TCV(ctx, f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository,
                            matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value, current_TYPE_cell_value, indents)
             elif not flag_in_LEN_loop and (str(matrix_indicator_operator).replace(' ', '').startswith('SENDANDCHECKTCV_') or (str(matrix_indicator_operator).replace(' ', '').startswith('SENDANDCHECKTCV') and str(current_OPERATIONS_cell_value).replace(' ','').startswith('LEN'))):
                 # write into file
-                indents = write_SEND_WITH_TCV_(f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value,
+                indents = write_SEND_WITH_TCV_(ctx, f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value,
                             current_TYPE_cell_value, current_DESCRIPTION_cell_value,
                             current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure)
             elif str(matrix_indicator_operator).replace(' ', '').startswith('SEND') and not str(matrix_indicator_operator).replace(' ', '').startswith('SEND_') and not str(matrix_indicator_operator).replace(' ', '').startswith('SENDANDCHECKTCV'):
                 # write into file
-                indents = write_SEND(f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository,
+                indents = write_SEND(ctx, f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository,
                            matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value, indents)
             elif not flag_in_LEN_loop and str(matrix_indicator_operator).replace(' ', '') == ('SEND_'):
                 # write into file
-                indents = write_SEND_(f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value,
+                indents = write_SEND_(ctx, f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value,
                             current_TYPE_cell_value, current_DESCRIPTION_cell_value,
                             current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure)
 #TODO: if ENG values are added, add functionality of differentiation for RAW and ENG values
             elif str(matrix_indicator_operator).replace(' ', '').startswith('CHECKTM'):
                 TC_commands_or_TM_params_starting_category, TC_TM_categories, MIB_TCs_or_TMs, TC_and_TM, SSM, current_ID_cell_value = check_if_TC_or_TM_ID_applicable_and_give_dependencies_in_repository_in_MATIS(
                     current_ID_cell_value, tree_structure_params_repository)
-                indents = write_CHECKTM(f, array_declared_variables, TC_TM_categories, MIB_TCs_or_TMs, TC_and_TM, SSM,
+                indents = write_CHECKTM(ctx, f, array_declared_variables, TC_TM_categories, MIB_TCs_or_TMs, TC_and_TM, SSM,
                               current_RAW_cell_value, current_ENG_cell_value, current_ID_cell_value,
                               current_DESCRIPTION_cell_value, current_TYPE_cell_value, indents)
             elif str(matrix_indicator_operator).replace(' ', '').startswith('DECLAREVARIABLES'):
@@ -551,19 +718,19 @@ def generate_code(ws_front_page, ws_procedure, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMM
             # elif str(matrix_indicator_operator).replace(' ', '').startswith('IF') and str(matrix_indicator_operator).replace(' ', '').endswith('_'):
             #     indents = write_IF_(f, indents, current_DESCRIPTION_cell_value)
             elif str(matrix_indicator_operator).replace(' ', '').startswith('IF') and str(matrix_indicator_operator).replace(' ', '').endswith('THEN'):
-                indents = write_IF(f, indents, current_OPERATIONS_cell_value)
+                indents = write_IF(ctx, f, indents, current_OPERATIONS_cell_value, matrix_row_number)
             elif str(matrix_indicator_operator).replace(' ', '').startswith('IF') and not str(matrix_indicator_operator).replace(' ', '').endswith('THEN'):
-                indents, matrix_iteration = write_IFIN(f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1)
+                indents, matrix_iteration = write_IFIN(ctx, f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1)
             elif str(matrix_indicator_operator).replace(' ', '').startswith('THEN') and not str(matrix_indicator_operator).replace(' ', '').endswith('RETURN'):
                 indents = write_THEN(f, indents, current_OPERATIONS_cell_value)
             elif str(matrix_indicator_operator).replace(' ', '').startswith('ELSEIF'):
-                indents, matrix_iteration = write_ELSEIF(f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1)
+                indents, matrix_iteration = write_ELSEIF(ctx, f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1)
             elif str(matrix_indicator_operator).replace(' ', '').startswith('ELSE'):
                 intents = write_ELSE(f, indents)
             elif str(matrix_indicator_operator).replace(' ', '').startswith('ENDIF'):
                 indents = write_END_IF(f, indents)
             elif str(current_OPERATIONS_cell_value).replace(' ', '').startswith('CALLPROCEDURE'):
-                indents = write_PROCEDURE(f, indents, identifier_matrix, matrix_iteration)
+                indents = write_PROCEDURE(ctx, f, indents, identifier_matrix, matrix_iteration)
                 flag_in_CALL_PROCEDURE = 1
             elif flag_in_CALL_PROCEDURE == 1 and str(current_OPERATIONS_cell_value).replace(' ', '').startswith('THENRETURN'):
                 flag_in_CALL_PROCEDURE = 0
@@ -572,40 +739,155 @@ def generate_code(ws_front_page, ws_procedure, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMM
             elif str(matrix_indicator_operator).replace(' ', '').startswith('CALLENGINEER'):
                 indents = write_CALLENGINEER(f, indents, matrix_iteration, identifier_matrix)
             elif str(matrix_indicator_operator).replace(' ', '').startswith('WAIT'):
-                indents = write_WAIT(f, indents, current_OPERATIONS_cell_value)
+                indents = write_WAIT(ctx, f, indents, current_OPERATIONS_cell_value, identifier_matrix, matrix_iteration, ws_procedure)
 #TODO: check if still needed
             elif flag_in_LEN_loop:
                 if last_row_LEN_loop == identifier_matrix[matrix_iteration][0]:
                     flag_in_LEN_loop = 0
             else:
-                print('STEP: ' + str(current_STEP_cell_value) + '; matrix_indicator_operator: ' + matrix_indicator_operator + '; OPERATION: ' +str(current_OPERATIONS_cell_value) + '; ID: ' + str(current_ID_cell_value))
+                ctx.report('UNHANDLED_OPERATION', 'STEP: ' + str(current_STEP_cell_value) + '; matrix_indicator_operator: ' + matrix_indicator_operator + '; OPERATION: ' +str(current_OPERATIONS_cell_value) + '; ID: ' + str(current_ID_cell_value), matrix_row_number)
             # end of functions for case switch
         elif flag_in_CALL_PROCEDURE == 1:
             # ignore everything inside 'CALL PROCEDURE'
             print('', end='')  # check if continue can be used without any bugs
         else:
             # write unknown stuff as a comment into file
-            _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS = write_else(f, identifier_matrix, current_STEP_cell_value, current_OPERATIONS_cell_value, matrix_iteration, current_ID_cell_value,
+            _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS = write_else(ctx, f, identifier_matrix, current_STEP_cell_value, current_OPERATIONS_cell_value, matrix_iteration, current_ID_cell_value,
                current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value,
                current_ENG_cell_value, current_UNIT_cell_value, matrix_indicator1, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS)
         matrix_iteration += 1
         matrix_indicator1_old = matrix_indicator1
         matrix_indicator_operator_old = matrix_indicator_operator
-    indents = indent_remove(indents)
-    write_into_f(f, indents, 'end step;\n')
-    indents = indent_remove(indents)
-    write_into_f(f, indents, 'end procedure\n')
-    return _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS, asdf_list
+    return TopicState(indents, matrix_iteration, matrix_indicator_operator_old, flag_in_SELECT_CASE, flag_in_CALL_PROCEDURE, flag_in_LEN_loop, last_row_LEN_loop, last_OPERATION_cell_value, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS)
+
+
+def generate_operation_topics_in_parallel(ctx, f, ws_procedure, identifier_matrix, array_declared_variables, state, executor):
+    '''
+    Writes the operation topics like generate_operation_topics(), but generates groups of consecutive topics in the
+    worker processes of the executor and stitches them together in order. The first group is generated in this process.
+    The workers do not know the state the previous group leaves behind, they start with the indentation at 0 (where the
+    indentation settles after the first SEND commands) and without open SELECT CASE or CALL PROCEDURE blocks. Topics
+    of a group whose actual start state is different are generated again here, until the state at the end of a topic
+    matches the one of the worker again. So the output is always the same as the serial one.
+    :param ctx, f, ws_procedure, identifier_matrix, array_declared_variables, state, executor:
+    :return state:
+    '''
+    topic_end_iterations = [matrix_iteration for matrix_iteration in range(state.matrix_iteration + 1, len(identifier_matrix) - 1) if identifier_matrix[matrix_iteration][1] == 'NEW_OPERATION_STEP'] + [len(identifier_matrix)]
+    start_iterations = get_topic_group_start_iterations(identifier_matrix, state.matrix_iteration, executor.jobs)
+    if len(start_iterations) <= 1:
+        return generate_operation_topics(ctx, f, ws_procedure, identifier_matrix, array_declared_variables, state, len(identifier_matrix))
+    groups = []
+    for start_iteration, end_iteration in zip(start_iterations[1:], start_iterations[2:] + [len(identifier_matrix)]):
+        for row_iteration in range(start_iteration - 1, 0, -1):
+            if identifier_matrix[row_iteration][1] == 'NEW_OPERATION_STEP':
+                last_OPERATION_cell_value = ws_procedure[ctx.OPERATIONS_COLUMN + str(identifier_matrix[row_iteration][0])].value
+                break
+        else:
+            last_OPERATION_cell_value = 0
+        start_state = TopicState(0, start_iteration, identifier_matrix[start_iteration - 1][2], 0, 0, 0, 0, last_OPERATION_cell_value, '')
+        end_iterations = [matrix_iteration for matrix_iteration in topic_end_iterations if start_iteration < matrix_iteration <= end_iteration]
+        groups.append((start_state, end_iterations, executor.submit(ws_procedure, identifier_matrix, array_declared_variables, ctx.workbook_name, start_state, end_iterations)))
+    state = generate_operation_topics(ctx, f, ws_procedure, identifier_matrix, array_declared_variables, state, start_iterations[1])
+    for expected_state, end_iterations, future in groups:
+        try:
+            topics = future.result()
+        except Exception:
+            # generated again below, which raises the error if it is not caused by a wrong start state
+            state = generate_operation_topics(ctx, f, ws_procedure, identifier_matrix, array_declared_variables, state, end_iterations[-1])
+            continue
+        for end_iteration, (text, end_state, diagnostics, log_text, row_offsets) in zip(end_iterations, topics):
+            if state == expected_state:
+                if ctx.row_offsets is not None:
+                    ctx.row_offsets.extend([(f.tell() + offset, row) for offset, row in row_offsets])
+                f.write(text)
+                ctx.diagnostics.extend(diagnostics)
+                if log_text:
+                    (ctx.log_stream or sys.stdout).write(log_text)
+                state = end_state
+            else:
+                state = generate_operation_topics(ctx, f, ws_procedure, identifier_matrix, array_declared_variables, state, end_iteration)
+            expected_state = end_state
+    return state
+
+
+def get_topic_group_start_iterations(identifier_matrix, first_iteration, jobs):
+    '''
+    Splits the operation topics into at most jobs groups of consecutive topics with about the same number of rows.
+    Groups have at least _MIN_MATRIX_ROWS_PER_TOPIC_GROUP rows and start at a NEW_OPERATION_STEP row (the last one, which
+    only closes the procedure, is not a start).
+    :param identifier_matrix, first_iteration, jobs:
+    :return start_iterations: indices of the identifier matrix, the first one is first_iteration
+    '''
+    number_of_groups = min(jobs, (len(identifier_matrix) - first_iteration) // _MIN_MATRIX_ROWS_PER_TOPIC_GROUP)
+    start_iterations = [first_iteration]
+    if number_of_groups <= 1:
+        return start_iterations
+    group_size = (len(identifier_matrix) - first_iteration) / number_of_groups
+    for matrix_iteration in range(first_iteration + 1, len(identifier_matrix) - 1):
+        if identifier_matrix[matrix_iteration][1] == 'NEW_OPERATION_STEP' and matrix_iteration - first_iteration >= len(start_iterations) * group_size:
+            start_iterations.append(matrix_iteration)
+            if len(start_iterations) == number_of_groups:
+                break
+    return start_iterations
+
+
+class TopicExecutor:
+    '''
+    Worker processes generating groups of operation topics of large workbooks, see generate_operation_topics_in_parallel().
+    The work sheets have to be WorkbookSnapshot work sheets, so they can be sent to the workers. The context is sent once
+    per worker, not with every group. The workers do not write any files, so output archive and journal are not sent.
+    :param ctx, jobs:
+    '''
+    def __init__(self, ctx, jobs):
+        self.jobs = jobs
+        worker_ctx = copy.copy(ctx)
+        worker_ctx.output_archive = None
+        worker_ctx.journal = None
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=initialize_topic_worker, initargs=(worker_ctx,))
+
+    def submit(self, ws_procedure, identifier_matrix, array_declared_variables, workbook_name, state, end_iterations):
+        return self.executor.submit(generate_topic_group, ws_procedure, identifier_matrix, array_declared_variables, workbook_name, state, end_iterations)
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+def initialize_topic_worker(ctx):
+    '''
+    Keeps the context in the worker process.
+    :param ctx:
+    :return :
+    '''
+    global _TOPIC_WORKER_CONTEXT
+    _TOPIC_WORKER_CONTEXT = ctx
+    return
+
+
+def generate_topic_group(ws_procedure, identifier_matrix, array_declared_variables, workbook_name, state, end_iterations):
+    '''
+    Generates one group of operation topics inside of a worker process, topic by topic.
+    :param ws_procedure, identifier_matrix, array_declared_variables, workbook_name, state:
+    :param end_iterations: end of each topic of the group
+    :return topics: list of (text, state, diagnostics, log_text, row_offsets) per topic
+    '''
+    topics = []
+    for end_iteration in end_iterations:
+        ctx = _TOPIC_WORKER_CONTEXT.for_workbook(workbook_name)
+        ctx.log_stream = io.StringIO()
+        f = io.StringIO()
+        state = generate_operation_topics(ctx, f, ws_procedure, identifier_matrix, array_declared_variables, state, end_iteration)
+        topics.append((f.getvalue(), state, ctx.diagnostics, ctx.log_stream.getvalue(), ctx.row_offsets))
+    return topics
 
 
 ###############################################
 ## WRITE FUNCTIONS
 ###############################################
 
-def write_SEND_WITH_TCV(f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository, matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value, current_TYPE_cell_value, indents):
+def write_SEND_WITH_TCV(ctx, f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository, matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value, current_TYPE_cell_value, indents):
     '''
     Converts and writes the SEND WITH TCV command into output file.
-    :param f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository, matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value, current_TYPE_cell_value, indents:
+    :param ctx, f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository, matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value, current_TYPE_cell_value, indents:
     :return indents, flag_in_LEN_loop, last_row_LEN_loop:
     '''
     matrix_iteration_ = matrix_iteration
@@ -618,18 +900,19 @@ def write_SEND_WITH_TCV(f, ws_procedure, identifier_matrix, current_ID_cell_valu
     if identifier_matrix[matrix_iteration + 1][2] != (matrix_indicator_operator + '_'):
         # support for "with directives" of TC commands (same was done for write_SEND_WITH_TCV_())
         row_number = int(identifier_matrix[matrix_iteration][0]) + 1
-        _, _, iteration_ID_cell_value, iteration_DESCRIPTION_cell_value, _, _, _, _ = get_current_row_cells(ws_procedure, row_number)
+        _, _, iteration_ID_cell_value, iteration_DESCRIPTION_cell_value, _, _, _, _ = get_current_row_cells(ctx, ws_procedure, row_number)
         if iteration_DESCRIPTION_cell_value != None:
             write_into_f(f, 0, '\t\t\t//{DESCRIPTION_cell}\n'.format(DESCRIPTION_cell=current_DESCRIPTION_cell_value))
             indents = indent_add(indents)
             write_into_f(f, indents, "with directives\n")
             indents = indent_add(indents)
             while iteration_ID_cell_value == None and iteration_DESCRIPTION_cell_value != None:
-                _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(ws_procedure, row_number)
+                _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(ctx, ws_procedure, row_number)
                 with_directives_string = get_with_directives_string(iteration_DESCRIPTION_cell_value, iteration_RAW_cell_value)
+                report_undefined_with_directive(ctx, with_directives_string, iteration_DESCRIPTION_cell_value, row_number)
                 write_into_f(f, indents, with_directives_string)
                 row_number += 1
-                _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(ws_procedure, row_number)
+                _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(ctx, ws_procedure, row_number)
                 if iteration_ID_cell_value == None and iteration_DESCRIPTION_cell_value != None:
                     write_into_f(f, 0, ",\n")
                 else:
@@ -667,16 +950,28 @@ def get_with_directives_string(DESCRIPTION_cell_value, RAW_cell_value):
     return with_directives_string
 
 
+def report_undefined_with_directive(ctx, with_directives_string, DESCRIPTION_cell_value, row_number):
+    '''
+    Reports a with directive the converter does not know, which is only written as comment (dropped by the lean output
+    profile).
+    :param ctx, with_directives_string, DESCRIPTION_cell_value, row_number:
+    :return :
+    '''
+    if with_directives_string.startswith('//COMMAND HAS NOT YET BEEN DEFINED'):
+        ctx.report('UNDEFINED_WITH_DIRECTIVE', 'With directive not known to the converter, written as comment: ' + str(DESCRIPTION_cell_value), row_number)
+    return
+
+
 def write_CHECK_TCV():
     #TODO: implement TCV check (see TT-CCS-N110)
     pass
 
 
-def write_SEND_WITH_TCV_(f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_TYPE_cell_value, current_DESCRIPTION_cell_value, current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure):
+def write_SEND_WITH_TCV_(ctx, f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_TYPE_cell_value, current_DESCRIPTION_cell_value, current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure):
     '''
    Converts and writes the SEND WITH TCV command's further inherent options/text
    into the output file.
-   :param f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_TYPE_cell_value, current_DESCRIPTION_cell_value, current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure:
+   :param ctx, f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_TYPE_cell_value, current_DESCRIPTION_cell_value, current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure:
    :return indents:
    '''
     current_ID_cell_value = check_if_ID_starts_with_digit(current_ID_cell_value)
@@ -695,7 +990,7 @@ def write_SEND_WITH_TCV_(f, identifier_matrix, matrix_indicator_operator_old, ma
         indents = indent_remove(indents)
         row_number = int(identifier_matrix[matrix_iteration][0]) + 1
         _, _, iteration_ID_cell_value, iteration_DESCRIPTION_cell_value, _, _, _, _ = get_current_row_cells(
-            ws_procedure, row_number)
+            ctx, ws_procedure, row_number)
         if iteration_DESCRIPTION_cell_value != None:
             write_into_f(f, 0, "\n")
             indents = indent_add(indents)
@@ -703,13 +998,14 @@ def write_SEND_WITH_TCV_(f, identifier_matrix, matrix_indicator_operator_old, ma
             indents = indent_add(indents)
             while iteration_ID_cell_value == None and iteration_DESCRIPTION_cell_value != None:
                 _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(
-                    ws_procedure, row_number)
+                    ctx, ws_procedure, row_number)
                 with_directives_string = get_with_directives_string(iteration_DESCRIPTION_cell_value,
                                                                     iteration_RAW_cell_value)
+                report_undefined_with_directive(ctx, with_directives_string, iteration_DESCRIPTION_cell_value, row_number)
                 write_into_f(f, indents, with_directives_string)
                 row_number += 1
                 _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(
-                    ws_procedure, row_number)
+                    ctx, ws_procedure, row_number)
                 if iteration_ID_cell_value == None and iteration_DESCRIPTION_cell_value != None:
                     write_into_f(f, 0, ",\n")
                 else:
@@ -722,10 +1018,10 @@ def write_SEND_WITH_TCV_(f, identifier_matrix, matrix_indicator_operator_old, ma
     return indents
 
 
-def write_SEND(f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository, matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value, indents):
+def write_SEND(ctx, f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository, matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value, indents):
     '''
     Converts and writes the SEND command into the output file.
-    :param f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository, matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value, indents:
+    :param ctx, f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_structure_params_repository, matrix_indicator_operator, matrix_iteration, current_DESCRIPTION_cell_value, indents:
     :return indents:
     '''
     TC_commands_or_TM_params_starting_category, TC_TM_categories, MIB_TCs_or_TMs, TC_and_TM, SSM, current_ID_cell_value = check_if_TC_or_TM_ID_applicable_and_give_dependencies_in_repository_in_MATIS(current_ID_cell_value, tree_structure_params_repository)
@@ -733,7 +1029,7 @@ def write_SEND(f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_s
     if identifier_matrix[matrix_iteration + 1][2] != (matrix_indicator_operator + '_'):
         # support for "with directives" of TC commands (same was done for write_SEND_WITH_TCV_())
         row_number = int(identifier_matrix[matrix_iteration][0]) + 1
-        _, _, iteration_ID_cell_value, iteration_DESCRIPTION_cell_value, _, _, _, _ = get_current_row_cells(ws_procedure, row_number)
+        _, _, iteration_ID_cell_value, iteration_DESCRIPTION_cell_value, _, _, _, _ = get_current_row_cells(ctx, ws_procedure, row_number)
         if iteration_DESCRIPTION_cell_value != None:
             write_into_f(f, 0, '\t\t\t//{DESCRIPTION_cell}\n'.format(DESCRIPTION_cell=current_DESCRIPTION_cell_value))
             indents = indent_add(indents)
@@ -741,13 +1037,14 @@ def write_SEND(f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_s
             indents = indent_add(indents)
             while iteration_ID_cell_value == None and iteration_DESCRIPTION_cell_value != None:
                 _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(
-                    ws_procedure, row_number)
+                    ctx, ws_procedure, row_number)
                 with_directives_string = get_with_directives_string(iteration_DESCRIPTION_cell_value,
                                                                     iteration_RAW_cell_value)
+                report_undefined_with_directive(ctx, with_directives_string, iteration_DESCRIPTION_cell_value, row_number)
                 write_into_f(f, indents, with_directives_string)
                 row_number += 1
                 _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(
-                    ws_procedure, row_number)
+                    ctx, ws_procedure, row_number)
                 if iteration_ID_cell_value == None and iteration_DESCRIPTION_cell_value != None:
                     write_into_f(f, 0, ",\n")
                 else:
@@ -766,11 +1063,11 @@ def write_SEND(f, ws_procedure, identifier_matrix, current_ID_cell_value, tree_s
     return indents
 
 
-def write_SEND_(f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_TYPE_cell_value, current_DESCRIPTION_cell_value, current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure):
+def write_SEND_(ctx, f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_TYPE_cell_value, current_DESCRIPTION_cell_value, current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure):
     '''
     Converts and writes the SEND command's further inherent options/text
     into the output file.
-    :param f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_TYPE_cell_value, current_DESCRIPTION_cell_value, current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure:
+    :param ctx, f, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_TYPE_cell_value, current_DESCRIPTION_cell_value, current_RAW_cell_value, current_ENG_cell_value, matrix_iteration, indents, ws_procedure:
     :return indents:
     '''
     current_ID_cell_value = check_if_ID_starts_with_digit(current_ID_cell_value)
@@ -790,20 +1087,21 @@ def write_SEND_(f, identifier_matrix, matrix_indicator_operator_old, matrix_indi
         # support for "with directives" of TC commands (same was done for write_SEND_WITH_TCV_())
         row_number = int(identifier_matrix[matrix_iteration][0]) + 1
         _, _, iteration_ID_cell_value, iteration_DESCRIPTION_cell_value, _, _, _, _ = get_current_row_cells(
-            ws_procedure, row_number)
+            ctx, ws_procedure, row_number)
         if iteration_DESCRIPTION_cell_value != None:
             indents = indent_add(indents)
             write_into_f(f, indents, "with directives\n")
             indents = indent_add(indents)
             while iteration_ID_cell_value == None and iteration_DESCRIPTION_cell_value != None:
                 _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(
-                    ws_procedure, row_number)
+                    ctx, ws_procedure, row_number)
                 with_directives_string = get_with_directives_string(iteration_DESCRIPTION_cell_value,
                                                                     iteration_RAW_cell_value)
+                report_undefined_with_directive(ctx, with_directives_string, iteration_DESCRIPTION_cell_value, row_number)
                 write_into_f(f, indents, with_directives_string)
                 row_number += 1
                 _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(
-                    ws_procedure, row_number)
+                    ctx, ws_procedure, row_number)
                 if iteration_ID_cell_value == None and iteration_DESCRIPTION_cell_value != None:
                     write_into_f(f, 0, ",\n")
                 else:
@@ -834,10 +1132,11 @@ def write_OPERATIONS_and_add_step(f, identifier_matrix, matrix_iteration, curren
     return indents
 
 
-def write_else(f, identifier_matrix, current_STEP_cell_value, current_OPERATIONS_cell_value, matrix_iteration, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value, matrix_indicator1, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS):
+def write_else(ctx, f, identifier_matrix, current_STEP_cell_value, current_OPERATIONS_cell_value, matrix_iteration, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value, matrix_indicator1, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS):
     '''
-    Writes else command into file.
-    :param f, identifier_matrix, current_STEP_cell_value, current_OPERATIONS_cell_value, matrix_iteration, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value, matrix_indicator1, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS:
+    Writes else command into file. Each unidentified row is also reported, since the lean output profile drops the
+    comments.
+    :param ctx, f, identifier_matrix, current_STEP_cell_value, current_OPERATIONS_cell_value, matrix_iteration, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value, matrix_indicator1, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS:
     :return _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS:
     '''
     mini_row_content_buffer = '// STEP: {STEP}; OPERATION: {OPERATION}; ID: {ID}; DESCRIPTION: {DESCRIPTION}; TYPE: {TYPE}; RAW: {RAW}; ENG: {ENG}; UNIT: {UNIT}\n'.format(
@@ -845,6 +1144,7 @@ def write_else(f, identifier_matrix, current_STEP_cell_value, current_OPERATIONS
         DESCRIPTION=current_DESCRIPTION_cell_value, TYPE=current_TYPE_cell_value, RAW=current_RAW_cell_value,
         ENG=current_ENG_cell_value, UNIT=current_UNIT_cell_value)
     _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS += mini_row_content_buffer.replace('\n', ' ') + '\n'
+    ctx.report('UNIDENTIFIED_ROWS', 'Row not identified, written as TODO comment: ' + mini_row_content_buffer[3:].replace('\n', ' ').strip(), identifier_matrix[matrix_iteration][0])
     if str(identifier_matrix[matrix_iteration + 1][2]).replace(' ', '').startswith(tuple(_KNOWN_OPERATIONS_PARAMETER)) or matrix_indicator1 == 'NEW_OPERATION_STEP':
         f.write('\n//////////////////////////////////////\n')
         f.write('// TODO: UNIDENTIFIED COMMENT(S)\n')
@@ -931,10 +1231,10 @@ def write_END_CASE(f, indents):
     return indents
 
 
-def write_IF(f, indents, current_OPERATIONS_cell_value):
+def write_IF(ctx, f, indents, current_OPERATIONS_cell_value, row_number):
     '''
     Writes IF command into file.
-    :param f, indents, current_OPERATIONS_cell_value:
+    :param ctx, f, indents, current_OPERATIONS_cell_value, row_number:
     :return indents:
     '''
     if_condition_content = str(current_OPERATIONS_cell_value).replace('$', '')
@@ -943,6 +1243,7 @@ def write_IF(f, indents, current_OPERATIONS_cell_value):
         write_into_f(f, indents, 'if ' + str(if_condition_content).replace('==', '=') + ' then\n')
         indents = indent_add(indents)
     except:
+        ctx.report('UNIDENTIFIED_ROWS', 'Could not resolve IF, written as TODO comment: ' + if_condition_content, row_number)
         f.write('\n//////////////////////////////////////\n')
         f.write('// TODO: UNIDENTIFIED COMMENT(S)\n')
         f.write('// WARNING: Could not resolve IF loop.\n // OPERATION: ' + if_condition_content)
@@ -951,10 +1252,10 @@ def write_IF(f, indents, current_OPERATIONS_cell_value):
     return indents
 
 
-def write_IFIN(f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1):
+def write_IFIN(ctx, f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1):
     '''
     Writes IFIN command into file.
-    :param f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1:
+    :param ctx, f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1:
     :return indents, matrix_iteration:
     '''
 # This function can only be used for comparison of the parameter given and the ID field -> procedure == 'compare if ID of param is the same as ID field'
@@ -967,11 +1268,11 @@ def write_IFIN(f, indents, current_OPERATIONS_cell_value, current_ID_cell_value,
         matrix_row_number = matrix_line[0]
         try:
             future_matrix_indicator1 = identifier_matrix[matrix_iteration + 1][1]
-            _, _, future_ID_cell_value, _, _, _, _, _ = get_current_row_cells(ws_procedure, identifier_matrix[matrix_iteration + 1][0])
+            _, _, future_ID_cell_value, _, _, _, _, _ = get_current_row_cells(ctx, ws_procedure, identifier_matrix[matrix_iteration + 1][0])
         except:
             future_ID_cell_value = ''
             print('', end='')
-        _, _, current_ID_cell_value, _, _, _, _, _ = get_current_row_cells(ws_procedure, matrix_row_number)
+        _, _, current_ID_cell_value, _, _, _, _, _ = get_current_row_cells(ctx, ws_procedure, matrix_row_number)
         write_into_f(f, 0, if_condition_content + ' = "' + current_ID_cell_value + '" ')
         if future_matrix_indicator1 == 'NEW_ID_FIELD' or future_matrix_indicator1 == 'FOLLOW_ID_FIELD':
             write_into_f(f, 0, 'or ')
@@ -981,7 +1282,7 @@ def write_IFIN(f, indents, current_OPERATIONS_cell_value, current_ID_cell_value,
         matrix_iteration += 1
     matrix_line = identifier_matrix[matrix_iteration]
     matrix_row_number = matrix_line[0]
-    _, _, current_ID_cell_value, _, _, _, _, _ = get_current_row_cells(ws_procedure, matrix_row_number)
+    _, _, current_ID_cell_value, _, _, _, _, _ = get_current_row_cells(ctx, ws_procedure, matrix_row_number)
     # write_into_f(f, indents, if_condition_content + ' = "' + current_ID_cell_value + '" then\n')
     matrix_iteration -= 1
     indents = indent_add(indents)
@@ -1000,10 +1301,10 @@ def write_THEN(f, indents, current_OPERATIONS_cell_value):
     return indents
 
 
-def write_ELSEIF(f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1):
+def write_ELSEIF(ctx, f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1):
     '''
     Writes ELSEIF command into file.
-    :param f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1:
+    :param ctx, f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1:
     :return indents, matrix_iteration:
     '''
     if_condition_content = str(current_OPERATIONS_cell_value).replace('$', '')
@@ -1018,8 +1319,9 @@ def write_ELSEIF(f, indents, current_OPERATIONS_cell_value, current_ID_cell_valu
             indents = indent_remove(indents)
             if_condition_content = if_condition_content.split('ELSE IF ', 1)[1].rsplit(' IN', 1)[0]
             write_into_f(f, indents, 'end if;\n')
-            indents, matrix_iteration = write_IFIN(f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1)
+            indents, matrix_iteration = write_IFIN(ctx, f, indents, current_OPERATIONS_cell_value, current_ID_cell_value, matrix_iteration, identifier_matrix, ws_procedure, future_matrix_indicator1)
         except:
+            ctx.report('UNIDENTIFIED_ROWS', 'Could not resolve ELSE IF, written as TODO comment: ' + if_condition_content, identifier_matrix[matrix_iteration][0])
             f.write('\n//////////////////////////////////////\n')
             f.write('// TODO: UNIDENTIFIED COMMENT(S)\n')
             f.write('// WARNING: Could not resolve IF loop.\n // OPERATION: ' + if_condition_content)
@@ -1050,13 +1352,14 @@ def write_DOLLAR(f, matrix_indicator_operator_old, matrix_indicator_operator, in
     return indents
 
 
-def write_PROCEDURE(f, indents, identifier_matrix, matrix_iteration_):
+def write_PROCEDURE(ctx, f, indents, identifier_matrix, matrix_iteration_):
     '''
     Writes PROCEDURE command into file.
-    :param f, indents, identifier_matrix, matrix_iteration_:
+    :param ctx, f, indents, identifier_matrix, matrix_iteration_:
     :return indents:
     '''
     procedure_PARAMS = []
+    row_number_CALL_PROCEDURE = identifier_matrix[matrix_iteration_][0]
     matrix_iteration_ += 1
     procedure_ID = identifier_matrix[matrix_iteration_][2]
     matrix_iteration_ += 1
@@ -1073,13 +1376,12 @@ def write_PROCEDURE(f, indents, identifier_matrix, matrix_iteration_):
             finally:
                 matrix_iteration_ += 1
     except IndexError:
-        print('An anomaly in corresponding Excel file has been found in: ' + _FILE_NAME)
-        print('Likely a \"THEN RETURN\" is missing')
+        ctx.report('MISSING_THEN_RETURN', 'An anomaly in corresponding Excel file has been found in: ' + str(ctx.workbook_name) + '\nLikely a \"THEN RETURN\" is missing', row_number_CALL_PROCEDURE, severity='error')
     write_into_f(f, indents, '// CALL PROCEDURE: {ID}\n'.format(ID=procedure_ID))
     write_into_f(f, indents, '// TITLE: {TITLE}\n'.format(TITLE=procedure_TITLE.replace('\n', ' ')))
     write_into_f(f, indents, '// REASON: {REASON}\n'.format(REASON=str(procedure_REASON).replace('\n', ' ').replace('  ', '')))
     procedure_name_with_underscores = str(procedure_ID).split('ID:')[1].replace(' ', '').replace('-', '_')
-    tree_structure_PROCEDURE_repository = create_PROCEDURE_dictionary()
+    tree_structure_PROCEDURE_repository = ctx.tree_structure_PROCEDURE_repository
     Procedure_ID, Routine_Category, Routines, Procedures, SSM, procedure_name_with_underscores = check_if_PROCEDURE_ID_applicable_and_give_dependencies_in_repository_in_MATIS(procedure_name_with_underscores, tree_structure_PROCEDURE_repository)
     write_into_f(f, indents, 'initiate and confirm {ID_of_procedure} of {ROUTINE_CATEGORY} of {ROUTINES} of {PROCEDURES} of {SSM}'.format(ID_of_procedure=procedure_name_with_underscores, ROUTINE_CATEGORY=Routine_Category, ROUTINES=Routines, PROCEDURES=Procedures, SSM=SSM))
 
@@ -1149,20 +1451,81 @@ def write_CALLENGINEER(f, indents, matrix_iteration, identifier_matrix):
     return indents
 
 
-def write_WAIT(f, indents, current_OPERATIONS_cell_value):
+def write_WAIT(ctx, f, indents, current_OPERATIONS_cell_value, identifier_matrix, matrix_iteration, ws_procedure):
     '''
     Writes WAIT command into file.
-    :param f, indents, current_OPERATIONS_cell_value:
+    With ctx.condition_waits a WAIT between a SEND and a CHECK TM waits until the checked TMs have their expected values,
+    the waiting time is kept as timeout.
+    :param ctx, f, indents, current_OPERATIONS_cell_value, identifier_matrix, matrix_iteration, ws_procedure:
     :return indents:
     '''
     try:
         waitingTime = str(current_OPERATIONS_cell_value).split('WAIT FOR ')[1].replace('$', '')
     except:
         waitingTime = "WAITING TIME HAS NOT BEEN FOUND, PLEASE COMPARE WITH EXCEL PROCEDURE"
-    write_into_f(f, indents, "wait for " + waitingTime + ";\n")
+        write_into_f(f, indents, "wait for " + waitingTime + ";\n")
+        return indents
+    wait_until_condition = get_WAIT_UNTIL_condition(ctx, ws_procedure, identifier_matrix, matrix_iteration)
+    if wait_until_condition != None:
+        write_into_f(f, indents, "wait until " + wait_until_condition + " timeout " + waitingTime + ";\n")
+    else:
+        write_into_f(f, indents, "wait for " + waitingTime + ";\n")
     return indents
 
 
+def get_WAIT_UNTIL_condition(ctx, ws_procedure, identifier_matrix, matrix_iteration):
+    '''
+    Returns the condition a WAIT row can wait for instead of its fixed waiting time (ctx.condition_waits): if the WAIT
+    follows a SEND and is followed by a CHECK TM, the expectations of the rows of that CHECK TM, which all have to be met.
+    CHECK TM assignments (@$) have no expectation and are left out.
+    :param ctx, ws_procedure, identifier_matrix, matrix_iteration:
+    :return condition: None if the WAIT is not part of such a pattern or nothing can be waited for
+    '''
+    if not ctx.condition_waits or matrix_iteration < 2 or matrix_iteration + 1 >= len(identifier_matrix):
+        return None
+    if not str(identifier_matrix[matrix_iteration - 1][2]).replace(' ', '').startswith('SEND'):
+        return None
+    conditions = []
+    iteration = matrix_iteration + 1
+    while iteration < len(identifier_matrix) and str(identifier_matrix[iteration][2]).replace(' ', '').startswith('CHECKTM') and (iteration == matrix_iteration + 1 or identifier_matrix[iteration][1] == 'FOLLOW_ID_FIELD'):
+        _, _, current_ID_cell_value, _, _, current_RAW_cell_value, current_ENG_cell_value, _ = get_current_row_cells(ctx, ws_procedure, identifier_matrix[iteration][0])
+        _, TC_TM_categories, MIB_TCs_or_TMs, TC_and_TM, SSM, current_ID_cell_value = check_if_TC_or_TM_ID_applicable_and_give_dependencies_in_repository_in_MATIS(
+            current_ID_cell_value, ctx.tree_structure_params_repository)
+        TM_value = 'raw_value of ' + str(current_ID_cell_value) + ' of ' + TC_TM_categories + ' of ' + MIB_TCs_or_TMs + ' of ' + TC_and_TM + ' of ' + SSM
+        condition = get_CHECKTM_expectation(TM_value, current_RAW_cell_value, current_ENG_cell_value)
+        if condition != None:
+            conditions.append(condition)
+        iteration += 1
+    if conditions == []:
+        return None
+    return ' and '.join(conditions)
+
+
+def get_CHECKTM_expectation(TM_value, current_RAW_cell_value, current_ENG_cell_value):
+    '''
+    Returns the condition a CHECK TM row expects of its TM, the cases are the ones of write_CHECKTM().
+    :param TM_value: PLUTO expression of the TM, e.g. raw_value of ... of SSM
+    :param current_RAW_cell_value, current_ENG_cell_value:
+    :return condition: None for assignments (@$)
+    '''
+    if str(current_ENG_cell_value) != 'None':
+        value_cell = str(current_ENG_cell_value)
+    else:
+        value_cell = str(current_RAW_cell_value)
+    if '@' in value_cell:
+        return None
+    elif '[' in value_cell:
+        arg_min = value_cell.split('[', 1)[1].rsplit(',', 1)[0].replace('$', '').strip()
+        arg_max = value_cell.split(']', 1)[0].rsplit(',', 1)[1].replace('$', '').strip()
+        return '(' + TM_value + ' >= ' + arg_min + ' and ' + TM_value + ' <= ' + arg_max + ')'
+    elif '{' in value_cell:
+        arg_array = value_cell.split('{', 1)[1].rsplit('}', 1)[0].split(',')
+        return '(' + ' or '.join(TM_value + ' = ' + arg.replace(' ', '').replace('$', '') for arg in arg_array) + ')'
+    elif any(x in value_cell for x in ['>', '>=', '<', '<=']):
+        return '(' + TM_value + ' ' + value_cell.replace('$', '').strip() + ')'
+    return '(' + TM_value + ' = ' + value_cell.replace('$', '').strip() + ')'
+
+
 def write_WITH_DIRECTIVES(f, indents, matrix_iteration, identifier_matrix):
     '''
     Ignores WITH DIRECTIVES command since it is already inside of other functions.
@@ -1252,32 +1615,18 @@ def alter_values_dependend_on_TYPE(current_TYPE_cell_value, current_RAW_cell_val
     :param current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value:
     :return current_RAW_cell_value:
     '''
-    if current_TYPE_cell_value == 'Boolean' and not '@$' in str(current_RAW_cell_value) and not '@$' in str(current_ENG_cell_value) and not '$' in str(current_RAW_cell_value):
+    if type_registry.get_scalar_type_of_PLUTO_type(current_TYPE_cell_value) == 'boolean' and not '@$' in str(current_RAW_cell_value) and not '@$' in str(current_ENG_cell_value) and not '$' in str(current_RAW_cell_value):
         current_RAW_cell_value = str(bool(current_RAW_cell_value)).upper()
     return current_RAW_cell_value
 
 
 def convert_TYPE_from_SCOS_to_MATIS(current_TYPE_cell_value):
     '''
-    Converts the SCOS types to MATIS types
+    Converts the SCOS types to MATIS types (see MATIS_type_registry.py)
     :param current_TYPE_cell_value:
     :return converted_TYPE_value:
     '''
-    if str(current_TYPE_cell_value).startswith('Enum') or str(current_TYPE_cell_value).startswith('U8') or str(current_TYPE_cell_value).startswith('U16') or str(current_TYPE_cell_value).startswith('U32') or str(current_TYPE_cell_value).startswith('U64'):
-        return 'Unsigned integer'
-    elif str(current_TYPE_cell_value).startswith('S8') or str(current_TYPE_cell_value).startswith('S16') or str(current_TYPE_cell_value).startswith('S32') or str(current_TYPE_cell_value).startswith('S64'):
-        return 'Signed integer'
-    elif str(current_TYPE_cell_value).startswith('Boolean'):
-        return 'Boolean'
-    elif str(current_TYPE_cell_value).startswith('Float'):
-        return 'Real'
-    elif str(current_TYPE_cell_value).startswith('Octet Str') or str(current_TYPE_cell_value).startswith('Char Str'):
-        return 'String'
-    elif str(current_TYPE_cell_value).startswith('Abs Time'):
-        return 'Absolute time'
-    elif str(current_TYPE_cell_value).startswith('Del Time'):
-        return 'Relative time'
-    return 'None'
+    return type_registry.get_PLUTO_type(current_TYPE_cell_value)
 
 
 def write_value_plus_add_type_and_description_as_comment(f, identifier_matrix, matrix_iteration, matrix_indicator_operator, current_TYPE_cell_value, current_DESCRIPTION_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_ID_cell_value, indents):
@@ -1355,10 +1704,10 @@ def check_TM_and_write_into_variable(f, TC_TM_categories, MIB_TCs_or_TMs, TC_and
     return indents
 
 
-def write_CHECKTM(f, array_declared_variables, TC_TM_categories, MIB_TCs_or_TMs, TC_and_TM, SSM, current_RAW_cell_value, current_ENG_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, indents):
+def write_CHECKTM(ctx, f, array_declared_variables, TC_TM_categories, MIB_TCs_or_TMs, TC_and_TM, SSM, current_RAW_cell_value, current_ENG_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, indents):
     '''
     Writes PLUTO code for CHECK TM command.
-    :param f, array_declared_variables, TC_TM_categories, MIB_TCs_or_TMs, TC_and_TM, SSM, current_RAW_cell_value, current_ENG_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, indents:
+    :param ctx, f, array_declared_variables, TC_TM_categories, MIB_TCs_or_TMs, TC_and_TM, SSM, current_RAW_cell_value, current_ENG_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, indents:
     :return indents:
     '''
     if str(current_ENG_cell_value) != 'None':
@@ -1369,6 +1718,12 @@ def write_CHECKTM(f, array_declared_variables, TC_TM_categories, MIB_TCs_or_TMs,
         value_cell = str(current_RAW_cell_value)
         flag_ENG_value = 0
         text_raw_value = 'raw_value of '
+    # range and enumeration checks read the TM once into a variable if ctx.sample_TM_once is set
+    TM_sample_variable = get_TM_sample_variable(ctx, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value)
+    TM_value = 'raw_value of ' + str(current_ID_cell_value) + ' of ' + TC_TM_categories + ' of ' + MIB_TCs_or_TMs + ' of ' + TC_and_TM + ' of ' + SSM
+    if TM_sample_variable != None:
+        TM_sample = TM_value
+        TM_value = TM_sample_variable
 #Start of cases
     #Value allocation
     if '@' in str(value_cell):
@@ -1385,13 +1740,14 @@ def write_CHECKTM(f, array_declared_variables, TC_TM_categories, MIB_TCs_or_TMs,
         arg_min = value_cell.split('[', 1)[1].rsplit(',', 1)[0].replace('$', '')
         arg_max = value_cell.split(']', 1)[0].rsplit(',', 1)[1].replace('$', '')
         write_into_f(f, indents, '// DESCRIPTION: {DESCRPITION}, ID: {ID}\n'.format(ID=current_ID_cell_value, DESCRPITION=current_DESCRIPTION_cell_value))
-        write_into_f(f, indents, 'if raw_value of ' + str(current_ID_cell_value) + ' of ' + TC_TM_categories + ' of ' + MIB_TCs_or_TMs + ' of ' + TC_and_TM + ' of ' + SSM + ' < ' + arg_min + ' or ' + 'raw_value of ' + str(current_ID_cell_value) + ' of ' + TC_TM_categories + ' of ' + MIB_TCs_or_TMs + ' of ' + TC_and_TM + ' of ' + SSM + ' > ' + arg_max + ' then\n')
+        if TM_sample_variable != None:
+            write_into_f(f, indents, TM_sample_variable + ' := ' + TM_sample + ';\n')
+        write_into_f(f, indents, 'if ' + TM_value + ' < ' + arg_min + ' or ' + TM_value + ' > ' + arg_max + ' then\n')
         indents = indent_add(indents)
         write_into_f(f, indents,
-                     'warn \"LOG: FAILURE; ID: {ID}, TYPE: {TYPE}, expected: {RAW}, got: \" + raw_value of {ID} of {TC_TM_categories} of {MIB_TCs_or_TMs} of {TC_and_TM} of {SSM} + \", DESCRIPTION: {DESCRIPTION}\";\n'.format(
+                     'warn \"LOG: FAILURE; ID: {ID}, TYPE: {TYPE}, expected: {RAW}, got: \" + {TM_VALUE} + \", DESCRIPTION: {DESCRIPTION}\";\n'.format(
                          ID=current_ID_cell_value, TYPE=current_TYPE_cell_value, RAW=current_RAW_cell_value,
-                         DESCRIPTION=current_DESCRIPTION_cell_value, TC_TM_categories=TC_TM_categories,
-                         MIB_TCs_or_TMs=MIB_TCs_or_TMs, TC_and_TM=TC_and_TM, SSM=SSM))
+                         DESCRIPTION=current_DESCRIPTION_cell_value, TM_VALUE=TM_value))
         indents = indent_remove(indents)
         write_into_f(f, indents, 'end if;\n')
         write_into_f(f, indents, '\n')
@@ -1399,22 +1755,22 @@ def write_CHECKTM(f, array_declared_variables, TC_TM_categories, MIB_TCs_or_TMs,
     elif '{' in str(value_cell):
         arg_array = value_cell.split('{', 1)[1].rsplit('}', 1)[0].split(',')
         write_into_f(f, indents, '// DESCRIPTION: {DESCRPITION}, ID: {ID}\n'.format(ID=current_ID_cell_value, DESCRPITION=current_DESCRIPTION_cell_value))
+        if TM_sample_variable != None:
+            write_into_f(f, indents, TM_sample_variable + ' := ' + TM_sample + ';\n')
         write_into_f(f, indents, 'if ')
         flag_arg_for_loop = 1
         for arg in arg_array:
             if flag_arg_for_loop == 1:
-                write_into_f(f, 0, 'raw_value of ' + str(
-                    current_ID_cell_value) + ' of ' + TC_TM_categories + ' of ' + MIB_TCs_or_TMs + ' of ' + TC_and_TM + ' of ' + SSM + ' != ' + arg.replace(' ', '').replace('$', ''))
+                write_into_f(f, 0, TM_value + ' != ' + arg.replace(' ', '').replace('$', ''))
                 flag_arg_for_loop = 0
             else:
-                write_into_f(f, 0, ' and raw_value of ' + str(current_ID_cell_value) + ' of ' + TC_TM_categories + ' of ' + MIB_TCs_or_TMs + ' of ' + TC_and_TM + ' of ' + SSM + ' != ' + arg.replace(' ', '').replace('$', ''))
+                write_into_f(f, 0, ' and ' + TM_value + ' != ' + arg.replace(' ', '').replace('$', ''))
         write_into_f(f, 0, ' then\n')
         indents = indent_add(indents)
         write_into_f(f, indents,
-                     'warn \"LOG: FAILURE; ID: {ID}, TYPE: {TYPE}, expected: {RAW}, got: \" + raw_value of {ID} of {TC_TM_categories} of {MIB_TCs_or_TMs} of {TC_and_TM} of {SSM} + \", DESCRIPTION: {DESCRIPTION}\";\n'.format(
+                     'warn \"LOG: FAILURE; ID: {ID}, TYPE: {TYPE}, expected: {RAW}, got: \" + {TM_VALUE} + \", DESCRIPTION: {DESCRIPTION}\";\n'.format(
                          ID=current_ID_cell_value, TYPE=current_TYPE_cell_value, RAW=current_RAW_cell_value,
-                         DESCRIPTION=current_DESCRIPTION_cell_value, TC_TM_categories=TC_TM_categories,
-                         MIB_TCs_or_TMs=MIB_TCs_or_TMs, TC_and_TM=TC_and_TM, SSM=SSM))
+                         DESCRIPTION=current_DESCRIPTION_cell_value, TM_VALUE=TM_value))
         indents = indent_remove(indents)
         write_into_f(f, indents, 'end if;\n\n')
     #Size comparison
@@ -1458,61 +1814,51 @@ def write_CHECKTM(f, array_declared_variables, TC_TM_categories, MIB_TCs_or_TMs,
     return indents
 
 
+def get_TM_sample_variable(ctx, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value):
+    '''
+    Returns the variable the TM of a CHECK TM range or enumeration check is read into once (ctx.sample_TM_once),
+    instead of reading the TM for every comparison and for the warning. The variable is declared by
+    write_DECLARE_TM_CHECK_VARIABLES() next to the VAL_ variables of CHECK TM assignments, but is a different one, so a
+    check between an assignment and the use of its value does not overwrite the value.
+    :param ctx, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value:
+    :return TM_sample_variable: e.g. SAMPLE_UI, None if the TM is read directly
+    '''
+    if not ctx.sample_TM_once or type_registry.get_TM_check_variable_index(current_TYPE_cell_value) is None:
+        return None
+    value_cell = str(current_ENG_cell_value) if str(current_ENG_cell_value) != 'None' else str(current_RAW_cell_value)
+    # same order of cases as in write_CHECKTM()
+    if '@' in value_cell or not ('[' in value_cell or '{' in value_cell):
+        return None
+    return 'SAMPLE_' + type_registry.get_variable_type_addon(current_TYPE_cell_value)
+
+
 def convert_variable_to_declared_variable_name_with_type(current_TYPE_cell_value, value_cell):
     '''
     Converts the variable VAL to its specific type with its name.
     :param current_TYPE_cell_value, value_cell:
     :return value_cell:
     '''
-    if current_TYPE_cell_value == 'Unsigned integer':
-        type_addon = 'UI'
-    elif current_TYPE_cell_value == 'Signed integer':
-        type_addon = 'SI'
-    elif current_TYPE_cell_value == 'Boolean':
-        type_addon = 'BOOL'
-    elif current_TYPE_cell_value == 'Real':
-        type_addon = 'REAL'
-    elif current_TYPE_cell_value == 'String':
-        type_addon = 'STR'
-    elif current_TYPE_cell_value == 'Absolute time':
-        type_addon = 'ABST'
-    elif current_TYPE_cell_value == 'Relative time':
-        type_addon = 'RELT'
-    else:
-        type_addon = ''
+    type_addon = type_registry.get_variable_type_addon(current_TYPE_cell_value)
     value_cell = 'VAL' + '_' + type_addon
     return value_cell
 
 
-def write_DECLARE_TM_CHECK_VARIABLES(f, array_declared_variables, flag_array_TM_CHECK_VARIABLES, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, matrix_iteration, indents, flag_some_variable_declared):
+def write_DECLARE_TM_CHECK_VARIABLES(f, array_declared_variables, flag_array_TM_CHECK_VARIABLES, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, matrix_iteration, indents, flag_some_variable_declared, variable_prefix='VAL'):
     '''
     Writes the variables into the DECLARE method in PLUTO where all variables
-    are declared and adds the correct name of VAL_... .
+    are declared and adds the correct name of VAL_... (or SAMPLE_..., see get_TM_sample_variable()).
     :param f, array_declared_variables, flag_array_TM_CHECK_VARIABLES, identifier_matrix, matrix_indicator_operator_old, matrix_indicator_operator, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, matrix_iteration, indents, flag_some_variable_declared:
+    :param variable_prefix: 'VAL' or 'SAMPLE', each prefix has its own flag array
     :return indents, flag_array_TM_CHECK_VARIABLES, array_declared_variables, flag_some_variable_declared:
     '''
     flag_array_TM_CHECK_VARIABLES_BUFFER = flag_array_TM_CHECK_VARIABLES.copy()
-    if str(current_TYPE_cell_value) == 'Unsigned integer' and flag_array_TM_CHECK_VARIABLES[0] == 1:
-        VAL_NAME = 'VAL_UI'
-        flag_array_TM_CHECK_VARIABLES[0] = 0
-    elif str(current_TYPE_cell_value) == 'Signed integer' and flag_array_TM_CHECK_VARIABLES[1] == 1:
-        VAL_NAME = 'VAL_SI'
-        flag_array_TM_CHECK_VARIABLES[1] = 0
-    elif str(current_TYPE_cell_value) == 'Boolean' and flag_array_TM_CHECK_VARIABLES[2] == 1:
-        VAL_NAME = 'VAL_BOOL'
-        flag_array_TM_CHECK_VARIABLES[2] = 0
-    elif str(current_TYPE_cell_value) == 'Real' and flag_array_TM_CHECK_VARIABLES[3] == 1:
-        VAL_NAME = 'VAL_REAL'
-        flag_array_TM_CHECK_VARIABLES[3] = 0
-    elif str(current_TYPE_cell_value) == 'String' and flag_array_TM_CHECK_VARIABLES[4] == 1:
-        VAL_NAME = 'VAL_STR'
-        flag_array_TM_CHECK_VARIABLES[4] = 0
-    elif str(current_TYPE_cell_value) == 'Absolute time' and flag_array_TM_CHECK_VARIABLES[5] == 1:
-        VAL_NAME = 'VAL_ABST'
-        flag_array_TM_CHECK_VARIABLES[5] = 0
-    elif str(current_TYPE_cell_value) == 'Relative time' and flag_array_TM_CHECK_VARIABLES[6] == 1:
-        VAL_NAME = 'VAL_RELT'
-        flag_array_TM_CHECK_VARIABLES[6] = 0
+    variable_index = type_registry.get_TM_check_variable_index(current_TYPE_cell_value)
+    if variable_index is not None and flag_array_TM_CHECK_VARIABLES[variable_index] == 1:
+        if variable_prefix == 'VAL':
+            VAL_NAME = convert_variable_to_declared_variable_name_with_type(current_TYPE_cell_value, 'VAL')
+        else:
+            VAL_NAME = variable_prefix + '_' + type_registry.get_variable_type_addon(current_TYPE_cell_value)
+        flag_array_TM_CHECK_VARIABLES[variable_index] = 0
     else:
         VAL_NAME = 'None'
     if flag_array_TM_CHECK_VARIABLES != flag_array_TM_CHECK_VARIABLES_BUFFER:
@@ -1526,15 +1872,15 @@ def write_DECLARE_TM_CHECK_VARIABLES(f, array_declared_variables, flag_array_TM_
     return indents, flag_array_TM_CHECK_VARIABLES, array_declared_variables, flag_some_variable_declared
 
 
-def create_identifier_matrix(ws_procedure):
+def create_identifier_matrix(ctx, ws_procedure):
     '''
     Creates identifier matrix which is used all over this code
-    :param ws_procedure:
+    :param ctx, ws_procedure:
     :return identifier_matrix:
     '''
     ## START MATRIX PREPARATIONS
     # get all rows_procedure with the start of a new operation
-    new_operation_row_numbers = get_operations_captions_row_number(ws_procedure)
+    new_operation_row_numbers = get_operations_captions_row_number(ctx, ws_procedure)
     # iterate through the different operation topics
     iterationNumber = 0
     identifier_matrix = []
@@ -1542,42 +1888,42 @@ def create_identifier_matrix(ws_procedure):
     for row in new_operation_row_numbers[:-1]:
         # add row to identify operation-topic switch
         current_OPERATIONS_cell_value = ws_procedure[
-            _OPERATIONS_COLUMN + '{rows_procedure}'.format(rows_procedure=row)].value
+            ctx.OPERATIONS_COLUMN + '{rows_procedure}'.format(rows_procedure=row)].value
         identifier_matrix.append([row, 'NEW_OPERATION_STEP', str(current_OPERATIONS_cell_value)])
         # print all operation topics
-        print(ws_procedure[_OPERATIONS_COLUMN + '{rows_procedure}'.format(rows_procedure=row)].value)
-        identifier_matrix = iterating_over_operation_topic(ws_procedure, new_operation_row_numbers, iterationNumber,
+        ctx.log(ws_procedure[ctx.OPERATIONS_COLUMN + '{rows_procedure}'.format(rows_procedure=row)].value)
+        identifier_matrix = iterating_over_operation_topic(ctx, ws_procedure, new_operation_row_numbers, iterationNumber,
                                                            identifier_matrix)
         iterationNumber += 1
     # add row to identify last operation-topic switch (end of procedure)
     identifier_matrix.append([new_operation_row_numbers[len(new_operation_row_numbers) - 1], 'NEW_OPERATION_STEP', str(
         ws_procedure[
-            _OPERATIONS_COLUMN + '{rows_procedure}'.format(rows_procedure=new_operation_row_numbers[-1])].value)])
-    print(ws_procedure[_OPERATIONS_COLUMN + '{rows_procedure}'.format(
+            ctx.OPERATIONS_COLUMN + '{rows_procedure}'.format(rows_procedure=new_operation_row_numbers[-1])].value)])
+    ctx.log(ws_procedure[ctx.OPERATIONS_COLUMN + '{rows_procedure}'.format(
         rows_procedure=new_operation_row_numbers[len(new_operation_row_numbers) - 1])].value)
     # identifier_matrix = generate_indicator_operator_identifier_matrix(ws_procedure, identifier_matrix)
     #print(identifier_matrix)
     return identifier_matrix
 
 
-def get_current_row_cells(ws_procedure, matrix_row_number):
+def get_current_row_cells(ctx, ws_procedure, matrix_row_number):
     '''
     Extracts the current row cell and outputs its values
-    :param ws_procedure, matrix_row_number:
+    :param ctx, ws_procedure, matrix_row_number:
     :return current_STEP_cell_value, current_OPERATIONS_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value:
     '''
-    current_STEP_cell_value = ws_procedure[_STEP_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
-    current_OPERATIONS_cell_value = ws_procedure[_OPERATIONS_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
-    current_ID_cell_value = ws_procedure[_ID_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
+    current_STEP_cell_value = ws_procedure[ctx.STEP_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
+    current_OPERATIONS_cell_value = ws_procedure[ctx.OPERATIONS_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
+    current_ID_cell_value = ws_procedure[ctx.ID_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
     current_ID_cell_value = check_if_ID_starts_with_digit(current_ID_cell_value)
-    current_DESCRIPTION_cell_value = ws_procedure[_DESCRIPTION_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
-    current_TYPE_cell_value = ws_procedure[_TYPE_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
+    current_DESCRIPTION_cell_value = ws_procedure[ctx.DESCRIPTION_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
+    current_TYPE_cell_value = ws_procedure[ctx.TYPE_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
     current_TYPE_cell_value = convert_TYPE_from_SCOS_to_MATIS(current_TYPE_cell_value)
-    current_ENG_cell_value = ws_procedure[_ENG_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
+    current_ENG_cell_value = ws_procedure[ctx.ENG_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
     current_ENG_cell_value = check_ENG_string_or_number(current_ENG_cell_value)
-    current_RAW_cell_value = ws_procedure[_RAW_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
+    current_RAW_cell_value = ws_procedure[ctx.RAW_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
     current_RAW_cell_value = alter_values_dependend_on_TYPE(current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value)
-    current_UNIT_cell_value = ws_procedure[_UNIT_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
+    current_UNIT_cell_value = ws_procedure[ctx.UNIT_COLUMN + '{rows}'.format(rows=matrix_row_number)].value
     return current_STEP_cell_value, current_OPERATIONS_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value
 
 
@@ -1616,14 +1962,10 @@ def write_into_f(f, number_of_indents, text):
 
 
 ## #############################################
-# START OF PROGRAMME
+# CONFIGURATION AND LIBRARY INTERFACE
 ## #############################################
 
-# GLOBAL VARIABLE DEFINITIONS
-# file names
-global _EXCEL_FILE_NAME # e.g. 'R-ADC-N210_Activate_cADCS_IDLE_mode_v4.xlsx'
-
-global _FILE_NAME #str(_EXCEL_FILE_NAME)[0:10].replace('-', '_')   #'R_ADC_N210_v4.txt'
+# GLOBAL VARIABLE DEFINITIONS (defaults of ConversionContext)
 # columns and cells for front page work sheet
 _PROCEDURE_TITLE_CELL = 'D3'
 _PROCEDURE_ID_CELL = 'D4'
@@ -1644,82 +1986,1106 @@ _UNIT_COLUMN = 'H'
 _DISPLAY_COLUMN = 'I'
 _CONFIRMATION_COLUMN = 'Q'
 _COLOR_DIVIDING_OPERATION_STEPS = 'FF92CDDC'
-# global variable for unknown commands and comments
-_BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS = ''
+# characters which are allowed in the generated PLUTO code
+_ALLOWED_CHARACTERS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ !\"#$%&\'()*+,-~./0123456789:;<=>?@[\\]^_\t\n`')
 # known operations which can be directly implemented into the code
 #TODO: ask Daniela for more known parameters
 _KNOWN_OPERATIONS_PARAMETER = ['SEND', 'SEND_', 'SENDTIMETAG', 'SENDTIMETAG_', 'SENDANDCHECKTCV', 'SENDANDCHECKTCV_', 'CHECKTM', 'CHECKTM_', 'DECLAREVARIABLES', 'SELECTCASE', 'CASE:', '$', 'CASEELSE', 'ENDCASE', 'IF', 'ELSEIF', 'ELSE', 'THEN', 'ENDIF', 'CALLPROCEDURE', 'THENRETURN', 'EXECUTEINTERMINALONMCSMACHINE', 'CALLENGINEER', 'WAIT']
 
-#TODO: Make it pretty
-# this function has been placed here, since it belongs here (flow vise)
-def main_function(input_file, output_file):
+# problem found while converting a workbook; row is the Excel row number or None
+Diagnostic = collections.namedtuple('Diagnostic', ['workbook', 'sheet', 'row', 'severity', 'code', 'message'])
+# loop variables of generate_operation_topics() between two rows of the identifier matrix
+TopicState = collections.namedtuple('TopicState', ['indents', 'matrix_iteration', 'matrix_indicator_operator_old', 'flag_in_SELECT_CASE', 'flag_in_CALL_PROCEDURE',
+                                                   'flag_in_LEN_loop', 'last_row_LEN_loop', 'last_OPERATION_cell_value', 'buffer_for_unknown_commands'])
+
+
+class ConversionContext:
+    '''
+    Holds the complete configuration of a conversion: layout of the Excel procedures, input and output folders and
+    console output. The dictionaries of the MATIS repository are built once and shared by all conversions that use
+    the context.
+    convert_procedure() works on a copy per workbook (see for_workbook()), which also collects the diagnostics, so one
+    context can be shared between threads.
+    :param excel_folder, output_folder, verbose, log_stream:
+    :param memory_ceiling_MB: if set, workbooks that would not fit below it are read with the streaming reader
+    :param sample_TM_once: CHECK TM range and enumeration checks read the TM once into a SAMPLE_ variable
+    :param condition_waits: a WAIT between a SEND and a CHECK TM waits until the expectations of the CHECK TM are met,
+                            with the waiting time as timeout
+    :param output_profile: 'verbose' (front page, descriptions and logging) or 'lean' (no comments and no CHECK TM
+                           logging, the Excel rows of the lines are written into a .map file next to the PLUTO file)
+    :param generation_date: generation time written into the header of the PLUTO files (see get_generation_date())
+    :param cache: Conversion_cache.ConversionCache, the PLUTO code of workbooks converted before with the same settings
+                  is taken from it
+    :param output_archive: Output_archive.OutputArchive the generated files are written into instead of the output
+                           folder, None: output folder
+    :param journal: Conversion_journal.ConversionJournal the workbooks are recorded in by convert_tree() once their
+                    output files are written, see get_journal()
+    :param layout: layout overrides e.g. ID_COLUMN='C'
+    '''
+    def __init__(self, excel_folder='Excel', output_folder='generated_MATIS_Files', verbose=False, log_stream=None, memory_ceiling_MB=None, sample_TM_once=False, condition_waits=False, output_profile='verbose',
+                 generation_date=None, cache=None, output_archive=None, journal=None, **layout):
+        self.excel_folder = excel_folder
+        self.output_folder = output_folder
+        self.verbose = verbose
+        self.log_stream = log_stream    # None means sys.stdout at the time of writing
+        self.memory_ceiling_MB = memory_ceiling_MB
+        self.sample_TM_once = sample_TM_once
+        self.condition_waits = condition_waits
+        if output_profile not in _OUTPUT_PROFILES:
+            raise ValueError('Unknown output profile: ' + str(output_profile))
+        self.output_profile = output_profile
+        self.generation_date = generation_date
+        self.cache = cache
+        self.output_archive = output_archive
+        self.journal = journal
+        # layout of the front page work sheet
+        self.PROCEDURE_TITLE_CELL = _PROCEDURE_TITLE_CELL
+        self.PROCEDURE_ID_CELL = _PROCEDURE_ID_CELL
+        self.START_COLUMN_FRONT_PAGE = _START_COLUMN_FRONT_PAGE
+        self.FILLER_COLUMN1_FRONT_PAGE = _FILLER_COLUMN1_FRONT_PAGE
+        self.FILLER_COLUMN2_FRONT_PAGE = _FILLER_COLUMN2_FRONT_PAGE
+        self.INFORMATION_COLUMN_FRONT_PAGE = _INFORMATION_COLUMN_FRONT_PAGE
+        self.END_COLUMN_FRONT_PAGE = _END_COLUMN_FRONT_PAGE
+        # layout of the procedure work sheet
+        self.STEP_COLUMN = _STEP_COLUMN
+        self.OPERATIONS_COLUMN = _OPERATIONS_COLUMN
+        self.ID_COLUMN = _ID_COLUMN
+        self.DESCRIPTION_COLUMN = _DESCRIPTION_COLUMN
+        self.TYPE_COLUMN = _TYPE_COLUMN
+        self.RAW_COLUMN = _RAW_COLUMN
+        self.ENG_COLUMN = _ENG_COLUMN
+        self.UNIT_COLUMN = _UNIT_COLUMN
+        self.DISPLAY_COLUMN = _DISPLAY_COLUMN
+        self.CONFIRMATION_COLUMN = _CONFIRMATION_COLUMN
+        self.COLOR_DIVIDING_OPERATION_STEPS = _COLOR_DIVIDING_OPERATION_STEPS
+        for name in layout:
+            if not hasattr(self, name) or not name.isupper():
+                raise TypeError('Unknown layout setting: ' + name)
+            setattr(self, name, layout[name])
+        # dictionaries for parameter and procedure assignment
+        self.tree_structure_params_repository = create_parameter_dictionary()
+        self.tree_structure_PROCEDURE_repository = create_PROCEDURE_dictionary()
+        # state of the currently converted workbook
+        self.workbook_name = None
+        self.diagnostics = []
+        self.row_offsets = None     # (offset in the generated text, Excel row) for the line map of the lean profile
+
+    def for_workbook(self, workbook_name):
+        '''
+        Returns a copy of the context for converting one workbook with its own list of diagnostics.
+        '''
+        ctx = copy.copy(self)
+        ctx.workbook_name = workbook_name
+        ctx.diagnostics = []
+        ctx.row_offsets = [] if ctx.output_profile == 'lean' else None
+        return ctx
+
+    def log(self, *values):
+        '''
+        Prints the values if the context is verbose.
+        '''
+        if self.verbose:
+            print(*values, file=self.log_stream or sys.stdout)
+
+    def report(self, code, message, row=None, sheet='Procedure', severity='warning'):
+        '''
+        Adds a diagnostic for the current workbook.
+        '''
+        self.diagnostics.append(Diagnostic(self.workbook_name, sheet, row, severity, code, message))
+        self.log(message)
+
+
+def get_default_context():
+    '''
+    Returns the context used by convert_procedure() if none is given. It is created once per process.
+    :return _DEFAULT_CONTEXT:
+    '''
+    global _DEFAULT_CONTEXT
+    if _DEFAULT_CONTEXT is None:
+        _DEFAULT_CONTEXT = ConversionContext()
+    return _DEFAULT_CONTEXT
+
+
+def load_workbook(workbook_source):
+    '''
+    Loads an Excel workbook from a path, bytes or a binary file object.
+    :param workbook_source:
+    :return wb:
+    '''
+    if isinstance(workbook_source, (bytes, bytearray)):
+        workbook_source = io.BytesIO(workbook_source)
+    return op.load_workbook(workbook_source, data_only=True)
+
+
+def read_workbook(ctx, workbook_source, file_name=None):
+    '''
+    Loads an Excel procedure in any format of Procedure_readers.py: xlsx with load_workbook(), the exported formats as
+    WorkbookSnapshot.
+    :param ctx, workbook_source: path, bytes or binary file object
+    :param file_name: name of the workbook, its extension determines the format instead of the path
+    :return wb:
+    '''
+    if file_name is None and isinstance(workbook_source, str):
+        file_name = workbook_source
+    workbook_source = procedure_readers.resolve_workbook_source(workbook_source)
+    if procedure_readers.get_workbook_format(workbook_source, file_name) == 'xlsx':
+        return load_workbook(workbook_source)
+    return procedure_readers.read_workbook(workbook_source, ctx.COLOR_DIVIDING_OPERATION_STEPS, file_name)
+
+
+# the work sheet snapshots are shared with the readers of the exported formats
+SnapshotCell = procedure_readers.SnapshotCell
+SnapshotFill = procedure_readers.SnapshotFill
+SnapshotColor = procedure_readers.SnapshotColor
+WorksheetSnapshot = procedure_readers.WorksheetSnapshot
+WorkbookSnapshot = procedure_readers.WorkbookSnapshot
+
+
+def read_workbook_snapshot(ctx, workbook_source, file_name=None):
+    '''
+    Streams the rows of the Front Page and Procedure work sheets with the read-only reader of openpyxl and keeps only the
+    values and fills of non-empty cells in the columns used by the converter. The workbook is closed afterwards.
+    Procedures in the exported formats are read by Procedure_readers.py.
+    :param ctx, workbook_source: path, bytes or binary file object
+    :param file_name: see read_workbook()
+    :return wb: WorkbookSnapshot
+    '''
+    if file_name is None and isinstance(workbook_source, str):
+        file_name = workbook_source
+    workbook_source = procedure_readers.resolve_workbook_source(workbook_source)
+    if procedure_readers.get_workbook_format(workbook_source, file_name) != 'xlsx':
+        return procedure_readers.read_workbook(workbook_source, ctx.COLOR_DIVIDING_OPERATION_STEPS, file_name)
+    if isinstance(workbook_source, (bytes, bytearray)):
+        workbook_source = io.BytesIO(workbook_source)
+    wb = op.load_workbook(workbook_source, read_only=True, data_only=True)
+    fills = {}
+    worksheets = {}
+    try:
+        for sheet_name, columns in [('Front Page', [ctx.START_COLUMN_FRONT_PAGE, ctx.FILLER_COLUMN1_FRONT_PAGE, ctx.FILLER_COLUMN2_FRONT_PAGE, ctx.INFORMATION_COLUMN_FRONT_PAGE, ctx.END_COLUMN_FRONT_PAGE]),
+                                    ('Procedure', [ctx.STEP_COLUMN, ctx.OPERATIONS_COLUMN, ctx.ID_COLUMN, ctx.DESCRIPTION_COLUMN, ctx.TYPE_COLUMN, ctx.RAW_COLUMN, ctx.ENG_COLUMN, ctx.UNIT_COLUMN, ctx.DISPLAY_COLUMN, ctx.CONFIRMATION_COLUMN])]:
+            column_letters = [op.utils.get_column_letter(column_index) for column_index in range(1, max(op.utils.column_index_from_string(column) for column in columns) + 1)]
+            cells = {}
+            for row_number, row in enumerate(wb[sheet_name].iter_rows(min_row=1, min_col=1, max_col=len(column_letters)), 1):
+                for column_letter, cell in zip(column_letters, row):
+                    color = cell.fill.start_color.index if cell.fill is not None else _EMPTY_SNAPSHOT_CELL.fill.start_color.index
+                    if cell.value is None and color == _EMPTY_SNAPSHOT_CELL.fill.start_color.index:
+                        continue
+                    if color not in fills:
+                        fills[color] = SnapshotFill(SnapshotColor(color))
+                    cells[column_letter + str(row_number)] = SnapshotCell(cell.value, fills[color])
+            worksheets[sheet_name] = WorksheetSnapshot(cells)
+    finally:
+        wb.close()
+    return WorkbookSnapshot(worksheets)
+
+
+def get_memory_usage_in_kB():
+    '''
+    Returns the current resident set size of the process in kB or None if it cannot be determined.
+    :return memory_usage_in_kB:
+    '''
+    try:
+        fi = open('/proc/self/statm', 'r')
+        memory_usage_in_kB = int(fi.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+        fi.close()
+        return memory_usage_in_kB
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss // 1024
+    except ImportError:
+        return None
+
+
+def get_peak_memory_in_kB():
     '''
-    Has all functionality of writing the PLUTO code and also checks the file for forbidden characters.
-    :param input_file, output_file:
+    Returns the peak resident set size of the process since the last reset_peak_memory() in kB or None.
+    :return peak_memory_in_kB:
+    '''
+    try:
+        fi = open('/proc/self/status', 'r')
+        for line in fi:
+            if line.startswith('VmHWM:'):
+                fi.close()
+                return int(line.split()[1])
+        fi.close()
+    except OSError:
+        pass
+    try:
+        import resource
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak_memory // 1024 if sys.platform == 'darwin' else peak_memory
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset // 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def reset_peak_memory():
+    '''
+    Resets the peak resident set size where the operating system allows it (Linux), so the peak of a single workbook
+    can be measured. Elsewhere the peak of the whole process is reported.
     :return :
     '''
+    try:
+        fo = open('/proc/self/clear_refs', 'w')
+        fo.write('5')
+        fo.close()
+    except OSError:
+        pass
+    return
+
+
+def get_uncompressed_worksheet_size_in_kB(workbook_source):
+    '''
+    Returns the uncompressed size of all work sheets of an xlsx file, which is a good measure for the memory needed
+    to load it completely.
+    :param workbook_source: path, bytes or binary file object
+    :return worksheet_size_in_kB:
+    '''
+    if isinstance(workbook_source, (bytes, bytearray)):
+        workbook_source = io.BytesIO(workbook_source)
+    archive = zipfile.ZipFile(workbook_source)
+    worksheet_size = sum(info.file_size for info in archive.infolist() if info.filename.startswith('xl/worksheets/') or info.filename == 'xl/sharedStrings.xml')
+    archive.close()
+    if hasattr(workbook_source, 'seek'):
+        workbook_source.seek(0)
+    return worksheet_size // 1024
+
+
+def load_workbook_within_memory_ceiling(ctx, workbook_source):
+    '''
+    Loads the workbook completely, unless this would exceed the memory ceiling of the context. Then the streaming
+    reader is used instead.
+    :param ctx, workbook_source: path, bytes or binary file object
+    :return wb, reader: reader is 'full' or 'streaming', or the format of an exported procedure
+    '''
+    workbook_format = procedure_readers.get_workbook_format(workbook_source)
+    if workbook_format != 'xlsx':
+        return procedure_readers.read_workbook(procedure_readers.resolve_workbook_source(workbook_source), ctx.COLOR_DIVIDING_OPERATION_STEPS, workbook_source), workbook_format
+    workbook_source = procedure_readers.resolve_workbook_source(workbook_source)
+    if ctx.memory_ceiling_MB is not None:
+        estimated_memory_in_kB = (get_memory_usage_in_kB() or 0) + _FULL_LOAD_MEMORY_FACTOR * get_uncompressed_worksheet_size_in_kB(workbook_source)
+        if estimated_memory_in_kB > ctx.memory_ceiling_MB * 1024:
+            return read_workbook_snapshot(ctx, workbook_source), 'streaming'
+    return load_workbook(workbook_source), 'full'
+
+
+def convert_procedure(workbook_source, context=None, workbook_name=None):
+    '''
+    Converts one Excel procedure into PLUTO code. Nothing is written to the file system.
+    :param workbook_source: path, bytes or binary file object of the Excel procedure (or an exported procedure, see
+                            read_workbook())
+    :param context: ConversionContext, the default context is used if None
+    :param workbook_name: name of the workbook in diagnostics, the path is used if None
+    :return pluto_text, diagnostics:
+    '''
+    if workbook_name is None and isinstance(workbook_source, str):
+        workbook_name = workbook_source
     ## START: PYTHON
     # load excel f
-    wb = op.load_workbook(str(_EXCEL_FILE_NAME), data_only=True)
-    #  open certain sheet (tab) in excel f
-    ws_front_page = wb['Front Page']
-    ws_procedure = wb['Procedure']
-    write_DATE_of_autogeneration_and_initials()
-    write_front_page_documentation_as_comment_into_f(ws_front_page) # also closes and opens the file ->therefore new f (file-pointer)
-    print('operations: ', get_operations_captions_row_number(ws_procedure))
-    identifier_matrix = create_identifier_matrix(ws_procedure)
-    print(identifier_matrix)
-    ## CREATE DICTIONARY FOR PARAMETER ASSIGNMENT
-    tree_structure_params_repository = create_parameter_dictionary()
-    ## GENERATE PLUTO CODE
-    generate_code(ws_front_page, ws_procedure, _BUFFER_FOR_TEXT_FOR_UNKNOWN_COMMANDS, identifier_matrix, tree_structure_params_repository, asdf_list)
+    return convert_workbook(read_workbook(context if context is not None else get_default_context(), workbook_source, workbook_name), context, workbook_name)
+
+
+def convert_workbook(wb, context=None, workbook_name=None, executor=None):
+    '''
+    Converts an already loaded Excel procedure into PLUTO code and closes the workbook.
+    :param wb: openpyxl workbook
+    :param context: ConversionContext, the default context is used if None
+    :param workbook_name: name of the workbook in diagnostics
+    :param executor: TopicExecutor to generate large workbooks in parallel groups of operation topics, wb has to be a
+                     WorkbookSnapshot then
+    :return pluto_text, diagnostics:
+    '''
+    pluto_text, line_map, diagnostics = convert_workbook_with_line_map(wb, context, workbook_name, executor)
+    return pluto_text, diagnostics
+
+
+def convert_workbook_with_line_map(wb, context=None, workbook_name=None, executor=None):
+    '''
+    Like convert_workbook(), also returns the Excel rows of the PLUTO lines in the lean output profile.
+    :param wb, context, workbook_name, executor: see convert_workbook()
+    :return pluto_text, line_map, diagnostics: line_map is None in the verbose profile, otherwise a dictionary with the
+                                               workbook, the work sheet and the [first line, last line, Excel row] lines
+    '''
+    if context is None:
+        context = get_default_context()
+    ctx = context.for_workbook(workbook_name)
+    try:
+        #  open certain sheet (tab) in excel f
+        ws_front_page = wb['Front Page']
+        ws_procedure = wb['Procedure']
+        f = io.StringIO()
+        if ctx.output_profile == 'verbose':
+            write_DATE_of_autogeneration_and_initials(f, get_generation_date(ctx))
+            write_front_page_documentation_as_comment_into_f(ctx, f, ws_front_page)
+        if ctx.verbose:
+            ctx.log('operations: ', get_operations_captions_row_number(ctx, ws_procedure))
+        identifier_matrix = create_identifier_matrix(ctx, ws_procedure)
+        ctx.log(identifier_matrix)
+        ## GENERATE PLUTO CODE
+        generate_code(ctx, f, ws_front_page, ws_procedure, identifier_matrix, executor)
+    finally:
+        wb.close()
+    if ctx.output_profile == 'lean':
+        pluto_text, lines = get_lean_text_and_line_map(f.getvalue(), ctx.row_offsets)
+        return pluto_text, {'workbook': workbook_name, 'sheet': 'Procedure', 'lines': lines}, ctx.diagnostics
     ## DELETE FORBIDDEN CHARACTERS
-    check_file_for_forbidden_characters(_FILE_NAME)
-    check_file_for_empty_steps_and_delete(_FILE_NAME)
-    #print(identifier_matrix)
+    pluto_text = check_file_for_forbidden_characters(f.getvalue())
+    pluto_text = check_file_for_empty_steps_and_delete(pluto_text)
+    return pluto_text, None, ctx.diagnostics
+
+
+def convert_file(ctx, input_file_path, convert):
+    '''
+    Converts one Excel procedure, or takes the result from the conversion cache of the context.
+    :param ctx, input_file_path:
+    :param convert: function returning pluto_text, line_map, diagnostics of the path (without cache) or the bytes of
+                    the workbook
+    :return pluto_text, line_map, diagnostics:
+    '''
+    if ctx.cache is None:
+        return convert(input_file_path)
+    workbook_bytes = procedure_readers.read_workbook_bytes(input_file_path)
+    cache_key = get_cache_key(ctx, workbook_bytes)
+    result = load_cached_conversion(ctx, cache_key, input_file_path)
+    if result is None:
+        result = convert(workbook_bytes)
+        store_cached_conversion(ctx, cache_key, result)
+    return result
+
+
+def get_cache_key(ctx, workbook_bytes):
+    '''
+    Returns the key of the PLUTO code of a workbook in the conversion cache: the workbook, this converter and
+    everything of the context that changes the PLUTO code.
+    :param ctx, workbook_bytes:
+    :return cache_key:
+    '''
+    settings = get_conversion_settings(ctx)
+    settings['generation_date'] = get_generation_date(ctx)
+    return ctx.cache.get_key(workbook_bytes, get_converter_source_file_paths(), settings)
+
+
+def get_conversion_settings(ctx):
+    '''
+    Returns everything of the context that changes the PLUTO code, except the generation date.
+    :param ctx:
+    :return settings: json serializable dictionary
+    '''
+    return {'layout': conversion_cache.get_layout_settings(ctx),
+            'sample_TM_once': ctx.sample_TM_once,
+            'condition_waits': ctx.condition_waits,
+            'output_profile': ctx.output_profile,
+            'repositories': [ctx.tree_structure_params_repository, ctx.tree_structure_PROCEDURE_repository]}
+
+
+def get_converter_source_file_paths():
+    '''
+    Returns the source files of the converter, changing one of them changes the version of the converter.
+    :return source_file_paths:
+    '''
+    return [os.path.abspath(__file__), os.path.abspath(type_registry.__file__), os.path.abspath(procedure_readers.__file__)]
+
+
+def get_journal(ctx, resume=False):
+    '''
+    Returns the journal of a batch conversion into the output folder of the context. Its settings key covers the
+    converter version and the conversion settings, not the generation date, so a conversion can be resumed later on.
+    :param ctx:
+    :param resume: continue the journal of an interrupted conversion, ValueError if it was written with other settings
+    :return journal: Conversion_journal.ConversionJournal
+    '''
+    settings_key = conversion_cache.get_source_version(get_converter_source_file_paths()) + ':' + hashlib.sha256(json.dumps(get_conversion_settings(ctx), sort_keys=True).encode('utf-8')).hexdigest()
+    return conversion_journal.ConversionJournal(conversion_journal.get_journal_file_path(ctx.output_folder), settings_key, resume)
+
+
+def load_cached_conversion(ctx, cache_key, workbook_name):
+    '''
+    Returns the cached conversion of a workbook, with workbook_name in its diagnostics and line map.
+    :param ctx, cache_key, workbook_name:
+    :return pluto_text, line_map, diagnostics: None if not cached
+    '''
+    value = ctx.cache.load(cache_key)
+    if value is None:
+        return None
+    ctx.log('cached: ', workbook_name)
+    pluto_text, line_map, diagnostics = value
+    if line_map is not None:
+        line_map['workbook'] = workbook_name
+    return pluto_text, line_map, [Diagnostic(workbook_name, *diagnostic[1:]) for diagnostic in diagnostics]
+
+
+def store_cached_conversion(ctx, cache_key, result):
+    '''
+    Stores the conversion of a workbook in the conversion cache.
+    :param ctx, cache_key:
+    :param result: pluto_text, line_map, diagnostics
+    :return :
+    '''
+    pluto_text, line_map, diagnostics = result
+    ctx.cache.store(cache_key, [pluto_text, line_map, [list(diagnostic) for diagnostic in diagnostics]])
+    return
+
+
+def format_diagnostic(diagnostic):
+    '''
+    Returns a diagnostic as one line of text: <workbook>:<sheet>:<row>: <severity>: <code>: <message>
+    :param diagnostic:
+    :return text:
+    '''
+    return '{WORKBOOK}:{SHEET}:{ROW}: {SEVERITY}: {CODE}: {MESSAGE}'.format(
+        WORKBOOK=diagnostic.workbook, SHEET=diagnostic.sheet or '', ROW=diagnostic.row if diagnostic.row is not None else '',
+        SEVERITY=diagnostic.severity, CODE=diagnostic.code, MESSAGE=str(diagnostic.message).replace('\n', ' '))
+
+
+## #############################################
+# LINT (extraction and classification only)
+## #############################################
+
+def lint_workbook(wb, context=None, workbook_name=None):
+    '''
+    Runs only the extraction and classification of a workbook and returns the problems the code generation would run
+    into, without generating any code. The workbook is closed afterwards.
+    :param wb: openpyxl workbook or WorkbookSnapshot
+    :param context: ConversionContext, the default context is used if None
+    :param workbook_name: name of the workbook in diagnostics
+    :return diagnostics:
+    '''
+    if context is None:
+        context = get_default_context()
+    ctx = context.for_workbook(workbook_name)
+    try:
+        ws_procedure = wb['Procedure']
+        if len(get_operations_captions_row_number(ctx, ws_procedure)) == 0:
+            ctx.report('NO_OPERATION_STEPS', 'No operation step dividers (fill {COLOR}) found in column {COLUMN}'.format(COLOR=ctx.COLOR_DIVIDING_OPERATION_STEPS, COLUMN=ctx.STEP_COLUMN), severity='error')
+            return ctx.diagnostics
+        identifier_matrix = create_identifier_matrix(ctx, ws_procedure)
+        lint_identifier_matrix(ctx, ws_procedure, identifier_matrix)
+    finally:
+        wb.close()
+    return ctx.diagnostics
+
+
+def lint_identifier_matrix(ctx, ws_procedure, identifier_matrix):
+    '''
+    Walks through the identifier matrix the same way generate_code() does and reports unknown TC/TM and procedure IDs,
+    CALL PROCEDUREs without THEN RETURN, undefined with directives and WAITs without waiting time.
+    :param ctx, ws_procedure, identifier_matrix:
+    :return :
+    '''
+    for matrix_iteration in range(1, len(identifier_matrix)):
+        matrix_row_number, matrix_indicator1, matrix_indicator_operator = identifier_matrix[matrix_iteration]
+        operator = str(matrix_indicator_operator).replace(' ', '')
+        try:
+            next_matrix_indicator_operator = identifier_matrix[matrix_iteration + 1][2]
+        except IndexError:
+            next_matrix_indicator_operator = None
+        if not operator.startswith(tuple(_KNOWN_OPERATIONS_PARAMETER)) or matrix_indicator1 == 'NEW_OPERATION_STEP':
+            continue
+        current_STEP_cell_value, current_OPERATIONS_cell_value, current_ID_cell_value, current_DESCRIPTION_cell_value, current_TYPE_cell_value, current_RAW_cell_value, current_ENG_cell_value, current_UNIT_cell_value = get_current_row_cells(ctx, ws_procedure, matrix_row_number)
+        if operator.startswith('SEND'):
+            if not operator.endswith('_'):
+                lint_TC_or_TM_ID(ctx, current_ID_cell_value, matrix_row_number)
+                if next_matrix_indicator_operator != matrix_indicator_operator + '_':
+                    lint_with_directives(ctx, ws_procedure, matrix_row_number + 1)
+            elif next_matrix_indicator_operator != matrix_indicator_operator:
+                lint_with_directives(ctx, ws_procedure, matrix_row_number + 1)
+        elif operator.startswith('CHECKTM'):
+            lint_TC_or_TM_ID(ctx, current_ID_cell_value, matrix_row_number)
+        elif operator.startswith(('DECLAREVARIABLES', 'SELECTCASE', 'CASE:', '$', 'CASEELSE:', 'ENDCASE', 'IF')):
+            continue
+        elif operator.startswith('THEN') and not operator.endswith('RETURN'):
+            # write_THEN() stops the whole conversion on these
+            if 'THEN ' not in str(current_OPERATIONS_cell_value):
+                ctx.report('MALFORMED_THEN', 'No content found after THEN in: ' + str(current_OPERATIONS_cell_value), matrix_row_number, severity='error')
+        elif operator.startswith(('ELSEIF', 'ELSE', 'ENDIF')):
+            continue
+        elif str(current_OPERATIONS_cell_value).replace(' ', '').startswith('CALLPROCEDURE'):
+            lint_CALL_PROCEDURE(ctx, identifier_matrix, matrix_iteration)
+        elif operator.startswith('WAIT') and 'WAIT FOR ' not in str(current_OPERATIONS_cell_value):
+            ctx.report('WAITING_TIME_NOT_FOUND', 'No "WAIT FOR <time>" found in: ' + str(current_OPERATIONS_cell_value), matrix_row_number)
+    return
+
+
+def lint_TC_or_TM_ID(ctx, current_ID_cell_value, row_number):
+    '''
+    Reports TC and TM IDs which are not inside of the MATIS repository.
+    :param ctx, current_ID_cell_value, row_number:
+    :return :
+    '''
+    _, TC_TM_categories, _, _, _, _ = check_if_TC_or_TM_ID_applicable_and_give_dependencies_in_repository_in_MATIS(current_ID_cell_value, ctx.tree_structure_params_repository)
+    if TC_TM_categories == 'not inside':
+        ctx.report('UNKNOWN_TC_TM_ID', 'ID not inside of the MATIS repository: ' + str(current_ID_cell_value), row_number)
+    return
+
+
+def lint_with_directives(ctx, ws_procedure, row_number):
+    '''
+    Reports with directives following a TC which are not known to the converter.
+    :param ctx, ws_procedure, row_number: first row after the TC
+    :return :
+    '''
+    _, _, iteration_ID_cell_value, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(ctx, ws_procedure, row_number)
+    while iteration_ID_cell_value == None and iteration_DESCRIPTION_cell_value != None:
+        if get_with_directives_string(iteration_DESCRIPTION_cell_value, iteration_RAW_cell_value).startswith('//COMMAND HAS NOT YET BEEN DEFINED'):
+            ctx.report('UNDEFINED_WITH_DIRECTIVE', 'With directive not known to the converter: ' + str(iteration_DESCRIPTION_cell_value), row_number)
+        row_number += 1
+        _, _, _, iteration_DESCRIPTION_cell_value, _, iteration_RAW_cell_value, _, _ = get_current_row_cells(ctx, ws_procedure, row_number)
+    return
+
+
+def lint_CALL_PROCEDURE(ctx, identifier_matrix, matrix_iteration_):
+    '''
+    Checks a CALL PROCEDURE block the way write_PROCEDURE() reads it.
+    :param ctx, identifier_matrix, matrix_iteration_:
+    :return :
+    '''
+    row_number_CALL_PROCEDURE = identifier_matrix[matrix_iteration_][0]
+    try:
+        procedure_ID = identifier_matrix[matrix_iteration_ + 1][2]
+        str(identifier_matrix[matrix_iteration_ + 2][2]).split('TITLE:')[1]
+        str(identifier_matrix[matrix_iteration_ + 3][2]).split('REASON:')[1]
+        procedure_name_with_underscores = str(procedure_ID).split('ID:')[1].replace(' ', '').replace('-', '_')
+    except IndexError:
+        ctx.report('MALFORMED_CALL_PROCEDURE', 'CALL PROCEDURE needs the rows "ID:", "TITLE:" and "REASON:"', row_number_CALL_PROCEDURE, severity='error')
+        return
+    _, Routine_Category, _, _, _, _ = check_if_PROCEDURE_ID_applicable_and_give_dependencies_in_repository_in_MATIS(procedure_name_with_underscores, ctx.tree_structure_PROCEDURE_repository)
+    if Routine_Category == 'not inside':
+        ctx.report('UNKNOWN_PROCEDURE_ID', 'Procedure not inside of the MATIS repository: ' + procedure_name_with_underscores, row_number_CALL_PROCEDURE)
+    matrix_iteration_ += 5
+    while matrix_iteration_ < len(identifier_matrix):
+        if str(identifier_matrix[matrix_iteration_][2]).replace(' ', '').startswith('THENRETURN'):
+            return
+        matrix_iteration_ += 1
+    ctx.report('MISSING_THEN_RETURN', 'Likely a "THEN RETURN" is missing after CALL PROCEDURE', row_number_CALL_PROCEDURE, severity='error')
     return
 
-asdf_list = []
-rootdir = os.getcwd()
-list_of_excelsheet_paths =[]
-for subdir, dirs, files in os.walk(rootdir + '\\Excel\\'):
-    for file in files:
-        #print os.path.join(subdir, file)
-        filepath = subdir + os.sep + file
-        if filepath.endswith(".xlsx") and '\\old\\' not in filepath and '~' not in filepath:
-            list_of_excelsheet_paths.append(str(filepath).split('\\Excel\\', 1)[1])
-print(list_of_excelsheet_paths)
-iteration = 0
-shutil.rmtree('generated_MATIS_Files')
-os.makedirs('generated_MATIS_Files')
-for file in list_of_excelsheet_paths:
-    iteration += 1
-    input_file_path = 'Excel\\' + file
-    directory = 'generated_MATIS_Files\\' + file.rsplit('\\', 1)[0]
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-    #myfunction('Excel\\' + str(file), output_location)
-    output_file_ID_name = file.rsplit('\\', 1)[1].split('-', 1)
+
+def lint_file(ctx, input_file_path):
+    '''
+    Reads one Excel procedure with the streaming reader and lints it. Runs inside of the worker processes of lint_tree().
+    :param ctx, input_file_path:
+    :return diagnostics:
+    '''
+    try:
+        wb = read_workbook_snapshot(ctx, input_file_path)
+    except Exception as error:
+        return [Diagnostic(input_file_path, None, None, 'error', 'UNREADABLE_WORKBOOK', '{TYPE}: {ERROR}'.format(TYPE=type(error).__name__, ERROR=error))]
+    return lint_workbook(wb, ctx, input_file_path)
+
+
+def lint_tree(ctx, jobs=None):
+    '''
+    Lints all Excel procedures of the Excel folder in parallel processes. Nothing is written.
+    :param ctx, jobs: number of processes, all processors if None
+    :return diagnostics: in the order of the workbooks
+    '''
+    input_file_paths = [os.path.join(ctx.excel_folder, file) for file in get_list_of_excelsheet_paths(ctx.excel_folder)]
+    diagnostics = []
+    if jobs == 1 or len(input_file_paths) <= 1:
+        for input_file_path in input_file_paths:
+            diagnostics.extend(lint_file(ctx, input_file_path))
+        return diagnostics
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+    for diagnostics_of_file in executor.map(lint_file, [ctx] * len(input_file_paths), input_file_paths, chunksize=4):
+        diagnostics.extend(diagnostics_of_file)
+    executor.shutdown()
+    return diagnostics
+
+
+## #############################################
+# COMMAND LINE INTERFACE
+## #############################################
+
+def get_list_of_excelsheet_paths(excel_folder):
+    '''
+    Returns the paths of all Excel procedures (and exported procedures, see Procedure_readers.py) inside the Excel folder
+    relative to it. The Excel folder can also be an archive or a folder inside of one.
+    Files inside of "old" folders and lock files (~) are skipped.
+    :param excel_folder:
+    :return list_of_excelsheet_paths:
+    '''
+    return procedure_readers.get_list_of_workbook_paths(excel_folder)
+
+
+def get_output_file_path(ctx, file):
+    '''
+    Returns the path of the generated PLUTO file for an Excel procedure path relative to the Excel folder.
+    The file name is the Excel file name without its description, e.g. R-ADC-N210_Activate_cADCS.xlsx -> R_ADC_N210.pluto
+    :param ctx, file:
+    :return output_file_path:
+    '''
+    output_file_ID_name = os.path.basename(file).split('-', 1)
     output_file_ID_name[0] = output_file_ID_name[0].replace('\\', '').replace('-', '_') + '_'
-    print('outputfilename[0] = ', output_file_ID_name[0])
     output_file_ID_name[1] = output_file_ID_name[1].replace('\\', '')[0:8].replace('-', '_')
-    print('outputfilename[1] = ', output_file_ID_name[1])
     output_file_ID_name = output_file_ID_name[0] + output_file_ID_name[1]
-    print('outputfilename = ', output_file_ID_name)
-    output_file_path = str(directory) + '\\' + output_file_ID_name + '.pluto'
-    print('input: ' + input_file_path)
-    print('output: ', output_file_path)
-    _EXCEL_FILE_NAME = input_file_path
-    _FILE_NAME = output_file_path
-    main_function(input_file_path, output_file_path)
-
-## Start: Print files which contain "@$", can be changed in code above (search for asdf_list) to find and print other
-# files with certain pattern/characteristics. Especially useful when a certain pattern has to be changed in excel procedure.
-asdf_old = ''
-for asdf in asdf_list:
-    if asdf != asdf_old:
-        print(asdf)
-    asdf_old = asdf
-    ## #############################################
-    # END OF PROGRAMME
-    ## #############################################
\ No newline at end of file
+    return os.path.join(ctx.output_folder, os.path.dirname(file), output_file_ID_name + '.pluto')
+
+
+#TODO: Make it pretty
+# this function has been placed here, since it belongs here (flow vise)
+def main_function(ctx, input_file, output_file):
+    '''
+    Converts one Excel procedure and writes the PLUTO code into the output file.
+    :param ctx, input_file, output_file:
+    :return diagnostics:
+    '''
+    pluto_text, line_map, diagnostics = convert_file(ctx, input_file, lambda workbook_source: convert_workbook_with_line_map(read_workbook(ctx, workbook_source, input_file), ctx, input_file))
+    return write_stage(ctx, (input_file, output_file, pluto_text, diagnostics, line_map))
+
+
+def run_pipeline(items, stages, queue_size):
+    '''
+    Passes the items through the stages. Each stage runs in its own thread and the stages are joined by bounded queues,
+    so a fast stage waits for a slow one instead of piling up results (back-pressure).
+    The first exception of any stage stops the pipeline and is raised again.
+    :param items: iterable of inputs of the first stage
+    :param stages: functions, each one gets the result of the previous one
+    :param queue_size: number of items waiting between two stages
+    :return results: results of the last stage in the order of the items
+    '''
+    queues = [queue.Queue(maxsize=queue_size) for stage in stages] + [queue.Queue()]
+    stop = threading.Event()
+    errors = []
+
+    def feed():
+        for item in items:
+            if stop.is_set():
+                break
+            queues[0].put(item)
+        queues[0].put(_END_OF_QUEUE)
+
+    def work(stage, queue_in, queue_out):
+        while True:
+            item = queue_in.get()
+            if item is _END_OF_QUEUE:
+                queue_out.put(_END_OF_QUEUE)
+                return
+            if stop.is_set():
+                continue    # keep draining, so the previous stage is not blocked
+            try:
+                queue_out.put(stage(item))
+            except BaseException as error:
+                errors.append(error)
+                stop.set()
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    for stage_number, stage in enumerate(stages):
+        threads.append(threading.Thread(target=work, args=(stage, queues[stage_number], queues[stage_number + 1]), daemon=True))
+    for thread in threads:
+        thread.start()
+    results = []
+    while True:
+        result = queues[-1].get()
+        if result is _END_OF_QUEUE:
+            break
+        results.append(result)
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def convert_tree(ctx, prefetch=0, topic_jobs=None, budget=None, shard=None):
+    '''
+    Converts all Excel procedures of the Excel folder into the output folder, keeping the folder structure.
+    The output folder is deleted beforehand.
+    With prefetch > 0 reading, parsing, generating and writing overlap in a pipeline with queues of this size.
+    With topic_jobs the workbooks are converted one after the other and the operation topics of large workbooks are
+    generated by this many worker processes.
+    The conversion cache of the context is used by all modes except the memory ceiling, which measures the conversions.
+    With an output archive in the context the output folder is not touched and the workbooks are converted sorted by
+    path, so the entries of the archive always have the same order.
+    With a journal in the context the workbooks are converted sorted by path as well and recorded in the journal. If the
+    journal was resumed, the output folder is kept and only the workbooks that are not completed are converted.
+    With a budget each workbook is converted in an isolated worker process instead (prefetch, topic_jobs and the memory
+    ceiling are not used then), a failed workbook is reported as diagnostic with the code of its failure.
+    :param ctx, prefetch, topic_jobs:
+    :param budget: Isolated_workers.WorkerBudget
+    :param shard: (i, n), only the workbooks of shard i of n are converted (see Conversion_shards.py)
+    :return diagnostics:
+    '''
+    list_of_excelsheet_paths = get_list_of_excelsheet_paths(ctx.excel_folder)
+    if shard is not None:
+        list_of_excelsheet_paths = conversion_shards.select_shard(list_of_excelsheet_paths, shard)
+    ctx.log(list_of_excelsheet_paths)
+    if ctx.output_archive is None and (ctx.journal is None or not ctx.journal.resumed):
+        shutil.rmtree(ctx.output_folder, ignore_errors=True)
+        os.makedirs(ctx.output_folder)
+    if ctx.output_archive is not None or ctx.journal is not None:
+        list_of_excelsheet_paths.sort()
+    if ctx.journal is not None:
+        number_of_workbooks = len(list_of_excelsheet_paths)
+        list_of_excelsheet_paths = [file for file in list_of_excelsheet_paths if not ctx.journal.is_completed(os.path.join(ctx.excel_folder, file))]
+        if ctx.journal.resumed:
+            ctx.log('resuming: {COMPLETED} of {TOTAL} workbooks completed before'.format(COMPLETED=number_of_workbooks - len(list_of_excelsheet_paths), TOTAL=number_of_workbooks))
+        ctx.journal.open()
+    diagnostics = []
+    if budget is not None:
+        return convert_tree_isolated(ctx, list_of_excelsheet_paths, budget)
+    if ctx.memory_ceiling_MB is not None:
+        return convert_tree_within_memory_ceiling(ctx, list_of_excelsheet_paths)
+    if topic_jobs:
+        return convert_tree_with_topic_jobs(ctx, list_of_excelsheet_paths, topic_jobs)
+    if prefetch > 0:
+        for diagnostics_of_file in run_pipeline(list_of_excelsheet_paths, [
+                lambda file: read_stage(ctx, file),
+                lambda item: parse_stage(ctx, item),
+                lambda item: generate_stage(ctx, item),
+                lambda item: write_stage(ctx, item)], prefetch):
+            diagnostics.extend(diagnostics_of_file)
+        return diagnostics
+    for file in list_of_excelsheet_paths:
+        input_file_path = os.path.join(ctx.excel_folder, file)
+        output_file_path = get_output_file_path(ctx, file)
+        directory = os.path.dirname(output_file_path)
+        if ctx.output_archive is None and not os.path.exists(directory):
+            os.makedirs(directory)
+        ctx.log('input: ' + input_file_path)
+        ctx.log('output: ', output_file_path)
+        diagnostics.extend(main_function(ctx, input_file_path, output_file_path))
+    return diagnostics
+
+
+def convert_tree_within_memory_ceiling(ctx, list_of_excelsheet_paths):
+    '''
+    Converts the workbooks strictly one after the other, releases each workbook right after the code generation and
+    prints the reader used and the peak memory (RSS) per workbook.
+    :param ctx, list_of_excelsheet_paths:
+    :return diagnostics:
+    '''
+    diagnostics = []
+    for file in list_of_excelsheet_paths:
+        input_file_path = os.path.join(ctx.excel_folder, file)
+        output_file_path = get_output_file_path(ctx, file)
+        ctx.log('input: ' + input_file_path)
+        ctx.log('output: ', output_file_path)
+        reset_peak_memory()
+        wb, reader = load_workbook_within_memory_ceiling(ctx, input_file_path)
+        pluto_text, line_map, diagnostics_of_file = convert_workbook_with_line_map(wb, ctx, input_file_path)
+        del wb
+        gc.collect()
+        peak_memory_in_kB = get_peak_memory_in_kB()
+        write_stage(ctx, (input_file_path, output_file_path, pluto_text, diagnostics_of_file, line_map))
+        ctx.log('memory: {FILE} reader={READER} peak={PEAK} kB'.format(FILE=input_file_path, READER=reader, PEAK=peak_memory_in_kB))
+        if peak_memory_in_kB is not None and peak_memory_in_kB > ctx.memory_ceiling_MB * 1024:
+            diagnostics_of_file.append(Diagnostic(input_file_path, None, None, 'warning', 'MEMORY_CEILING_EXCEEDED',
+                                                  'peak memory of {PEAK} kB above the ceiling of {CEILING} MB'.format(PEAK=peak_memory_in_kB, CEILING=ctx.memory_ceiling_MB)))
+        diagnostics.extend(diagnostics_of_file)
+    return diagnostics
+
+
+def convert_tree_with_topic_jobs(ctx, list_of_excelsheet_paths, topic_jobs):
+    '''
+    Converts the workbooks one after the other and spreads the operation topics of large workbooks over topic_jobs worker
+    processes. The workbooks are read with the streaming reader, so their work sheets can be sent to the workers.
+    :param ctx, list_of_excelsheet_paths, topic_jobs:
+    :return diagnostics:
+    '''
+    diagnostics = []
+    executor = TopicExecutor(ctx, topic_jobs)
+    try:
+        for file in list_of_excelsheet_paths:
+            input_file_path = os.path.join(ctx.excel_folder, file)
+            output_file_path = get_output_file_path(ctx, file)
+            ctx.log('input: ' + input_file_path)
+            ctx.log('output: ', output_file_path)
+            pluto_text, line_map, diagnostics_of_file = convert_file(ctx, input_file_path, lambda workbook_source: convert_workbook_with_line_map(read_workbook_snapshot(ctx, workbook_source, input_file_path), ctx, input_file_path, executor))
+            diagnostics.extend(write_stage(ctx, (input_file_path, output_file_path, pluto_text, diagnostics_of_file, line_map)))
+    finally:
+        executor.shutdown()
+    return diagnostics
+
+
+def convert_tree_isolated(ctx, list_of_excelsheet_paths, budget):
+    '''
+    Converts each workbook in an isolated worker process within the budget. The PLUTO code is written by this process
+    in the order of the workbooks, so output archive and journal of the context work as usual. A workbook that raises,
+    exceeds the budget or crashes its worker gets a WORKBOOK_FAILED, WORKBOOK_TIMEOUT, WORKBOOK_MEMORY_BUDGET or
+    WORKER_CRASHED error and no output file.
+    :param ctx, list_of_excelsheet_paths:
+    :param budget: Isolated_workers.WorkerBudget
+    :return diagnostics:
+    '''
+    diagnostics = []
+    worker_ctx = copy.copy(ctx)
+    worker_ctx.output_archive = None
+    worker_ctx.journal = None
+    output_file_paths = dict((os.path.join(ctx.excel_folder, file), get_output_file_path(ctx, file)) for file in list_of_excelsheet_paths)
+    for result in isolated_workers.run_isolated(convert_isolated_workbook, list(output_file_paths), budget, initialize_isolated_worker, (worker_ctx,)):
+        ctx.log('input: ' + result.item)
+        if result.status != 'ok':
+            diagnostics.append(Diagnostic(result.item, None, None, 'error', isolated_workers.get_failure_code(result.status), result.message))
+            continue
+        ctx.log('output: ', output_file_paths[result.item])
+        pluto_text, line_map, diagnostics_of_file = result.value
+        diagnostics.extend(write_stage(ctx, (result.item, output_file_paths[result.item], pluto_text, diagnostics_of_file, line_map)))
+    return diagnostics
+
+
+def initialize_isolated_worker(ctx):
+    '''
+    Keeps the context in the isolated worker process.
+    :param ctx:
+    :return :
+    '''
+    global _ISOLATED_WORKER_CONTEXT
+    _ISOLATED_WORKER_CONTEXT = ctx
+    return
+
+
+def convert_isolated_workbook(input_file_path):
+    '''
+    Converts one Excel procedure inside of an isolated worker process, using the conversion cache of the context.
+    :param input_file_path:
+    :return pluto_text, line_map, diagnostics:
+    '''
+    ctx = _ISOLATED_WORKER_CONTEXT
+    return convert_file(ctx, input_file_path, lambda workbook_source: convert_workbook_with_line_map(read_workbook(ctx, workbook_source, input_file_path), ctx, input_file_path))
+
+
+# stages of the convert_tree() pipeline
+def read_stage(ctx, file):
+    '''
+    Reads the raw bytes of an Excel procedure and looks its conversion up in the conversion cache of the context.
+    :param ctx, file:
+    :return input_file_path, output_file_path, workbook_bytes, cache_key, cached_result: cache_key and cached_result
+                                                                                         are None without a cache hit
+    '''
+    input_file_path = os.path.join(ctx.excel_folder, file)
+    workbook_bytes = procedure_readers.read_workbook_bytes(input_file_path)
+    cache_key, cached_result = None, None
+    if ctx.cache is not None:
+        cache_key = get_cache_key(ctx, workbook_bytes)
+        cached_result = load_cached_conversion(ctx, cache_key, input_file_path)
+    return input_file_path, get_output_file_path(ctx, file), workbook_bytes, cache_key, cached_result
+
+
+def parse_stage(ctx, item):
+    '''
+    Parses the raw bytes into a workbook, unless the conversion was cached.
+    :param ctx, item: input_file_path, output_file_path, workbook_bytes, cache_key, cached_result
+    :return input_file_path, output_file_path, wb, cache_key, cached_result: wb is None if cached
+    '''
+    input_file_path, output_file_path, workbook_bytes, cache_key, cached_result = item
+    wb = read_workbook(ctx, workbook_bytes, input_file_path) if cached_result is None else None
+    return input_file_path, output_file_path, wb, cache_key, cached_result
+
+
+def generate_stage(ctx, item):
+    '''
+    Generates the PLUTO code of a parsed workbook and stores it in the conversion cache of the context.
+    :param ctx, item: input_file_path, output_file_path, wb, cache_key, cached_result
+    :return input_file_path, output_file_path, pluto_text, diagnostics, line_map:
+    '''
+    input_file_path, output_file_path, wb, cache_key, cached_result = item
+    ctx.log('input: ' + input_file_path)
+    ctx.log('output: ', output_file_path)
+    if cached_result is not None:
+        pluto_text, line_map, diagnostics = cached_result
+        return input_file_path, output_file_path, pluto_text, diagnostics, line_map
+    pluto_text, line_map, diagnostics = convert_workbook_with_line_map(wb, ctx, input_file_path)
+    if ctx.cache is not None:
+        store_cached_conversion(ctx, cache_key, (pluto_text, line_map, diagnostics))
+    return input_file_path, output_file_path, pluto_text, diagnostics, line_map
+
+
+def write_stage(ctx, item):
+    '''
+    Writes the PLUTO code into the output file and the line map (lean output profile) into <output file>.map , or both
+    into the output archive of the context, and records the workbook in the journal of the context.
+    :param ctx:
+    :param item: input_file_path, output_file_path, pluto_text, diagnostics, line_map
+    :return diagnostics:
+    '''
+    input_file_path, output_file_path, pluto_text, diagnostics, line_map = item
+    output_file_paths = [output_file_path]
+    output_archive.write_output_file(ctx.output_archive, output_file_path, pluto_text)
+    if line_map is not None:
+        output_file_paths.append(get_line_map_file_path(output_file_path))
+        output_archive.write_output_file(ctx.output_archive, output_file_paths[-1], json.dumps(line_map))
+    if ctx.journal is not None:
+        ctx.journal.record(input_file_path, output_file_paths)
+    return diagnostics
+
+
+def convert_stream(ctx, fi, fo, workbook_name):
+    '''
+    Converts one workbook read from a binary stream and writes the PLUTO code into a text stream (pipe mode).
+    Nothing is read from or written to the Excel and output folders.
+    :param ctx: ConversionContext
+    :param fi: binary input stream, e.g. sys.stdin.buffer
+    :param fo: text output stream, e.g. sys.stdout
+    :param workbook_name: name of the workbook in diagnostics, its extension determines the format if it has a known one
+    :return diagnostics: an UNREADABLE_WORKBOOK error if the input is no workbook, nothing is written then
+    '''
+    workbook_bytes = fi.read()
+    cache_key, result = None, None
+    if ctx.cache is not None:
+        cache_key = get_cache_key(ctx, workbook_bytes)
+        result = load_cached_conversion(ctx, cache_key, workbook_name)
+    if result is None:
+        try:
+            wb = read_workbook(ctx, workbook_bytes, workbook_name)
+        except Exception as error:
+            return [Diagnostic(workbook_name, None, None, 'error', 'UNREADABLE_WORKBOOK', '{TYPE}: {ERROR}'.format(TYPE=type(error).__name__, ERROR=error))]
+        result = convert_workbook_with_line_map(wb, ctx, workbook_name)
+        if ctx.cache is not None:
+            store_cached_conversion(ctx, cache_key, result)
+    pluto_text, line_map, diagnostics = result
+    fo.write(pluto_text)
+    fo.flush()
+    return diagnostics
+
+
+def write_shard_manifest(ctx, shard, archive_path=None):
+    '''
+    Writes the manifest of the PLUTO files of a shard into the output folder, or next to the output archive.
+    :param ctx, shard:
+    :param archive_path: path of the closed output archive of the context
+    :return manifest_file_path:
+    '''
+    list_of_excelsheet_paths = get_list_of_excelsheet_paths(ctx.excel_folder)
+    output_file_paths = []
+    for file in conversion_shards.select_shard(list_of_excelsheet_paths, shard):
+        output_file_paths.append(get_output_file_path(ctx, file))
+        if ctx.output_profile == 'lean':
+            output_file_paths.append(get_line_map_file_path(output_file_paths[-1]))
+    manifest_file_path = conversion_shards.get_shard_manifest_file_path(ctx.output_folder if archive_path is None else os.path.dirname(archive_path), 'pluto', shard)
+    conversion_shards.write_shard_manifest(manifest_file_path, 'pluto', shard, list_of_excelsheet_paths,
+                                           conversion_shards.get_output_hashes(ctx.output_folder, output_file_paths, ctx.output_archive))
+    return manifest_file_path
+
+
+def get_line_map_file_path(output_file_path):
+    '''
+    Returns the path of the line map of a PLUTO file (lean output profile).
+    :param output_file_path:
+    :return line_map_file_path:
+    '''
+    return output_file_path + '.map'
+
+
+def main(argv=None):
+    '''
+    Command line interface: converts the "Excel" folder of the current workspace into "generated_MATIS_Files".
+    :param argv:
+    :return exit_code:
+    '''
+    ap = argparse.ArgumentParser(description='Converts Excel procedures into PLUTO procedures.')
+    ap.add_argument('-i', '--excel_folder', default='Excel', help='folder containing the Excel procedures')
+    ap.add_argument('-o', '--output_folder', default='generated_MATIS_Files', help='folder for the generated PLUTO files (deleted beforehand)')
+    ap.add_argument('--output_archive', metavar='ZIP', help='write the PLUTO files into this zip archive with a manifest of their hashes instead of the output folder, which is not touched')
+    ap.add_argument('--journal', action='store_true', help='record the converted workbooks and the hashes of their PLUTO files in the output folder, so an interrupted conversion can be resumed')
+    ap.add_argument('--resume', action='store_true', help='continue the journaled conversion of the output folder with the first workbook not completed, instead of deleting the output folder (implies --journal)')
+    ap.add_argument('-q', '--quiet', action='store_true', help='only print the diagnostics')
+    ap.add_argument('--prefetch', type=int, default=_PREFETCH, help='workbooks queued between reading, parsing, generating and writing (0 = strictly one after the other)')
+    ap.add_argument('--memory_ceiling', type=float, help='memory ceiling in MB: workbooks are converted one after the other, large ones with the streaming reader, and the peak memory per workbook is printed')
+    ap.add_argument('--lint', action='store_true', help='only check the Excel procedures and print the diagnostics as json lines, nothing is written')
+    ap.add_argument('-j', '--jobs', type=int, help='number of processes for --lint and --isolate (default: all processors)')
+    ap.add_argument('--topic_jobs', type=int, help='number of processes generating the operation topics of large workbooks in parallel (workbooks are converted one after the other)')
+    ap.add_argument('--sample_TM_once', action='store_true', help='CHECK TM range and enumeration checks read the TM once into a variable instead of once per comparison')
+    ap.add_argument('--condition_waits', action='store_true', help='a WAIT between a SEND and a CHECK TM becomes "wait until <expected TM values> timeout <waiting time>"')
+    ap.add_argument('--profile', choices=_OUTPUT_PROFILES, default='verbose', help='lean: no comments and no CHECK TM logging, with a .map file of the Excel rows per PLUTO file (default: verbose)')
+    ap.add_argument('--generation_date', help='text written as generation time into the header of the PLUTO files (default: SOURCE_DATE_EPOCH if set, else the current time, with --cache_folder None)')
+    ap.add_argument('--cache_folder', help='conversion cache (see Conversion_cache.py), can be shared between machines: unchanged workbooks are not converted again')
+    ap.add_argument('--cache_size', type=float, help='size limit of the conversion cache in MB, least recently used results are deleted (default: 1024)')
+    ap.add_argument('--pipe', action='store_true', help='convert one workbook from stdin into PLUTO code on stdout, diagnostics on stderr (no folders are used)')
+    ap.add_argument('--name', default='<stdin>', help='with --pipe: name of the workbook in diagnostics, e.g. R-ADC-N210_Activate.xlsx')
+    ap.add_argument('--isolate', action='store_true', help='convert each workbook in an isolated worker process, failing workbooks are reported and do not stop the conversion')
+    ap.add_argument('--timeout', type=float, metavar='SECONDS', help='time budget per workbook, the worker of a workbook taking longer is killed (implies --isolate)')
+    ap.add_argument('--memory_budget', type=float, metavar='MB', help='memory (address space) budget per worker process, POSIX only (implies --isolate)')
+    ap.add_argument('--error_report', metavar='FILE', help='write the failed workbooks as json into this file')
+    ap.add_argument('--shard', metavar='i/n', help='only convert the workbooks of shard i of n (whole folders) and write the manifest of the shard (see Conversion_shards.py)')
+    ap.add_argument('--index', metavar='DATABASE', help='also update the cross-reference index in this file (see CrossReference_index.py)')
+    args = vars(ap.parse_args(argv))
+    shard = None
+    if args['shard']:
+        try:
+            shard = conversion_shards.parse_shard(args['shard'])
+        except ValueError as error:
+            ap.error(str(error))
+    if (args['journal'] or args['resume']) and args['output_archive']:
+        ap.error('--journal and --resume need the output folder, they cannot be combined with --output_archive')
+    if args['lint']:
+        ctx = ConversionContext(excel_folder=args['excel_folder'], output_folder=args['output_folder'])
+        diagnostics = lint_tree(ctx, args['jobs'])
+        for diagnostic in diagnostics:
+            print(json.dumps(diagnostic._asdict(), sort_keys=True))
+        return 1 if any(diagnostic.severity == 'error' for diagnostic in diagnostics) else 0
+    if args['pipe']:
+        ctx = ConversionContext(sample_TM_once=args['sample_TM_once'], condition_waits=args['condition_waits'], output_profile=args['profile'], generation_date=args['generation_date'],
+                                cache=conversion_cache.ConversionCache(args['cache_folder'], args['cache_size']) if args['cache_folder'] else None)
+        diagnostics = convert_stream(ctx, sys.stdin.buffer, sys.stdout, args['name'])
+        for diagnostic in diagnostics:
+            print(format_diagnostic(diagnostic), file=sys.stderr)
+        return 1 if any(diagnostic.severity == 'error' for diagnostic in diagnostics) else 0
+    ctx = ConversionContext(excel_folder=args['excel_folder'], output_folder=args['output_folder'], verbose=not args['quiet'], memory_ceiling_MB=args['memory_ceiling'],
+                            sample_TM_once=args['sample_TM_once'], condition_waits=args['condition_waits'],
+                            output_profile=args['profile'], generation_date=args['generation_date'],
+                            cache=conversion_cache.ConversionCache(args['cache_folder'], args['cache_size']) if args['cache_folder'] else None,
+                            output_archive=output_archive.OutputArchive(args['output_archive'], args['output_folder']) if args['output_archive'] else None)
+    if args['journal'] or args['resume']:
+        try:
+            ctx.journal = get_journal(ctx, args['resume'])
+        except ValueError as error:
+            ap.error(str(error))
+    budget = None
+    if args['isolate'] or args['timeout'] is not None or args['memory_budget'] is not None:
+        budget = isolated_workers.WorkerBudget(args['jobs'], args['timeout'], args['memory_budget'])
+    try:
+        diagnostics = convert_tree(ctx, args['prefetch'], args['topic_jobs'], budget, shard)
+    except BaseException:
+        if ctx.output_archive is not None:
+            ctx.output_archive.discard()
+        raise
+    finally:
+        if ctx.journal is not None:
+            ctx.journal.close()
+    if ctx.output_archive is not None:
+        ctx.output_archive.close()
+    if shard is not None:
+        write_shard_manifest(ctx, shard, args['output_archive'])
+    if ctx.cache is not None:
+        ctx.cache.evict()
+    if args['index']:
+        import CrossReference_index
+        connection = CrossReference_index.open_index(args['index'])
+        CrossReference_index.update_index(connection, ctx)
+        connection.close()
+    failures = [diagnostic for diagnostic in diagnostics if isolated_workers.is_failure_code(diagnostic.code)]
+    if args['quiet']:
+        for diagnostic in diagnostics:
+            print(format_diagnostic(diagnostic))
+    elif failures:
+        print('{NUMBER} workbook(s) failed:'.format(NUMBER=len(failures)))
+        for diagnostic in failures:
+            print(format_diagnostic(diagnostic))
+    if args['error_report']:
+        isolated_workers.write_error_report(args['error_report'], [(diagnostic.workbook, diagnostic.code, diagnostic.message) for diagnostic in failures])
+    return isolated_workers.get_exit_code(diagnostic.code for diagnostic in failures)
+
+
+_DEFAULT_CONTEXT = None
+# default queue size of the convert_tree() pipeline and the marker closing a queue
+_PREFETCH = 2
+_END_OF_QUEUE = object()
+# a completely loaded workbook needs about this many times the uncompressed size of its work sheets
+_FULL_LOAD_MEMORY_FACTOR = 10
+_EMPTY_SNAPSHOT_CELL = SnapshotCell(None, SnapshotFill(SnapshotColor('00000000')))
+# workbooks are only generated in parallel groups of operation topics with at least this many identifier matrix rows
+_MIN_MATRIX_ROWS_PER_TOPIC_GROUP = 500
+_TOPIC_WORKER_CONTEXT = None
+_ISOLATED_WORKER_CONTEXT = None
+_OUTPUT_PROFILES = ['verbose', 'lean']
+# statements removed by the lean output profile
+_LEAN_DROPPED_STATEMENTS = ('log "LOG: CHECK TM',)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,624 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+Readers of the Excel procedures for ProcedureConverter_xlsx2pluto.py and SE_structureConverter_xlsx2seXml.py.
+The converters only need the cell values of the "Front Page" and "Procedure" work sheets and the rows dividing the
+operation steps, so besides xlsx (read by openpyxl inside of the converters) procedures can be exported by the procedure
+database into formats that are much faster to read:
+    <procedure>.json                    {"sheets": {"Front Page": [rows], "Procedure": [rows]}}
+    <procedure>.Procedure.csv           one file per work sheet, next to it <procedure>.Front Page.csv
+    <procedure>.Procedure.tsv           the same, tab separated
+    <procedure>.ods                     OpenDocument spreadsheet, the dividers are taken from the background colour
+Each row of a json, csv or tsv work sheet starts with the marker column, followed by the cells of column A, B, ...
+The marker is DIVIDER for rows dividing the operation steps (blue-ish rows in the Excel procedures) and empty otherwise.
+Row n of the export is row n of the work sheet. Empty csv/tsv cells are empty cells, texts looking like numbers are
+read as numbers (like Excel does when typing them).
+Every reader returns a WorkbookSnapshot, which is used like an openpyxl workbook by the converters.
+The Excel folder can also be a .zip, .tar, .tar.gz or .tgz archive of the Excel tree, or a folder inside of one
+(e.g. release.zip/Excel). The workbooks are then read from the archive into memory, nothing is extracted to disk.
+Usage:
+python Procedure_readers.py -i Excel -o Excel_json --format json      (export all xlsx procedures into a new folder)
+python Procedure_readers.py -i Excel -o Excel_csv --format csv
+Output:
+The exported procedures, in the folder structure of the Excel folder.
+'''
+
+import argparse
+import collections
+import csv
+import io
+import itertools
+import json
+import os
+import re
+import sys
+import tarfile
+import zipfile
+import xml.etree.ElementTree as ET
+
+import openpyxl as op
+
+
+class SnapshotCell(collections.namedtuple('SnapshotCell', ['value', 'fill'])):
+    '''
+    Value and fill of a cell of a WorksheetSnapshot. Offers the attributes of an openpyxl cell used by the
+    converters: value, internal_value and fill.start_color.index .
+    '''
+    __slots__ = ()
+
+    @property
+    def internal_value(self):
+        return self.value
+
+
+SnapshotFill = collections.namedtuple('SnapshotFill', ['start_color'])
+SnapshotColor = collections.namedtuple('SnapshotColor', ['index'])
+
+
+class WorksheetSnapshot:
+    '''
+    Read-only copy of the non-empty cells of a work sheet. ws['C12'] returns a SnapshotCell, also for empty cells,
+    without creating new cells the way an openpyxl work sheet does.
+    :param cells: dictionary coordinate -> SnapshotCell
+    '''
+    def __init__(self, cells):
+        self.cells = cells
+
+    def __getitem__(self, coordinate):
+        return self.cells.get(coordinate, _EMPTY_SNAPSHOT_CELL)
+
+
+class WorkbookSnapshot:
+    '''
+    Work sheet snapshots of a workbook, used like an openpyxl workbook: wb['Procedure'] .
+    :param worksheets: dictionary sheet name -> WorksheetSnapshot
+    '''
+    def __init__(self, worksheets):
+        self.worksheets = worksheets
+
+    def __getitem__(self, sheet_name):
+        return self.worksheets[sheet_name]
+
+    def close(self):
+        return
+
+
+def get_workbook_format(workbook_source, file_name=None):
+    '''
+    Returns the format of a workbook, from the file name if there is one, else from the content.
+    :param workbook_source: path, bytes or binary file object
+    :param file_name: used instead of the path if given
+    :return workbook_format: 'xlsx', 'ods', 'json', 'csv' or 'tsv'
+    '''
+    if file_name is None and isinstance(workbook_source, str):
+        file_name = workbook_source
+    if file_name is not None:
+        for extension, workbook_format in _WORKBOOK_EXTENSIONS:
+            if file_name.endswith(extension):
+                return workbook_format
+    if isinstance(workbook_source, (bytes, bytearray)):
+        if workbook_source.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'{'):
+            return 'json'
+        if _ODS_MIMETYPE in workbook_source[:100]:
+            return 'ods'
+    return 'xlsx'
+
+
+def is_workbook_file(file_name):
+    '''
+    Returns if a file is a procedure in one of the known formats. For csv and tsv only the Procedure work sheet counts,
+    the Front Page work sheet belongs to it.
+    :param file_name:
+    :return is_workbook:
+    '''
+    return any(file_name.endswith(extension) for extension, workbook_format in _WORKBOOK_EXTENSIONS)
+
+
+def strip_workbook_extension(file_name):
+    '''
+    Returns the file name without the extension of its format, e.g. R-ADC-N210_Activate.Procedure.csv -> R-ADC-N210_Activate
+    :param file_name:
+    :return name:
+    '''
+    for extension, workbook_format in _WORKBOOK_EXTENSIONS:
+        if file_name.endswith(extension):
+            return file_name[:-len(extension)]
+    return file_name
+
+
+def get_sheet_file_path(file_path, sheet_name):
+    '''
+    Returns the path of a work sheet of a csv or tsv procedure.
+    :param file_path: path of the Procedure work sheet (or any other work sheet) of the procedure
+    :param sheet_name:
+    :return sheet_file_path:
+    '''
+    workbook_format = get_workbook_format(file_path)
+    return strip_workbook_extension(file_path) + '.' + sheet_name + '.' + workbook_format
+
+
+def read_workbook_bytes(file_path):
+    '''
+    Returns the content of a procedure as bytes, which read_workbook() accepts again. csv and tsv procedures consist of
+    one file per work sheet, they are returned in json format.
+    :param file_path:
+    :return workbook_bytes:
+    '''
+    if get_workbook_format(file_path) in ('csv', 'tsv'):
+        return json.dumps({'sheets': read_sheet_rows_of_csv(file_path)}).encode('utf-8')
+    return read_file_bytes(file_path)
+
+
+def read_file_bytes(file_path):
+    '''
+    Returns the content of a file, which can also be a member of an archive (see split_archive_path()).
+    :param file_path:
+    :return file_bytes:
+    '''
+    archive_path, member_name = split_archive_path(file_path)
+    if archive_path is not None:
+        return read_archive_member(archive_path, member_name)
+    fi = open(file_path, 'rb')
+    file_bytes = fi.read()
+    fi.close()
+    return file_bytes
+
+
+def resolve_workbook_source(workbook_source):
+    '''
+    Returns the bytes of a workbook path inside of an archive, all other workbook sources unchanged.
+    :param workbook_source: path, bytes or binary file object
+    :return workbook_source:
+    '''
+    if isinstance(workbook_source, str) and split_archive_path(workbook_source)[0] is not None:
+        return read_workbook_bytes(workbook_source)
+    return workbook_source
+
+
+def stat_workbook(file_path):
+    '''
+    Returns os.stat() of a workbook, of its archive if it is inside of one.
+    :param file_path:
+    :return stat:
+    '''
+    archive_path, member_name = split_archive_path(file_path)
+    return os.stat(file_path if archive_path is None else archive_path)
+
+
+def is_archive_file(file_name):
+    '''
+    Returns if a file name is the one of a supported archive.
+    :param file_name:
+    :return is_archive:
+    '''
+    return file_name.lower().endswith(_ARCHIVE_EXTENSIONS)
+
+
+def split_archive_path(path):
+    '''
+    Splits a path leading into an archive, e.g. release.zip/Excel/ADC/R-ADC-N210_Activate.xlsx .
+    :param path:
+    :return archive_path, member_name: member_name with / as separator ('' for the archive itself), (None, None) if the
+                                       path does not lead into an archive
+    '''
+    parts = os.path.normpath(path).split(os.sep)
+    for index in range(1, len(parts) + 1):
+        archive_path = os.sep.join(parts[:index])
+        if is_archive_file(archive_path) and os.path.isfile(archive_path):
+            return archive_path, '/'.join(parts[index:])
+    return None, None
+
+
+def get_archive(archive_path):
+    '''
+    Returns the opened archive and the names of its files in archive order. An archive is opened once per process
+    (worker processes open their own one instead of sharing the file position with their parent).
+    :param archive_path:
+    :return archive, member_names: ZipFile or TarFile
+    '''
+    key = os.path.abspath(archive_path)
+    if key not in _OPEN_ARCHIVES or _OPEN_ARCHIVES[key][0] != os.getpid():
+        if archive_path.lower().endswith('.zip'):     # zipfile.is_zipfile() also accepts tar files ending with an xlsx
+            archive = zipfile.ZipFile(archive_path)
+            member_names = [info.filename for info in archive.infolist() if not info.is_dir()]
+        else:
+            archive = tarfile.open(archive_path, 'r:*')
+            member_names = [member.name for member in archive.getmembers() if member.isfile()]
+        member_names = [member_name[2:] if member_name.startswith('./') else member_name for member_name in member_names]
+        _OPEN_ARCHIVES[key] = (os.getpid(), archive, member_names)
+    return _OPEN_ARCHIVES[key][1], _OPEN_ARCHIVES[key][2]
+
+
+def read_archive_member(archive_path, member_name):
+    '''
+    Returns the content of a file of an archive.
+    :param archive_path, member_name:
+    :return member_bytes:
+    '''
+    archive, member_names = get_archive(archive_path)
+    try:
+        if isinstance(archive, zipfile.ZipFile):
+            return archive.read(member_name)
+        try:
+            fi = archive.extractfile(member_name)
+        except KeyError:
+            fi = archive.extractfile('./' + member_name)
+        member_bytes = fi.read()
+        fi.close()
+        return member_bytes
+    except KeyError:
+        raise FileNotFoundError('No such file in {ARCHIVE}: {MEMBER}'.format(ARCHIVE=archive_path, MEMBER=member_name))
+
+
+def get_list_of_workbook_paths(excel_folder):
+    '''
+    Returns the paths of all procedures inside the Excel folder (or archive, see split_archive_path()) relative to it.
+    Files inside of "old" folders and lock files (~) are skipped.
+    :param excel_folder:
+    :return list_of_workbook_paths:
+    '''
+    archive_path, folder_member_name = split_archive_path(excel_folder)
+    if archive_path is None:
+        file_paths = []
+        for subdir, dirs, files in os.walk(excel_folder):
+            for file in files:
+                file_paths.append(os.path.relpath(os.path.join(subdir, file), excel_folder))
+    else:
+        archive, member_names = get_archive(archive_path)
+        prefix = folder_member_name + '/' if folder_member_name else ''
+        file_paths = [os.path.join(*member_name[len(prefix):].split('/')) for member_name in member_names if member_name.startswith(prefix)]
+    list_of_workbook_paths = []
+    for filepath in file_paths:
+        if is_workbook_file(filepath) and 'old' not in filepath.split(os.sep)[:-1] and '~' not in filepath:
+            list_of_workbook_paths.append(filepath)
+    return list_of_workbook_paths
+
+
+def read_workbook(workbook_source, divider_color, file_name=None):
+    '''
+    Reads a procedure in json, csv, tsv or ods format (see get_workbook_format()).
+    :param workbook_source: path, bytes or binary file object (csv and tsv: path)
+    :param divider_color: fill colour given to the cells of the rows dividing the operation steps
+    :param file_name: used to determine the format instead of the path if given
+    :return wb: WorkbookSnapshot
+    '''
+    workbook_format = get_workbook_format(workbook_source, file_name)
+    if workbook_format not in _WORKBOOK_READERS:
+        raise ValueError('Unknown workbook format: ' + workbook_format)
+    return _WORKBOOK_READERS[workbook_format](workbook_source, divider_color)
+
+
+def read_json_workbook(workbook_source, divider_color):
+    '''
+    Reads a procedure in json format.
+    :param workbook_source: path, bytes or binary file object
+    :param divider_color:
+    :return wb: WorkbookSnapshot
+    '''
+    if isinstance(workbook_source, str):
+        workbook_source = read_file_bytes(workbook_source)
+    elif not isinstance(workbook_source, (bytes, bytearray)):
+        workbook_source = workbook_source.read()
+    return get_workbook_snapshot_of_sheet_rows(json.loads(workbook_source.decode('utf-8-sig'))['sheets'], divider_color)
+
+
+def read_csv_workbook(workbook_source, divider_color):
+    '''
+    Reads a procedure in csv or tsv format, one file per work sheet.
+    :param workbook_source: path of the Procedure work sheet or the bytes returned by read_workbook_bytes()
+    :param divider_color:
+    :return wb: WorkbookSnapshot
+    '''
+    if not isinstance(workbook_source, str):
+        return read_json_workbook(workbook_source, divider_color)
+    return get_workbook_snapshot_of_sheet_rows(read_sheet_rows_of_csv(workbook_source), divider_color)
+
+
+def read_sheet_rows_of_csv(file_path):
+    '''
+    Returns the rows of the work sheets of a csv or tsv procedure, the texts of the cells converted by get_value_of_text().
+    :param file_path: path of the Procedure work sheet
+    :return sheet_rows: dictionary sheet name -> rows
+    '''
+    delimiter = '\t' if get_workbook_format(file_path) == 'tsv' else ','
+    sheet_rows = {}
+    for sheet_name in _SHEET_NAMES:
+        fi = io.StringIO(read_file_bytes(get_sheet_file_path(file_path, sheet_name)).decode('utf-8-sig'), newline='')
+        sheet_rows[sheet_name] = [row[:1] + [get_value_of_text(text) for text in row[1:]] for row in csv.reader(fi, delimiter=delimiter)]
+    return sheet_rows
+
+
+def get_value_of_text(text):
+    '''
+    Returns the cell value of a csv or tsv cell: None if empty, a number if it looks like one, else the text.
+    :param text:
+    :return value:
+    '''
+    if text == '':
+        return None
+    if _INTEGER_PATTERN.match(text):
+        return int(text)
+    if _FLOAT_PATTERN.match(text):
+        return float(text)
+    return text
+
+
+def read_ods_workbook(workbook_source, divider_color):
+    '''
+    Reads a procedure in OpenDocument spreadsheet format. The fill of a cell is its background colour, the dividers
+    are the rows coloured in the divider colour like in the Excel procedures. divider_color is not needed.
+    :param workbook_source: path, bytes or binary file object
+    :param divider_color:
+    :return wb: WorkbookSnapshot
+    '''
+    workbook_source = resolve_workbook_source(workbook_source)
+    if isinstance(workbook_source, (bytes, bytearray)):
+        workbook_source = io.BytesIO(workbook_source)
+    archive = zipfile.ZipFile(workbook_source)
+    try:
+        content = ET.fromstring(archive.read('content.xml'))
+        styles = ET.fromstring(archive.read('styles.xml')) if 'styles.xml' in archive.namelist() else None
+    finally:
+        archive.close()
+    background_colors = get_ods_background_colors([styles, content])
+    fills = {}
+    worksheets = {}
+    for table in content.iter(_ODS_TABLE + 'table'):
+        sheet_name = table.get(_ODS_TABLE + 'name')
+        if sheet_name not in _SHEET_NAMES:
+            continue
+        column_styles = []
+        for column in table.iter(_ODS_TABLE + 'table-column'):
+            column_styles.extend([column.get(_ODS_TABLE + 'default-cell-style-name')] * int(column.get(_ODS_TABLE + 'number-columns-repeated', '1')))
+        cells = {}
+        row_number = 1
+        for row in table.iter(_ODS_TABLE + 'table-row'):
+            number_of_rows = int(row.get(_ODS_TABLE + 'number-rows-repeated', '1'))
+            row_cells = []
+            column_index = 1
+            for cell in row:
+                if cell.tag not in (_ODS_TABLE + 'table-cell', _ODS_TABLE + 'covered-table-cell'):
+                    continue
+                number_of_columns = int(cell.get(_ODS_TABLE + 'number-columns-repeated', '1'))
+                value = get_ods_cell_value(cell)
+                style_name = cell.get(_ODS_TABLE + 'style-name')
+                for repetition in range(number_of_columns):
+                    if style_name is None and column_index - 1 < len(column_styles):
+                        color = background_colors.get(column_styles[column_index - 1])
+                    else:
+                        color = background_colors.get(style_name)
+                    if value is not None or color is not None:
+                        row_cells.append((op.utils.get_column_letter(column_index), value, color or _NO_FILL_COLOR))
+                    column_index += 1
+                    if value is None and color is None and number_of_columns - repetition > 1:
+                        column_index += number_of_columns - repetition - 1     # repeated empty cells up to the end of the row
+                        break
+            if row_cells:
+                for repetition in range(number_of_rows):
+                    for column_letter, value, color in row_cells:
+                        if color not in fills:
+                            fills[color] = SnapshotFill(SnapshotColor(color))
+                        cells[column_letter + str(row_number + repetition)] = SnapshotCell(value, fills[color])
+            row_number += number_of_rows
+        worksheets[sheet_name] = WorksheetSnapshot(cells)
+    check_sheets(worksheets)
+    return WorkbookSnapshot(worksheets)
+
+
+def get_ods_background_colors(documents):
+    '''
+    Returns the background colours of the cell styles of an OpenDocument spreadsheet, inherited from the parent styles.
+    :param documents: parsed styles.xml and content.xml (None is skipped)
+    :return background_colors: dictionary style name -> ARGB colour like the fills of openpyxl, e.g. FF92CDDC
+    '''
+    backgrounds, parents = {}, {}
+    for document in documents:
+        if document is None:
+            continue
+        for style in document.iter(_ODS_STYLE + 'style'):
+            name = style.get(_ODS_STYLE + 'name')
+            parents[name] = style.get(_ODS_STYLE + 'parent-style-name')
+            for properties in style.iter(_ODS_STYLE + 'table-cell-properties'):
+                background = properties.get(_ODS_FO + 'background-color')
+                if background is not None:
+                    backgrounds[name] = background
+    background_colors = {}
+    for name in parents:
+        style_name = name
+        while style_name is not None and style_name not in backgrounds:
+            style_name = parents.get(style_name)
+        background = backgrounds.get(style_name)
+        if background is not None and background.startswith('#'):
+            background_colors[name] = 'FF' + background[1:].upper()
+    return background_colors
+
+
+def get_ods_cell_value(cell):
+    '''
+    Returns the value of an OpenDocument spreadsheet cell like openpyxl returns it for an xlsx cell.
+    :param cell: table-cell element
+    :return value:
+    '''
+    value_type = cell.get(_ODS_OFFICE + 'value-type')
+    if value_type in ('float', 'percentage', 'currency'):
+        return get_value_of_text(cell.get(_ODS_OFFICE + 'value'))
+    if value_type == 'boolean':
+        return cell.get(_ODS_OFFICE + 'boolean-value') == 'true'
+    if value_type == 'date':
+        return cell.get(_ODS_OFFICE + 'date-value')
+    if value_type == 'time':
+        return cell.get(_ODS_OFFICE + 'time-value')
+    paragraphs = [get_ods_text(paragraph) for paragraph in cell.iter(_ODS_TEXT + 'p')]
+    if value_type is None and not paragraphs:
+        return None
+    return '\n'.join(paragraphs)
+
+
+def get_ods_text(element):
+    '''
+    Returns the text of an OpenDocument text element, with its spaces, tabs and line breaks.
+    :param element:
+    :return text:
+    '''
+    text = element.text or ''
+    for child in element:
+        if child.tag == _ODS_TEXT + 's':
+            text += ' ' * int(child.get(_ODS_TEXT + 'c', '1'))
+        elif child.tag == _ODS_TEXT + 'tab':
+            text += '\t'
+        elif child.tag == _ODS_TEXT + 'line-break':
+            text += '\n'
+        else:
+            text += get_ods_text(child)
+        text += child.tail or ''
+    return text
+
+
+def get_workbook_snapshot_of_sheet_rows(sheet_rows, divider_color):
+    '''
+    Returns the WorkbookSnapshot of work sheets given as rows, each starting with the marker column.
+    The cells of rows marked as DIVIDER get the fill divider_color.
+    :param sheet_rows: dictionary sheet name -> rows
+    :param divider_color:
+    :return wb: WorkbookSnapshot
+    '''
+    no_fill = SnapshotFill(SnapshotColor(_NO_FILL_COLOR))
+    divider_fill = SnapshotFill(SnapshotColor(divider_color))
+    worksheets = {}
+    for sheet_name in sheet_rows:
+        rows = sheet_rows[sheet_name]
+        number_of_columns = max([len(row) - 1 for row in rows] + [1])
+        column_letters = [op.utils.get_column_letter(column_index) for column_index in range(1, number_of_columns + 1)]
+        cells = {}
+        for row_number, row in enumerate(rows, 1):
+            if row and row[0] == _DIVIDER_MARKER:
+                for column_letter, value in itertools.zip_longest(column_letters, row[1:]):
+                    cells[column_letter + str(row_number)] = SnapshotCell(value, divider_fill)
+                continue
+            for column_letter, value in zip(column_letters, row[1:]):
+                if value is not None:
+                    cells[column_letter + str(row_number)] = SnapshotCell(value, no_fill)
+        worksheets[sheet_name] = WorksheetSnapshot(cells)
+    check_sheets(worksheets)
+    return WorkbookSnapshot(worksheets)
+
+
+def check_sheets(worksheets):
+    '''
+    Raises a KeyError like openpyxl if a work sheet needed by the converters is missing.
+    :param worksheets:
+    :return :
+    '''
+    for sheet_name in _SHEET_NAMES:
+        if sheet_name not in worksheets:
+            raise KeyError('Worksheet {SHEET} does not exist.'.format(SHEET=sheet_name))
+    return
+
+
+def get_sheet_rows_of_xlsx(wb, step_column, divider_color):
+    '''
+    Returns the work sheets of an openpyxl workbook as rows starting with the marker column.
+    :param wb: openpyxl workbook
+    :param step_column: column whose fill marks the dividers (STEP_COLUMN of the converters)
+    :param divider_color: COLOR_DIVIDING_OPERATION_STEPS of the converters
+    :return sheet_rows: dictionary sheet name -> rows
+    '''
+    sheet_rows = {}
+    step_column_index = op.utils.column_index_from_string(step_column) - 1
+    for sheet_name in _SHEET_NAMES:
+        rows = []
+        for row in wb[sheet_name].iter_rows():
+            marker = _DIVIDER_MARKER if row and row[step_column_index].fill.start_color.index == divider_color else ''
+            values = [cell.value for cell in row]
+            while values and values[-1] is None:
+                values.pop()
+            rows.append([marker] + values)
+        while rows and rows[-1] == ['']:
+            rows.pop()
+        sheet_rows[sheet_name] = rows
+    return sheet_rows
+
+
+def export_workbook(input_file_path, output_file_path, workbook_format, step_column, divider_color):
+    '''
+    Exports an xlsx procedure into json, csv or tsv format.
+    :param input_file_path, output_file_path: output_file_path with the extension of the format (csv and tsv: path of
+                                              the Procedure work sheet, the other work sheets are written next to it)
+    :param workbook_format: 'json', 'csv' or 'tsv'
+    :param step_column, divider_color: see get_sheet_rows_of_xlsx()
+    :return output_file_paths:
+    '''
+    wb = op.load_workbook(io.BytesIO(read_file_bytes(input_file_path)), data_only=True)
+    try:
+        sheet_rows = get_sheet_rows_of_xlsx(wb, step_column, divider_color)
+    finally:
+        wb.close()
+    os.makedirs(os.path.dirname(output_file_path) or '.', exist_ok=True)
+    if workbook_format == 'json':
+        fo = open(output_file_path, 'w', encoding='utf-8')
+        json.dump({'sheets': sheet_rows}, fo, default=str)
+        fo.close()
+        return [output_file_path]
+    output_file_paths = []
+    for sheet_name in _SHEET_NAMES:
+        sheet_file_path = get_sheet_file_path(output_file_path, sheet_name)
+        fo = open(sheet_file_path, 'w', encoding='utf-8', newline='')
+        writer = csv.writer(fo, delimiter='\t' if workbook_format == 'tsv' else ',')
+        for row in sheet_rows[sheet_name]:
+            writer.writerow(['' if value is None else value for value in row])
+        fo.close()
+        output_file_paths.append(sheet_file_path)
+    return output_file_paths
+
+
+def export_tree(excel_folder, output_folder, workbook_format, step_column, divider_color):
+    '''
+    Exports all xlsx procedures of the Excel folder (or archive) into the output folder, keeping the folder structure.
+    Files inside of "old" folders and lock files (~) are skipped.
+    :param excel_folder, output_folder, workbook_format, step_column, divider_color:
+    :return output_file_paths:
+    '''
+    output_file_paths = []
+    for filepath in get_list_of_workbook_paths(excel_folder):
+        if get_workbook_format(filepath) == 'xlsx':
+            output_file_path = os.path.join(output_folder, strip_workbook_extension(filepath) + _EXPORT_EXTENSIONS[workbook_format])
+            output_file_paths.extend(export_workbook(os.path.join(excel_folder, filepath), output_file_path, workbook_format, step_column, divider_color))
+    return output_file_paths
+
+
+##############################
+# Definitions of global variables
+# work sheets read by the converters
+_SHEET_NAMES = ['Front Page', 'Procedure']
+_DIVIDER_MARKER = 'DIVIDER'
+_NO_FILL_COLOR = '00000000'
+_EMPTY_SNAPSHOT_CELL = SnapshotCell(None, SnapshotFill(SnapshotColor(_NO_FILL_COLOR)))
+# file name extension -> format, csv and tsv procedures are found by their Procedure work sheet
+_WORKBOOK_EXTENSIONS = [('.xlsx', 'xlsx'), ('.ods', 'ods'), ('.json', 'json'), ('.Procedure.csv', 'csv'), ('.Procedure.tsv', 'tsv')]
+_EXPORT_EXTENSIONS = {'json': '.json', 'csv': '.Procedure.csv', 'tsv': '.Procedure.tsv'}
+_WORKBOOK_READERS = {'json': read_json_workbook, 'csv': read_csv_workbook, 'tsv': read_csv_workbook, 'ods': read_ods_workbook}
+_INTEGER_PATTERN = re.compile(r'-?[0-9]+$')
+_FLOAT_PATTERN = re.compile(r'-?([0-9]+\.[0-9]*|\.[0-9]+|[0-9]+(?=[eE]))([eE][-+]?[0-9]+)?$')
+_ODS_MIMETYPE = b'application/vnd.oasis.opendocument.spreadsheet'
+_ODS_OFFICE = '{urn:oasis:names:tc:opendocument:xmlns:office:1.0}'
+_ODS_TABLE = '{urn:oasis:names:tc:opendocument:xmlns:table:1.0}'
+_ODS_TEXT = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+_ODS_STYLE = '{urn:oasis:names:tc:opendocument:xmlns:style:1.0}'
+_ODS_FO = '{urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0}'
+_ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz')
+# absolute archive path -> (process id, opened archive, file names)
+_OPEN_ARCHIVES = {}
+##############################
+
+if __name__ == '__main__':
+    import ProcedureConverter_xlsx2pluto as procedure_converter
+    ap = argparse.ArgumentParser(description='Exports the xlsx procedures of a folder into a format the converters read faster.')
+    ap.add_argument('-i', '--excel_folder', default='Excel', help='folder containing the Excel procedures')
+    ap.add_argument('-o', '--output_folder', required=True, help='folder for the exported procedures')
+    ap.add_argument('--format', choices=sorted(_EXPORT_EXTENSIONS), default='json', help='format of the exported procedures (default: json)')
+    args = vars(ap.parse_args())
+    ctx = procedure_converter.get_default_context()
+    output_file_paths = export_tree(args['excel_folder'], args['output_folder'], args['format'], ctx.STEP_COLUMN, ctx.COLOR_DIVIDING_OPERATION_STEPS)
+    print('{NUMBER} files written'.format(NUMBER=len(output_file_paths)))
+    sys.exit(0)
@@ -0,0 +1,197 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+This script applies find/replace rules to columns of the Procedure work sheet of all Excel procedures, e.g. when a TM
+was renamed or a pattern has to be changed in every procedure. The workbooks are processed in parallel processes.
+Without --apply nothing is written and the changes are printed as a diff (dry run).
+With --apply the changed workbooks are saved (only cell values change, fills like the dividers of the operation steps
+and the other formatting are kept) and the PLUTO files of the changed workbooks and the se.xml files of their folders are
+generated again.
+Usage:
+python Refactor_procedures.py --replace ID CAM8711 CAM8712                    (dry run: print the diff)
+python Refactor_procedures.py --regex RAW "^@\$VAL$" "@\$VALUE" --apply       (change the workbooks)
+python Refactor_procedures.py --replace OPERATIONS "CHECK TM" "CHECKTM" --replace ENG "ON" "1" --apply
+Columns: STEP, OPERATIONS, ID, DESCRIPTION, TYPE, RAW, ENG, UNIT, DISPLAY, CONFIRMATION (as in ConversionContext)
+Output:
+The diff, one changed cell per two lines, and the list of written files.
+
+INFO: openpyxl does not keep images and charts of a workbook it saves. Workbooks containing some are not changed and reported as error.
+Only xlsx workbooks are changed, procedures exported to json, csv, tsv or ods (see Procedure_readers.py) are skipped and
+reported as notice.
+'''
+
+import argparse
+import concurrent.futures
+import os
+import re
+import sys
+import tempfile
+
+import openpyxl as op
+
+import Output_archive as output_archive
+import ProcedureConverter_xlsx2pluto as procedure_converter
+import Procedure_readers as procedure_readers
+import SE_structureConverter_xlsx2seXml as se_converter
+
+
+def get_rules(ctx, replace_arguments, regex_arguments):
+    '''
+    Returns the compiled rules of the command line.
+    :param ctx, replace_arguments, regex_arguments: lists of [column name, find, replacement]
+    :return rules: list of (column letter, compiled pattern, replacement), the --replace rules before the --regex rules
+    '''
+    rules = []
+    for arguments, is_regex in [(replace_arguments or [], False), (regex_arguments or [], True)]:
+        for column_name, find, replacement in arguments:
+            column_name = column_name.upper()
+            if column_name not in _COLUMN_NAMES:
+                raise ValueError('Unknown column {COLUMN}, known columns: {COLUMNS}'.format(COLUMN=column_name, COLUMNS=', '.join(_COLUMN_NAMES)))
+            if is_regex:
+                rules.append((getattr(ctx, column_name + '_COLUMN'), re.compile(find), replacement))
+            else:
+                rules.append((getattr(ctx, column_name + '_COLUMN'), re.compile(re.escape(find)), replacement.replace('\\', '\\\\')))
+    return rules
+
+
+def refactor_workbook(input_file_path, rules, apply=False):
+    '''
+    Applies the rules to the Procedure work sheet of one workbook and saves it, if apply is set and something changed.
+    The workbook is replaced atomically. Runs inside of the worker processes of refactor_tree().
+    :param input_file_path, rules, apply:
+    :return changes: list of (coordinate, old value, new value)
+    '''
+    wb = op.load_workbook(input_file_path)
+    changes = []
+    try:
+        ws_procedure = wb['Procedure']
+        for column_letter in sorted(set(rule[0] for rule in rules)):
+            for cell in ws_procedure[column_letter]:
+                if not isinstance(cell.value, str):
+                    continue
+                value = cell.value
+                for rule_column_letter, pattern, replacement in rules:
+                    if rule_column_letter == column_letter:
+                        value = pattern.sub(replacement, value)
+                if value != cell.value:
+                    changes.append((cell.coordinate, cell.value, value))
+                    cell.value = value
+        if apply and changes:
+            if any(ws._images or ws._charts for ws in wb.worksheets):
+                raise ValueError('workbook contains images or charts, which would be lost, change it by hand')
+            fd, temporary_file_path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(input_file_path) or '.')
+            os.close(fd)
+            try:
+                wb.save(temporary_file_path)
+                os.chmod(temporary_file_path, os.stat(input_file_path).st_mode & 0o7777)   # mkstemp creates the file readable by the owner only
+                os.replace(temporary_file_path, input_file_path)
+            except BaseException:
+                os.remove(temporary_file_path)
+                raise
+    finally:
+        wb.close()
+    return changes
+
+
+def refactor_tree(ctx, rules, apply=False, jobs=None):
+    '''
+    Applies the rules to all xlsx procedures of the Excel folder in parallel processes.
+    :param ctx, rules, apply:
+    :param jobs: number of processes, all processors if None
+    :return changes: list of (file, changes of the workbook or the error message) in the order of the workbooks
+    :return skipped_files: procedures in other formats, which are not changed
+    '''
+    files, skipped_files = [], []
+    for file in procedure_converter.get_list_of_excelsheet_paths(ctx.excel_folder):
+        if procedure_readers.get_workbook_format(file) == 'xlsx':
+            files.append(file)
+        else:
+            skipped_files.append(file)
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+    futures = [executor.submit(refactor_workbook, os.path.join(ctx.excel_folder, file), rules, apply) for file in files]
+    changes = []
+    for file, future in zip(files, futures):
+        try:
+            changes.append((file, future.result()))
+        except Exception as error:
+            changes.append((file, '{TYPE}: {ERROR}'.format(TYPE=type(error).__name__, ERROR=error)))
+    executor.shutdown()
+    return changes, skipped_files
+
+
+def print_diff(ctx, changes):
+    '''
+    Prints the changed cells as a diff.
+    :param ctx, changes:
+    :return :
+    '''
+    for file, changes_of_file in changes:
+        if isinstance(changes_of_file, str):
+            print('{FILE}: error: {ERROR}'.format(FILE=os.path.join(ctx.excel_folder, file), ERROR=changes_of_file), file=sys.stderr)
+            continue
+        for coordinate, old_value, new_value in changes_of_file:
+            print('{FILE}:Procedure:{COORDINATE}'.format(FILE=os.path.join(ctx.excel_folder, file), COORDINATE=coordinate))
+            print('- ' + old_value.replace('\n', '\\n'))
+            print('+ ' + new_value.replace('\n', '\\n'))
+    return
+
+
+def regenerate_outputs(ctx, se_ctx, changed_files):
+    '''
+    Generates the PLUTO files of the changed workbooks and the se.xml files of their folders again.
+    :param ctx, se_ctx, changed_files:
+    :return output_file_paths, diagnostics:
+    '''
+    output_file_paths, diagnostics = [], []
+    for file in changed_files:
+        output_file_path = procedure_converter.get_output_file_path(ctx, file)
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        diagnostics.extend(procedure_converter.main_function(ctx, os.path.join(ctx.excel_folder, file), output_file_path))
+        output_file_paths.append(output_file_path)
+    all_files = se_converter.get_list_of_excelsheet_paths(se_ctx.excel_folder)
+    for folder in sorted(set(os.path.dirname(file) for file in changed_files)):
+        folder_models = [se_converter.read_procedure_model(os.path.join(se_ctx.excel_folder, file), file, se_ctx) for file in all_files if os.path.dirname(file) == folder]
+        output_file_path = se_converter.get_se_xml_file_path(se_ctx, folder)
+        output_archive.write_output_file(None, output_file_path, se_converter.build_se_xml(folder_models).decode('utf-8'))
+        output_file_paths.append(output_file_path)
+    return output_file_paths, diagnostics
+
+
+##############################
+# Definitions of global variables
+_COLUMN_NAMES = ['STEP', 'OPERATIONS', 'ID', 'DESCRIPTION', 'TYPE', 'RAW', 'ENG', 'UNIT', 'DISPLAY', 'CONFIRMATION']
+##############################
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Find/replace in columns of the Procedure work sheet of all Excel procedures.')
+    ap.add_argument('--replace', nargs=3, action='append', metavar=('COLUMN', 'TEXT', 'REPLACEMENT'), help='replace a text (can be given several times)')
+    ap.add_argument('--regex', nargs=3, action='append', metavar=('COLUMN', 'PATTERN', 'REPLACEMENT'), help='replace a regular expression, \\1 in the replacement for groups (can be given several times)')
+    ap.add_argument('-i', '--excel_folder', default='Excel', help='folder containing the Excel procedures')
+    ap.add_argument('-o', '--output_folder', default='generated_MATIS_Files', help='folder of the generated MATIS files')
+    ap.add_argument('--apply', action='store_true', help='save the changed workbooks and generate their outputs again (default: dry run)')
+    ap.add_argument('--no_regenerate', action='store_true', help='with --apply: only save the workbooks')
+    ap.add_argument('-j', '--jobs', type=int, help='number of processes (default: all processors)')
+    args = vars(ap.parse_args())
+    if not args['replace'] and not args['regex']:
+        ap.error('at least one --replace or --regex rule is needed')
+    ctx = procedure_converter.ConversionContext(excel_folder=args['excel_folder'], output_folder=args['output_folder'])
+    try:
+        rules = get_rules(ctx, args['replace'], args['regex'])
+    except (ValueError, re.error) as error:
+        ap.error(str(error))
+    changes, skipped_files = refactor_tree(ctx, rules, args['apply'], args['jobs'])
+    for file in skipped_files:
+        print('{FILE}: notice: skipped, only xlsx workbooks can be refactored'.format(FILE=os.path.join(ctx.excel_folder, file)), file=sys.stderr)
+    print_diff(ctx, changes)
+    changed_files = [file for file, changes_of_file in changes if changes_of_file and not isinstance(changes_of_file, str)]
+    print('{CELLS} cell(s) in {FILES} workbook(s) {ACTION}'.format(CELLS=sum(len(changes_of_file) for file, changes_of_file in changes if not isinstance(changes_of_file, str)),
+                                                                  FILES=len(changed_files), ACTION='changed' if args['apply'] else 'would change (dry run, use --apply)'), file=sys.stderr)
+    if args['apply'] and changed_files and not args['no_regenerate']:
+        se_ctx = se_converter.SEConversionContext(excel_folder=args['excel_folder'], output_folder=args['output_folder'])
+        output_file_paths, diagnostics = regenerate_outputs(ctx, se_ctx, changed_files)
+        for output_file_path in output_file_paths:
+            print('written: ' + output_file_path, file=sys.stderr)
+        for diagnostic in diagnostics:
+            print(procedure_converter.format_diagnostic(diagnostic), file=sys.stderr)
+    sys.exit(1 if any(isinstance(changes_of_file, str) for file, changes_of_file in changes) else 0)
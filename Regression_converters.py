@@ -0,0 +1,284 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+This script compares the output of two versions of the converters on the same Excel tree. Both versions run in
+parallel in their own workspace, afterwards the generated .pluto and .se.xml files are compared in parallel processes.
+Volatile lines (e.g. the date of auto-generation) are removed before comparing.
+Usage:
+python Regression_converters.py                             (working tree against the last commit, Excel folder of the cwd)
+python Regression_converters.py --old v1.0 --new HEAD -i <Excel folder>
+python Regression_converters.py --old <folder with old scripts> --show-diff
+Output:
+A summary of added, removed and changed files and of the changed hunks per write_* handler. Exit code 0 if the outputs
+are identical, 1 if they differ and 2 if a converter failed.
+
+INFO: The handler of a hunk is guessed from the generated lines (see _HANDLER_PATTERNS), it is meant as an orientation.
+'''
+
+import argparse
+import collections
+import concurrent.futures
+import difflib
+import glob
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def get_converter_version(version, destination):
+    '''
+    Puts all scripts of a version (every top-level .py file, since the converters import modules next to them) into
+    the destination folder.
+    :param version: folder containing the scripts or git revision of this repository
+    :param destination:
+    :return :
+    '''
+    os.makedirs(destination, exist_ok=True)
+    if os.path.isdir(version):
+        for script_path in glob.glob(os.path.join(version, '*.py')):
+            shutil.copy(script_path, os.path.join(destination, os.path.basename(script_path)))
+        return
+    completed = subprocess.run(['git', 'ls-tree', '--name-only', version], cwd=_SCRIPT_DIRECTORY, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if completed.returncode != 0:
+        raise RuntimeError('Cannot list the scripts of version {VERSION}: {ERROR}'.format(VERSION=version, ERROR=completed.stderr))
+    for script in [file for file in completed.stdout.splitlines() if file.endswith('.py')]:
+        completed = subprocess.run(['git', 'show', '{VERSION}:{SCRIPT}'.format(VERSION=version, SCRIPT=script)], cwd=_SCRIPT_DIRECTORY, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if completed.returncode != 0:
+            raise RuntimeError('Cannot get {SCRIPT} of version {VERSION}: {ERROR}'.format(SCRIPT=script, VERSION=version, ERROR=completed.stderr.decode(errors='replace')))
+        fo = open(os.path.join(destination, script), 'wb')
+        fo.write(completed.stdout)
+        fo.close()
+    return
+
+
+def prepare_workspace(workspace, excel_folder):
+    '''
+    Creates a workspace whose "Excel" folder is the given Excel folder (symbolic link if possible, copy otherwise).
+    :param workspace, excel_folder:
+    :return :
+    '''
+    os.makedirs(workspace, exist_ok=True)
+    try:
+        os.symlink(os.path.abspath(excel_folder), os.path.join(workspace, 'Excel'), target_is_directory=True)
+    except (OSError, NotImplementedError):
+        shutil.copytree(excel_folder, os.path.join(workspace, 'Excel'))
+    return
+
+
+def run_version(scripts_folder, workspace):
+    '''
+    Runs the procedure converter and afterwards the se.xml converter of one version with their default arguments.
+    Versions knowing --quiet are run with it, since the console output slows them down considerably.
+    :param scripts_folder, workspace:
+    :return seconds, errors:
+    '''
+    errors = []
+    start = time.perf_counter()
+    for script in _CONVERTER_SCRIPTS:
+        fi = open(os.path.join(scripts_folder, script), 'r', errors='replace')
+        arguments = ['--quiet'] if "'--quiet'" in fi.read() else []
+        fi.close()
+        completed = subprocess.run([sys.executable, os.path.join(scripts_folder, script)] + arguments, cwd=workspace, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+        if completed.returncode != 0:
+            errors.append('{SCRIPT} failed:\n{ERROR}'.format(SCRIPT=script, ERROR=completed.stderr))
+    return time.perf_counter() - start, errors
+
+
+def get_output_files(output_folder):
+    '''
+    Returns the generated .pluto and .se.xml files relative to the output folder.
+    :param output_folder:
+    :return output_files:
+    '''
+    output_files = set()
+    for subdir, dirs, files in os.walk(output_folder):
+        for file in files:
+            if file.endswith('.pluto') or file.endswith('.se.xml'):
+                output_files.add(os.path.relpath(os.path.join(subdir, file), output_folder))
+    return output_files
+
+
+def read_normalised_lines(file_path):
+    '''
+    Reads a generated file without the volatile lines.
+    :param file_path:
+    :return lines:
+    '''
+    fi = open(file_path, 'r', errors='replace')
+    lines = [line for line in fi.read().splitlines() if not any(pattern.match(line) for pattern in _VOLATILE_LINE_PATTERNS)]
+    fi.close()
+    return lines
+
+
+def get_handler_of_line(file, line):
+    '''
+    Guesses which handler of the converters generated a line.
+    :param file, line:
+    :return handler:
+    '''
+    if file.endswith('.se.xml'):
+        return 'build_se_xml'
+    stripped_line = line.strip()
+    for pattern, handler in _HANDLER_PATTERNS:
+        if pattern.search(stripped_line):
+            return handler
+    return 'other'
+
+
+def compare_file(old_output_folder, new_output_folder, file, show_diff):
+    '''
+    Compares one generated file of both versions.
+    :param old_output_folder, new_output_folder, file, show_diff:
+    :return file, hunks_per_handler, diff_text:
+    '''
+    old_lines = read_normalised_lines(os.path.join(old_output_folder, file))
+    new_lines = read_normalised_lines(os.path.join(new_output_folder, file))
+    if old_lines == new_lines:
+        return file, {}, ''
+    hunks_per_handler = collections.Counter()
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for group in matcher.get_grouped_opcodes(0):
+        handlers = set()
+        for tag, old_start, old_end, new_start, new_end in group:
+            if tag != 'equal':
+                for line in old_lines[old_start:old_end] + new_lines[new_start:new_end]:
+                    handlers.add(get_handler_of_line(file, line))
+        for handler in handlers:
+            hunks_per_handler[handler] += 1
+    diff_text = ''
+    if show_diff:
+        diff_text = '\n'.join(difflib.unified_diff(old_lines, new_lines, 'old/' + file, 'new/' + file, lineterm='')) + '\n'
+    return file, dict(hunks_per_handler), diff_text
+
+
+def compare_outputs(old_output_folder, new_output_folder, jobs=None, show_diff=False):
+    '''
+    Compares all generated files of both versions in parallel processes.
+    :param old_output_folder, new_output_folder, jobs, show_diff:
+    :return added_files, removed_files, changed_files: changed_files maps file -> (hunks_per_handler, diff_text)
+    '''
+    old_files = get_output_files(old_output_folder)
+    new_files = get_output_files(new_output_folder)
+    common_files = sorted(old_files & new_files)
+    changed_files = collections.OrderedDict()
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+    for file, hunks_per_handler, diff_text in executor.map(compare_file, [old_output_folder] * len(common_files), [new_output_folder] * len(common_files), common_files, [show_diff] * len(common_files), chunksize=8):
+        if hunks_per_handler:
+            changed_files[file] = (hunks_per_handler, diff_text)
+    executor.shutdown()
+    return sorted(new_files - old_files), sorted(old_files - new_files), changed_files
+
+
+def print_summary(added_files, removed_files, changed_files, number_of_compared_files):
+    '''
+    Prints the changed files and the hunks per handler.
+    :param added_files, removed_files, changed_files, number_of_compared_files:
+    :return :
+    '''
+    hunks_per_handler = collections.Counter()
+    for file in changed_files:
+        hunks_per_handler.update(changed_files[file][0])
+    print('compared files: {COMPARED}, changed: {CHANGED}, added: {ADDED}, removed: {REMOVED}'.format(
+        COMPARED=number_of_compared_files, CHANGED=len(changed_files), ADDED=len(added_files), REMOVED=len(removed_files)))
+    for file in added_files:
+        print('  added:   ' + file)
+    for file in removed_files:
+        print('  removed: ' + file)
+    for file in changed_files:
+        print('  changed: {FILE} ({HUNKS} hunks)'.format(FILE=file, HUNKS=sum(changed_files[file][0].values())))
+    if hunks_per_handler:
+        print('hunks per handler:')
+        for handler, hunks in hunks_per_handler.most_common():
+            print('  {HANDLER:<45} {HUNKS:>6}'.format(HANDLER=handler, HUNKS=hunks))
+    return
+
+
+##############################
+# Definitions of global variables
+_SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+# run one after the other
+_CONVERTER_SCRIPTS = ['ProcedureConverter_xlsx2pluto.py', 'SE_structureConverter_xlsx2seXml.py']
+# lines which differ between two runs of the same version
+_VOLATILE_LINE_PATTERNS = [re.compile(r'^// Date for Base Code auto-generation:')]
+# (pattern of a generated line without indentation, handler writing it), the first matching pattern wins
+_HANDLER_PATTERNS = [(re.compile(pattern), handler) for pattern, handler in [
+    (r'^// (CALL PROCEDURE|TITLE|REASON):', 'write_PROCEDURE'),
+    (r'^//NON STANDARD COMMAND', 'write_PROCEDURE'),
+    (r'^//COMMAND HAS NOT YET BEEN DEFINED', 'get_with_directives_string'),
+    (r'^//', 'write_front_page_documentation_as_comment_into_f/write_else'),
+    (r'^(procedure|end procedure)$', 'generate_code'),
+    (r'^(initiate and confirm step |end step;)', 'write_OPERATIONS_and_add_step'),
+    (r'^(declare|end declare)$|^variable ', 'write_DECLARE_VARIABLES/write_DECLARE_TM_CHECK_VARIABLES'),
+    (r'execute_and_get_return of Command_Line', 'write_EXECUTEINTERMINALONMCSMACHINE'),
+    (r'Send of Email of Communicator|^(Subject|Message|ToMail|ToName) :=', 'write_CALLENGINEER'),
+    (r'^initiate and confirm .* of MIB_TCs of ', 'write_SEND_WITH_TCV'),
+    (r'^initiate and confirm ', 'write_PROCEDURE'),
+    (r'^initiate ', 'write_SEND'),
+    (r'^wait for 0\.5s;', 'write_SEND'),
+    (r'^wait for ', 'write_WAIT'),
+    (r'^(with directives|dynamic_ptv|static_ptv|execution_time|release_time|execution_verification)', 'get_with_directives_string'),
+    (r'^(with arguments|end with;?)$|^raw value of |^eng value of ', 'write_value_plus_add_type_and_description_as_comment'),
+    (r'^if (raw|eng)_value of |^(warn|log) "', 'write_CHECKTM'),
+    (r':= (raw|eng)_value of ', 'check_TM_and_write_into_variable'),
+    (r'^in case ', 'write_SELECT_CASE'),
+    (r'^(or )?is ', 'write_CASE/write_DOLLAR'),
+    (r'^otherwise:', 'write_CASE_ELSE'),
+    (r'^end case;', 'write_END_CASE'),
+    (r'^else if ', 'write_ELSEIF'),
+    (r'^if ', 'write_IF/write_IFIN'),
+    (r'^else$', 'write_ELSE'),
+    (r'^end if;', 'write_END_IF/write_CHECKTM'),
+    (r':=', 'write_value_plus_add_type_and_description_as_comment/write_DOLLAR'),
+    (r'^$', 'empty lines')]]
+##############################
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Compares the output of two converter versions on the same Excel tree.')
+    ap.add_argument('-i', '--excel_folder', default='Excel', help='folder containing the Excel procedures')
+    ap.add_argument('--old', default='HEAD', help='old version: git revision or folder containing the scripts (default: HEAD)')
+    ap.add_argument('--new', default=_SCRIPT_DIRECTORY, help='new version: git revision or folder containing the scripts (default: working tree)')
+    ap.add_argument('-j', '--jobs', type=int, help='number of processes for the comparison (default: all processors)')
+    ap.add_argument('--show-diff', action='store_true', help='print the unified diff of every changed file')
+    ap.add_argument('--keep', action='store_true', help='keep the workspaces and print their location')
+    args = vars(ap.parse_args())
+
+    temporary_folder = tempfile.mkdtemp(prefix='matis_regression_')
+    exit_code = 0
+    try:
+        workspaces = {}
+        for name in ['old', 'new']:
+            get_converter_version(args[name], os.path.join(temporary_folder, name, 'scripts'))
+            workspaces[name] = os.path.join(temporary_folder, name, 'workspace')
+            prepare_workspace(workspaces[name], args['excel_folder'])
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        runs = dict((name, executor.submit(run_version, os.path.join(temporary_folder, name, 'scripts'), workspaces[name])) for name in ['old', 'new'])
+        failed = False
+        for name in ['old', 'new']:
+            seconds, errors = runs[name].result()
+            print('{NAME} version ({VERSION}) converted in {SECONDS:.1f} s'.format(NAME=name, VERSION=args[name], SECONDS=seconds))
+            for error in errors:
+                print(error)
+                failed = True
+        executor.shutdown()
+        if failed:
+            exit_code = 2
+        else:
+            start = time.perf_counter()
+            added_files, removed_files, changed_files = compare_outputs(os.path.join(workspaces['old'], 'generated_MATIS_Files'), os.path.join(workspaces['new'], 'generated_MATIS_Files'), args['jobs'], args['show_diff'])
+            number_of_compared_files = len(get_output_files(os.path.join(workspaces['new'], 'generated_MATIS_Files')) - set(added_files))
+            print('compared in {SECONDS:.1f} s'.format(SECONDS=time.perf_counter() - start))
+            for file in changed_files:
+                sys.stdout.write(changed_files[file][1])
+            print_summary(added_files, removed_files, changed_files, number_of_compared_files)
+            exit_code = 1 if added_files or removed_files or changed_files else 0
+    finally:
+        if args['keep']:
+            print('workspaces kept in ' + temporary_folder)
+        else:
+            shutil.rmtree(temporary_folder, ignore_errors=True)
+    sys.exit(exit_code)
@@ -9,25 +9,42 @@ procedure is included. The se.xml file contains information about the content of
 include procedure names, their configuration and their input arguments with description and ID.
 Input:
 "Excel" folder located inside the current workspace. It iterates through all sub-folders, reads in each Excel procedures
-and extracts the needed information.
+and extracts the needed information. Exported procedures (json, csv/tsv, ods) and archives of the Excel tree are read as
+well, see Procedure_readers.py.
 Output:
 A se.xml file containing the name, configuration, ID and input arguments of all procedures inside each folder containing
 Excel procedures.
 The file name is the current sub-folder name plus .se.xml .
+Library usage:
+read_procedure_model() reads the se.xml relevant content of one Excel procedure and build_se_xml() returns the se.xml
+file of a folder as bytes. Both do not write to the file system.
+With --cache_folder the arguments of the workbooks are kept in a conversion cache (see Conversion_cache.py), so
+unchanged workbooks are not read again.
+With --output_archive the se.xml files are written into one zip archive with a manifest of their hashes instead of the
+output folder (see Output_archive.py).
+With --isolate the workbooks are read in isolated worker processes with the time and memory budget of --timeout and
+--memory_budget; the se.xml file of a folder with a failed workbook is not written, the other folders are (see
+Isolated_workers.py).
+With --shard i/n only the folders of shard i of n are converted and a manifest of the shard is written, see
+Conversion_shards.py.
 
 DISCLAIMER: It is just a tool to make life easier. Please check each generated file for errors before implementing it.
             This code might contain overseen bugs.
 '''
 import openpyxl as op  # use version 2.5.3, newer versions might not work
+import argparse
+import collections
+import copy
+import io
 import os
+import sys
 
-def get_last_folder_name(_files):
-    try:
-        _file_path = _files.rsplit('\\')[1]
-    except:
-        _file_path = None
-    return _file_path
-
+import Conversion_cache as conversion_cache
+import Conversion_shards as conversion_shards
+import Isolated_workers as isolated_workers
+import MATIS_type_registry as type_registry
+import Output_archive as output_archive
+import Procedure_readers as procedure_readers
 
 def escape_special_characters(_procedure_description, _argument_description):
     """
@@ -38,123 +55,322 @@ def escape_special_characters(_procedure_description, _argument_description):
     return _converted_procedure_description, _converted_argument_description
 
 
-def get_procedure_name_and_description(_names_of_current_level, _folder_level):
+def get_procedure_name_and_description(_names_of_current_level):
     """
     Extracts the procedure name and its description from the file name and Returns these as string.
     """
-    try:
-        _procedure_name = files.rsplit('\\', 1)[0]
-        file_path = _names_of_current_level.rsplit('\\')[1]
-    except:
-        print('', end='')
-		
     a = _names_of_current_level.find("_")
     _procedure_name = _names_of_current_level[0:a]
-    try:
-        _procedure_description = _names_of_current_level[a::].rsplit('.xlsx', 1)[0].replace('_', ' ')
-        if _procedure_description.startswith(' '):
-            _procedure_description = _procedure_description[1::]
-    except:
-        print('', end='')
+    _procedure_description = procedure_readers.strip_workbook_extension(_names_of_current_level[a::]).replace('_', ' ')
+    if _procedure_description.startswith(' '):
+        _procedure_description = _procedure_description[1::]
     return _procedure_name, _procedure_description
-    
 
-def get_flags(_current_last_folder_name, _past_last_folder_name, _list_of_excelsheet_paths, _counter_nth_file):
-    if _past_last_folder_name != _current_last_folder_name:
-        _flag_xml_new_file = 1
-    else:
-        _flag_xml_new_file = 0
-    try:
-        _future_last_folder_name = get_last_folder_name(_list_of_excelsheet_paths[_counter_nth_file + 1])
-    except:
-        _future_last_folder_name = 'None'
 
-    if _future_last_folder_name != _current_last_folder_name or _future_last_folder_name == 'None':
-        _flag_end_of_xml_file = 1
-    else:
-        _flag_end_of_xml_file = 0
-    return _flag_xml_new_file, _flag_end_of_xml_file
+def get_argument_name_and_description(ctx, _workbook_source):
+    """
+    Returns argument ID, Description and Type extracted from the corresponding Excel file.
+    :param ctx: SEConversionContext
+    :param _workbook_source: complete file path, bytes or binary file object
+    :return: argument ID, Description and Type
+    """
+    if ctx.cache is None or not isinstance(_workbook_source, (str, bytes, bytearray)):
+        return read_argument_name_and_description(ctx, _workbook_source)
+    if isinstance(_workbook_source, str):
+        _workbook_source = procedure_readers.read_workbook_bytes(_workbook_source)
+    cache_key = ctx.cache.get_key(_workbook_source, get_converter_source_file_paths(), {'layout': conversion_cache.get_layout_settings(ctx)})
+    arguments = ctx.cache.load(cache_key)
+    if arguments is None:
+        arguments = read_argument_name_and_description(ctx, _workbook_source)
+        try:
+            ctx.cache.store(cache_key, arguments)
+        except TypeError:
+            pass    # cell values json cannot store (e.g. dates) are read again next time
+    return arguments
+
+
+def read_argument_name_and_description(ctx, _workbook_source):
+    """
+    Reads argument ID, Description and Type from the Excel file, without the conversion cache.
+    :param ctx: SEConversionContext
+    :param _workbook_source: complete file path, bytes or binary file object
+    :return: argument ID, Description and Type
+    """
+    _file_name = _workbook_source if isinstance(_workbook_source, str) else None
+    _workbook_source = procedure_readers.resolve_workbook_source(_workbook_source)
+    if procedure_readers.get_workbook_format(_workbook_source, _file_name) != 'xlsx':
+        return get_argument_name_and_description_of_worksheet(ctx, procedure_readers.read_workbook(_workbook_source, None, _file_name)['Procedure'])
+    if isinstance(_workbook_source, (bytes, bytearray)):
+        _workbook_source = io.BytesIO(_workbook_source)
+    wb = op.load_workbook(_workbook_source, data_only=True)
+    try:
+        return get_argument_name_and_description_of_worksheet(ctx, wb['Procedure'])
+    finally:
+        wb.close()
 
 
-def get_argument_name_and_description(_file_with_path):
+def get_argument_name_and_description_of_worksheet(ctx, ws_procedure):
     """
-    Returns argument ID, Description and Type extracted from the corresponding Excel file.
-    :param _file_with_path: complete file path
+    Returns argument ID, Description and Type of an already loaded Procedure work sheet (openpyxl or WorksheetSnapshot
+    of ProcedureConverter_xlsx2pluto.py).
+    :param ctx: SEConversionContext
+    :param ws_procedure: Procedure work sheet
     :return: argument ID, Description and Type
     """
-    print(_file_with_path)
-    wb = op.load_workbook(_file_with_path, data_only=True)
-    ws_procedure = wb['Procedure']
     arguments_ID, arguments_DESCRIPTION, arguments_TYPE = [], [], []
-    row_number = 0
-    for row in ws_procedure['{START_LETTER}1:{STOP_LETTER}20'.format(START_LETTER=_OPERATIONS_COLUMN, STOP_LETTER=_OPERATIONS_COLUMN)]:
-        row_number += 1
-        for cell in row:
-            if str(cell.internal_value).startswith('Parameters:'):
-                row_number_parameter_start = row_number
-                break
-        else:
-            continue
-        break
+    row_number_parameter_start = None
+    for row_number in range(1, 21):
+        if str(ws_procedure['{OPERATIONS_COLUMN}{ROW_NUMBER}'.format(OPERATIONS_COLUMN=ctx.OPERATIONS_COLUMN, ROW_NUMBER=row_number)].internal_value).startswith('Parameters:'):
+            row_number_parameter_start = row_number
+            break
+    if row_number_parameter_start is None:
+        raise ValueError('No "Parameters:" row found in the first 20 rows of column ' + ctx.OPERATIONS_COLUMN)
     row_number_current = row_number_parameter_start
-    while ws_procedure['{ID_COLUMN}{ROW_NUMBER_CURRENT}'.format(ID_COLUMN=_ID_COLUMN, ROW_NUMBER_CURRENT=row_number_current)].internal_value != None:
-        arguments_ID.append(str(ws_procedure['{ID_COLUMN}{ROW_NUMBER_CURRENT}'.format(ID_COLUMN=_ID_COLUMN, ROW_NUMBER_CURRENT=row_number_current)].internal_value).replace('$', ''))
-        arguments_DESCRIPTION.append(ws_procedure['{DESCRIPTION_COLUMN}{ROW_NUMBER_CURRENT}'.format(DESCRIPTION_COLUMN=_DESCRIPTION_COLUMN, ROW_NUMBER_CURRENT=row_number_current)].internal_value)
-        arguments_TYPE.append(ws_procedure['{TYPE_COLUMN}{ROW_NUMBER_CURRENT}'.format(TYPE_COLUMN=_TYPE_COLUMN, ROW_NUMBER_CURRENT=row_number_current)].internal_value)
+    while ws_procedure['{ID_COLUMN}{ROW_NUMBER_CURRENT}'.format(ID_COLUMN=ctx.ID_COLUMN, ROW_NUMBER_CURRENT=row_number_current)].internal_value != None:
+        arguments_ID.append(str(ws_procedure['{ID_COLUMN}{ROW_NUMBER_CURRENT}'.format(ID_COLUMN=ctx.ID_COLUMN, ROW_NUMBER_CURRENT=row_number_current)].internal_value).replace('$', ''))
+        arguments_DESCRIPTION.append(ws_procedure['{DESCRIPTION_COLUMN}{ROW_NUMBER_CURRENT}'.format(DESCRIPTION_COLUMN=ctx.DESCRIPTION_COLUMN, ROW_NUMBER_CURRENT=row_number_current)].internal_value)
+        arguments_TYPE.append(ws_procedure['{TYPE_COLUMN}{ROW_NUMBER_CURRENT}'.format(TYPE_COLUMN=ctx.TYPE_COLUMN, ROW_NUMBER_CURRENT=row_number_current)].internal_value)
         row_number_current += 1
     # print(arguments_ID, arguments_DESCRIPTION, arguments_TYPE)
     return arguments_ID, arguments_DESCRIPTION, arguments_TYPE
 
 
-def write_seXml_files(_current_last_folder_name, _paths_without_file, _procedure_name, _procedure_description, _flag_new_file, _flag_last_procedure_in_folder, _arguments_name, _arguments_description, _arguments_type, _counter_nth_file):
-    file_output_path = str(_paths_without_file[_counter_nth_file]).replace('\\Excel\\', '\\generated_MATIS_Files\\')
-    fo = open(file_output_path + '\\' + _current_last_folder_name + '.se.xml', 'a+')
-    if _flag_new_file:
-        fo.close()
-        try:
-            os.remove(str(file_output_path) + '\\' + _current_last_folder_name + '.se.xml')
-        except:
-            print('', end='')
-        fo = open(file_output_path + '\\' + _current_last_folder_name + '.se.xml', 'a+')
-        fo.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<LocalSystemElement SchemaVersion="1.0">\n')
-    fo.write('\t<SEObject Name="{PROCEDURE_NAME}">\n'.format(PROCEDURE_NAME=_procedure_name))
-    _procedure_description, _ = escape_special_characters(_procedure_description, _arguments_description)
-    fo.write(
-        '\t\t<ActivityDefinition Description="{PROCEDURE_DESCRIPTION}" Constraints="" Objectives="" Preconditions="" Postconditions="" EstimatedDuration="000:00:05:00.000" ValidationState="draft">\n'.format(
-            PROCEDURE_DESCRIPTION=_procedure_description))
-    for_counter = 0
-    for _argument_name,_argument_description,_argument_type in zip(_arguments_name,_arguments_description, _arguments_type):
-        _, _argument_description = escape_special_characters(_procedure_description, _argument_description)
-        _argument_type = convert_TYPE_from_SCOS_to_MATIS(_argument_type)
+def read_procedure_model(workbook_source, file_name, context=None):
+    """
+    Reads everything the se.xml file needs from one Excel procedure.
+    :param workbook_source: complete file path, bytes or binary file object
+    :param file_name: Excel file name, e.g. R-ADC-N210_Activate_cADCS.xlsx (name and description are taken from it)
+    :param context: SEConversionContext, the default context is used if None
+    :return: ProcedureModel
+    """
+    ctx = context if context is not None else _DEFAULT_CONTEXT
+    procedure_name, procedure_description = get_procedure_name_and_description(os.path.basename(file_name))
+    procedure_name = str(procedure_name).replace('-', '_')
+    arguments_ID, arguments_DESCRIPTION, arguments_TYPE = get_argument_name_and_description(ctx, workbook_source)
+    return ProcedureModel(procedure_name, procedure_description, list(zip(arguments_ID, arguments_DESCRIPTION, arguments_TYPE)))
+
+
+def get_procedure_model_of_worksheet(ws_procedure, file_name, context=None):
+    """
+    Like read_procedure_model(), for an already loaded Procedure work sheet.
+    :param ws_procedure: Procedure work sheet (openpyxl or WorksheetSnapshot)
+    :param file_name: Excel file name (name and description are taken from it)
+    :param context: SEConversionContext, the default context is used if None
+    :return: ProcedureModel
+    """
+    ctx = context if context is not None else _DEFAULT_CONTEXT
+    procedure_name, procedure_description = get_procedure_name_and_description(os.path.basename(file_name))
+    procedure_name = str(procedure_name).replace('-', '_')
+    arguments_ID, arguments_DESCRIPTION, arguments_TYPE = get_argument_name_and_description_of_worksheet(ctx, ws_procedure)
+    return ProcedureModel(procedure_name, procedure_description, list(zip(arguments_ID, arguments_DESCRIPTION, arguments_TYPE)))
+
+
+def build_se_xml(folder_models):
+    """
+    Returns the se.xml file of one System Element (folder) as UTF-8 encoded bytes.
+    :param folder_models: ProcedureModels of all procedures inside the folder, in output order
+    :return: se.xml content
+    """
+    fo = io.StringIO()
+    fo.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<LocalSystemElement SchemaVersion="1.0">\n')
+    for model in folder_models:
+        fo.write('\t<SEObject Name="{PROCEDURE_NAME}">\n'.format(PROCEDURE_NAME=model.name))
+        _procedure_description, _ = escape_special_characters(model.description, None)
         fo.write(
-            '\t\t\t<Argument Name="{ARGUMENT_NAME}" Description="{ARGUMENT_DESCRIPTION}">\n\t\t\t\t<Scalar Type="{ARGUMENT_TYPE}"/>\n\t\t\t</Argument>\n'.format(
-                ARGUMENT_NAME=_argument_name, ARGUMENT_TYPE=_argument_type, ARGUMENT_DESCRIPTION=_argument_description))
-        for_counter += 1
-    fo.write('\t\t</ActivityDefinition>\n')
-    fo.write('\t</SEObject>\n')
-    if _flag_last_procedure_in_folder:
-        fo.write('</LocalSystemElement>\n')
-    fo.close()
-    return
+            '\t\t<ActivityDefinition Description="{PROCEDURE_DESCRIPTION}" Constraints="" Objectives="" Preconditions="" Postconditions="" EstimatedDuration="000:00:05:00.000" ValidationState="draft">\n'.format(
+                PROCEDURE_DESCRIPTION=_procedure_description))
+        for _argument_name, _argument_description, _argument_type in model.arguments:
+            _, _argument_description = escape_special_characters(None, _argument_description)
+            _argument_type = convert_TYPE_from_SCOS_to_MATIS(_argument_type)
+            fo.write(
+                '\t\t\t<Argument Name="{ARGUMENT_NAME}" Description="{ARGUMENT_DESCRIPTION}">\n\t\t\t\t<Scalar Type="{ARGUMENT_TYPE}"/>\n\t\t\t</Argument>\n'.format(
+                    ARGUMENT_NAME=_argument_name, ARGUMENT_TYPE=_argument_type, ARGUMENT_DESCRIPTION=_argument_description))
+        fo.write('\t\t</ActivityDefinition>\n')
+        fo.write('\t</SEObject>\n')
+    fo.write('</LocalSystemElement>\n')
+    return fo.getvalue().encode('utf-8')
 
 
 def convert_TYPE_from_SCOS_to_MATIS(current_TYPE_cell_value):
-    if str(current_TYPE_cell_value).startswith('Enum') or str(current_TYPE_cell_value).startswith('U8') or str(current_TYPE_cell_value).startswith('U16') or str(current_TYPE_cell_value).startswith('U32') or str(current_TYPE_cell_value).startswith('U64'):
-        return 'unsignedInteger'
-    elif str(current_TYPE_cell_value).startswith('S8') or str(current_TYPE_cell_value).startswith('S16') or str(current_TYPE_cell_value).startswith('S32') or str(current_TYPE_cell_value).startswith('S64'):
-        return 'signedInteger'
-    elif str(current_TYPE_cell_value).startswith('Boolean'):
-        return 'boolean'
-    elif str(current_TYPE_cell_value).startswith('Float'):
-        return 'real'
-    elif str(current_TYPE_cell_value).startswith('Octet Str') or str(current_TYPE_cell_value).startswith('Char Str'):
-        return 'string'
-    elif str(current_TYPE_cell_value).startswith('Abs Time') or str(current_TYPE_cell_value).startswith('Abs time'):
-        return 'absoluteTime'
-    elif str(current_TYPE_cell_value).startswith('Del Time') or str(current_TYPE_cell_value).startswith('Del time'):
-        return 'relativeTime'
-#TODO: change this to something that is working but unique, so that MATIS does not complain but user can identify "wrong" value type
-    return 'string'
+    """
+    Converts the SCOS types to the scalar types of se.xml files (see MATIS_type_registry.py).
+    """
+    return type_registry.get_se_xml_type(current_TYPE_cell_value)
+
+
+class SEConversionContext:
+    """
+    Holds the complete configuration of a se.xml conversion: layout of the Excel procedures, input and output folders
+    and console output.
+    :param excel_folder, output_folder, verbose, layout: layout overrides e.g. ID_COLUMN='C'
+    :param cache: Conversion_cache.ConversionCache of the arguments of the workbooks, None: no cache
+    :param output_archive: Output_archive.OutputArchive the se.xml files are written into, None: output folder
+    """
+    def __init__(self, excel_folder='Excel', output_folder='generated_MATIS_Files', verbose=False, cache=None, output_archive=None, **layout):
+        self.excel_folder = excel_folder
+        self.output_folder = output_folder
+        self.verbose = verbose
+        self.cache = cache
+        self.output_archive = output_archive
+        self.STEP_COLUMN = _STEP_COLUMN
+        self.OPERATIONS_COLUMN = _OPERATIONS_COLUMN
+        self.ID_COLUMN = _ID_COLUMN
+        self.DESCRIPTION_COLUMN = _DESCRIPTION_COLUMN
+        self.TYPE_COLUMN = _TYPE_COLUMN
+        for name in layout:
+            if not hasattr(self, name) or not name.isupper():
+                raise TypeError('Unknown layout setting: ' + name)
+            setattr(self, name, layout[name])
+
+    def log(self, *values):
+        if self.verbose:
+            print(*values)
+
+
+def get_converter_source_file_paths():
+    """
+    Returns the source files of the converter, changing one of them changes the version of the converter.
+    """
+    return [os.path.abspath(__file__), os.path.abspath(type_registry.__file__), os.path.abspath(procedure_readers.__file__)]
+
+
+def get_list_of_excelsheet_paths(excel_folder):
+    """
+    Returns the paths of all Excel procedures inside the Excel folder (or archive) relative to it.
+    Files inside of "old" folders and lock files (~) are skipped.
+    """
+    return procedure_readers.get_list_of_workbook_paths(excel_folder)
+
+
+def get_se_xml_file_path(ctx, folder):
+    """
+    Returns the output path of the se.xml file of a folder relative to the Excel folder.
+    The file name is the last folder name plus .se.xml .
+    """
+    last_folder_name = os.path.basename(os.path.normpath(os.path.join(ctx.excel_folder, folder)))
+    return os.path.join(ctx.output_folder, folder, last_folder_name + '.se.xml')
+
+
+def convert_tree(ctx, budget=None, shard=None):
+    """
+    Writes one se.xml file per folder of the Excel folder containing Excel procedures.
+    With an output archive in the context the folders are written sorted by path.
+    With a budget (Isolated_workers.WorkerBudget) the workbooks are read in isolated worker processes and the se.xml
+    file of a folder with a failed workbook is not written.
+    With a shard (i, n) only the folders of shard i of n are converted (see Conversion_shards.py).
+    :return failures: list of (workbook, code, message) of the workbooks failed in an isolated worker process
+    """
+    list_of_excelsheet_paths = get_list_of_excelsheet_paths(ctx.excel_folder)
+    if shard is not None:
+        list_of_excelsheet_paths = conversion_shards.select_shard(list_of_excelsheet_paths, shard)
+    if ctx.output_archive is not None:
+        list_of_excelsheet_paths.sort()
+    folders = collections.OrderedDict()
+    for file in list_of_excelsheet_paths:
+        folders.setdefault(os.path.dirname(file), []).append(file)
+    failures, isolated_models = [], {}
+    if budget is not None:
+        worker_ctx = copy.copy(ctx)
+        worker_ctx.output_archive = None
+        input_file_paths = [os.path.join(ctx.excel_folder, file) for folder in folders for file in folders[folder]]
+        for result in isolated_workers.run_isolated(read_isolated_procedure_model, input_file_paths, budget, initialize_isolated_worker, (worker_ctx,)):
+            ctx.log(result.item)
+            if result.status == 'ok':
+                isolated_models[result.item] = result.value
+            else:
+                failures.append((result.item, isolated_workers.get_failure_code(result.status), result.message))
+    for folder in folders:
+        folder_models = []
+        for file in folders[folder]:
+            file_with_complete_path = os.path.join(ctx.excel_folder, file)
+            if budget is None:
+                ctx.log(file_with_complete_path)
+                folder_models.append(read_procedure_model(file_with_complete_path, file, ctx))
+            elif file_with_complete_path in isolated_models:
+                folder_models.append(isolated_models[file_with_complete_path])
+        if len(folder_models) < len(folders[folder]):
+            continue
+        output_file_path = get_se_xml_file_path(ctx, folder)
+        output_archive.write_output_file(ctx.output_archive, output_file_path, build_se_xml(folder_models).decode('utf-8'))
+    return failures
+
+
+def write_shard_manifest(ctx, shard, archive_path=None):
+    """
+    Writes the manifest of the se.xml files of a shard into the output folder, or next to the output archive.
+    """
+    list_of_excelsheet_paths = get_list_of_excelsheet_paths(ctx.excel_folder)
+    folders = collections.OrderedDict((os.path.dirname(file), None) for file in conversion_shards.select_shard(list_of_excelsheet_paths, shard))
+    manifest_file_path = conversion_shards.get_shard_manifest_file_path(ctx.output_folder if archive_path is None else os.path.dirname(archive_path), 'se_xml', shard)
+    conversion_shards.write_shard_manifest(manifest_file_path, 'se_xml', shard, list_of_excelsheet_paths,
+                                           conversion_shards.get_output_hashes(ctx.output_folder, [get_se_xml_file_path(ctx, folder) for folder in folders], ctx.output_archive))
+    return manifest_file_path
+
+
+def initialize_isolated_worker(ctx):
+    """
+    Keeps the context in the isolated worker process.
+    """
+    global _ISOLATED_WORKER_CONTEXT
+    _ISOLATED_WORKER_CONTEXT = ctx
+
+
+def read_isolated_procedure_model(file_with_complete_path):
+    """
+    Reads the ProcedureModel of one Excel procedure inside of an isolated worker process.
+    """
+    return read_procedure_model(file_with_complete_path, file_with_complete_path, _ISOLATED_WORKER_CONTEXT)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Generates the se.xml files of all folders containing Excel procedures.')
+    ap.add_argument('-i', '--excel_folder', default='Excel', help='folder containing the Excel procedures')
+    ap.add_argument('-o', '--output_folder', default='generated_MATIS_Files', help='folder for the generated se.xml files')
+    ap.add_argument('--output_archive', metavar='ZIP', help='write the se.xml files into this zip archive with a manifest of their hashes instead of the output folder')
+    ap.add_argument('-q', '--quiet', action='store_true', help='do not print progress')
+    ap.add_argument('--cache_folder', help='conversion cache (see Conversion_cache.py), can be shared between machines: unchanged workbooks are not read again')
+    ap.add_argument('--cache_size', type=float, help='size limit of the conversion cache in MB, least recently used results are deleted (default: 1024)')
+    ap.add_argument('--isolate', action='store_true', help='read each workbook in an isolated worker process, failing workbooks are reported and do not stop the conversion')
+    ap.add_argument('-j', '--jobs', type=int, help='number of processes for --isolate (default: all processors)')
+    ap.add_argument('--timeout', type=float, metavar='SECONDS', help='time budget per workbook, the worker of a workbook taking longer is killed (implies --isolate)')
+    ap.add_argument('--memory_budget', type=float, metavar='MB', help='memory (address space) budget per worker process, POSIX only (implies --isolate)')
+    ap.add_argument('--error_report', metavar='FILE', help='write the failed workbooks as json into this file')
+    ap.add_argument('--shard', metavar='i/n', help='only convert the folders of shard i of n and write the manifest of the shard (see Conversion_shards.py)')
+    args = vars(ap.parse_args(argv))
+    shard = None
+    if args['shard']:
+        try:
+            shard = conversion_shards.parse_shard(args['shard'])
+        except ValueError as error:
+            ap.error(str(error))
+    ctx = SEConversionContext(excel_folder=args['excel_folder'], output_folder=args['output_folder'], verbose=not args['quiet'],
+                              cache=conversion_cache.ConversionCache(args['cache_folder'], args['cache_size']) if args['cache_folder'] else None,
+                              output_archive=output_archive.OutputArchive(args['output_archive'], args['output_folder']) if args['output_archive'] else None)
+    ctx.log('Converter started')
+    ctx.log('Creating files...\n(This might take a minute)')
+    budget = None
+    if args['isolate'] or args['timeout'] is not None or args['memory_budget'] is not None:
+        budget = isolated_workers.WorkerBudget(args['jobs'], args['timeout'], args['memory_budget'])
+    try:
+        failures = convert_tree(ctx, budget, shard)
+    except BaseException:
+        if ctx.output_archive is not None:
+            ctx.output_archive.discard()
+        raise
+    if ctx.output_archive is not None:
+        ctx.output_archive.close()
+    if shard is not None:
+        write_shard_manifest(ctx, shard, args['output_archive'])
+    if ctx.cache is not None:
+        ctx.cache.evict()
+    if failures:
+        print('{NUMBER} workbook(s) failed, the se.xml files of their folders were not written:'.format(NUMBER=len(failures)))
+        for workbook, code, message in failures:
+            print('{WORKBOOK}: {CODE}: {MESSAGE}'.format(WORKBOOK=workbook, CODE=code, MESSAGE=message))
+    if args['error_report']:
+        isolated_workers.write_error_report(args['error_report'], failures)
+    ctx.log('Files created. Have fun! :)')
+    return isolated_workers.get_exit_code(code for workbook, code, message in failures)
 
 
 ##############################
@@ -164,58 +380,11 @@ _OPERATIONS_COLUMN = 'B'
 _ID_COLUMN = 'C'
 _DESCRIPTION_COLUMN = "D"
 _TYPE_COLUMN = "E"
+# name, description and arguments (list of (ID, description, type)) of one procedure
+ProcedureModel = collections.namedtuple('ProcedureModel', ['name', 'description', 'arguments'])
+_DEFAULT_CONTEXT = SEConversionContext()
+_ISOLATED_WORKER_CONTEXT = None
 ##############################
-print('Converter started')
-rootdir = os.getcwd()
-list_of_excelsheet_paths =[]
-files_with_path = []
-paths_without_file = []
-for subdir, dirs, files in os.walk(rootdir + '\\Excel\\'):
-    for file in files:
-        #print os.path.join(subdir, file)
-        filepath = subdir + os.sep + file
-        if filepath.endswith(".xlsx") and '\\old\\' not in filepath and '~' not in filepath:
-            files_with_path.append(str(filepath))
-            try:
-                paths_without_file.append(str(filepath).rsplit('\\', 1)[0])
-            except:
-                print('', end='')
-            list_of_excelsheet_paths.append(str(filepath).split('\\Excel\\', 1)[1])
-# print(paths_without_file)
-# print(files_with_path)
-# print(list_of_excelsheet_paths)
-
-names_of_current_level = []
-the_end = ['not empty', 'even less empty']
-#list_of_excelsheet_paths.append('asdf.xlsx')
-folder_level = 0
-counter_nth_file = 0
-flag_xml_new_file = 1
-past_last_folder_name = ''
-# for file_with_path in files_with_path:
-#     get_argument_name_and_description(file_with_path)
-print('Creating files...\n(This might take a minute)')
-while len(the_end) > 0:
-    the_end = []
-    procedure_name, procedure_description = 'None', 'None'
-    for file_with_half_path, file_with_complete_path in zip(list_of_excelsheet_paths, files_with_path):
-        #print(file_with_half_path)
-        #print(file_with_complete_path)
-        try:
-            names_of_current_level = file_with_half_path.split('\\')[folder_level]
-            the_end.append(names_of_current_level)
-        except:
-            continue
-        if ('.xlsx' in names_of_current_level):
-            #print(names_of_current_level)
-            #print('asfd' + str(folder_level))
-            current_last_folder_name = get_last_folder_name(file_with_half_path)
-            flag_xml_new_file, flag_end_of_xml_file = get_flags(current_last_folder_name, past_last_folder_name, list_of_excelsheet_paths, counter_nth_file)
-            procedure_name, procedure_description = get_procedure_name_and_description(names_of_current_level, folder_level)
-            procedure_name = str(procedure_name).replace('-', '_')
-            arguments_ID, arguments_DESCRIPTION, arguments_TYPE = get_argument_name_and_description(file_with_complete_path)
-            write_seXml_files(current_last_folder_name, paths_without_file, procedure_name, procedure_description, flag_xml_new_file, flag_end_of_xml_file, arguments_ID, arguments_DESCRIPTION, arguments_TYPE, counter_nth_file)
-            past_last_folder_name = current_last_folder_name
-            counter_nth_file += 1
-    folder_level += 1
-print('Files created. Have fun! :)')
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+'''
+Date: 19/10/2026
+
+DESCRIPTION:
+This script generates synthetic Excel procedures following the Standard defined by OPS-SAT and synthetic .dyn files.
+The generated data contains no mission information and is used to measure and compare the converters without the
+confidential procedure tree.
+Output:
+A workspace folder containing an "Excel" folder with procedures in the usual <category>\\<subsystem> folder structure
+and a "MISC" folder with .dyn files.
+Each workbook has a "Front Page" and a "Procedure" sheet. The Procedure sheet contains a parameter block, divider rows
+(_COLOR_DIVIDING_OPERATION_STEPS) and a mix of SEND, CHECK TM, IF, SELECT CASE, CALL PROCEDURE, WAIT and
+DECLARE VARIABLES blocks.
+
+DISCLAIMER: It is just a tool to make life easier. The generated procedures are syntactically plausible, not
+            meaningful.
+'''
+
+import openpyxl as op
+from openpyxl.styles import PatternFill
+import argparse
+import os
+import random
+
+
+def generate_front_page(ws_front_page, procedure_ID, procedure_title):
+    '''
+    Writes a synthetic front page into the given work sheet.
+    :param ws_front_page, procedure_ID, procedure_title:
+    :return :
+    '''
+    ws_front_page['A1'] = 'OPS-SAT PROCEDURE'
+    ws_front_page['B2'] = 'Procedure'
+    ws_front_page['C3'] = 'Title:'
+    ws_front_page['D3'] = procedure_title
+    ws_front_page['C4'] = 'ID:'
+    ws_front_page['D4'] = procedure_ID
+    ws_front_page['C5'] = 'Version:'
+    ws_front_page['D5'] = 'v1'
+    ws_front_page['C6'] = 'Author:'
+    ws_front_page['D6'] = 'Synthetic generator'
+    ws_front_page['C7'] = 'Description:'
+    ws_front_page['D7'] = 'Synthetic procedure ' + procedure_ID + '\nused for benchmarking the converters'
+    ws_front_page['E8'] = 'End of front page'
+    return
+
+
+def get_parameter_block(rng, number_of_arguments):
+    '''
+    Returns the rows of the parameter block and the names of the arguments.
+    :param rng, number_of_arguments:
+    :return rows, argument_names:
+    '''
+    rows, argument_names = [{'B': 'Parameters:'}], []
+    for argument_number in range(number_of_arguments):
+        argument_name = 'ARG_{NUMBER}'.format(NUMBER=argument_number + 1)
+        argument_names.append(argument_name)
+        row = {'C': '$' + argument_name, 'D': 'Synthetic argument & <{NUMBER}>'.format(NUMBER=argument_number + 1),
+               'E': rng.choice(_TYPES)}
+        if argument_number == 0:
+            rows[0].update(row)
+        else:
+            rows.append(row)
+    return rows, argument_names
+
+
+def get_TC_ID(rng):
+    return rng.choice(_TC_PREFIXES) + '{NUMBER:03d}'.format(NUMBER=rng.randint(0, 999))
+
+
+def get_TM_ID(rng):
+    return rng.choice(_TM_PREFIXES) + '{NUMBER:04d}'.format(NUMBER=rng.randint(0, 9999))
+
+
+def get_TM_value(rng, TYPE):
+    '''
+    Returns a RAW value for a CHECK TM row, mixing fixed values, range checks, enumerations,
+    size comparisons and assignments.
+    :param rng, TYPE:
+    :return RAW:
+    '''
+    if TYPE == 'Boolean':
+        return rng.choice([1, 0])
+    kind = rng.random()
+    if kind < 0.35:
+        return rng.randint(0, 100)
+    elif kind < 0.55:
+        return '[{MIN}, {MAX}]'.format(MIN=rng.randint(0, 10), MAX=rng.randint(20, 100))
+    elif kind < 0.75:
+        return '{' + ', '.join(str(value) for value in rng.sample(range(10), 3)) + '}'
+    elif kind < 0.9:
+        return '> {VALUE}'.format(VALUE=rng.randint(0, 10))
+    return '@$VAL'
+
+
+def block_SEND(rng):
+    rows = [{'B': 'SEND', 'C': get_TC_ID(rng), 'D': 'Synthetic telecommand'}]
+    for argument_number in range(rng.randint(0, 4)):
+        TYPE = rng.choice(['U8', 'U16', 'S16', 'Float', 'Boolean'])
+        rows.append({'C': 'TC_ARG_{NUMBER}'.format(NUMBER=argument_number + 1), 'D': 'Synthetic TC argument',
+                     'E': TYPE, 'F': rng.randint(0, 1) if TYPE == 'Boolean' else rng.randint(0, 255)})
+    if len(rows) == 1 and rng.random() < 0.3:
+        rows.append({'D': 'DYNAMIC PTV OVERRIDE'})
+        rows.append({'D': 'EXECUTION TIME', 'F': '$NOW'})
+    rows.append({})
+    return rows
+
+
+def block_CHECKTM(rng):
+    rows = []
+    for TM_number in range(rng.randint(1, 5)):
+        TYPE = rng.choice(['U8', 'U16', 'U32', 'S16', 'Float', 'Boolean'])
+        row = {'C': get_TM_ID(rng), 'D': 'Synthetic telemetry', 'E': TYPE, 'F': get_TM_value(rng, TYPE)}
+        if TM_number == 0:
+            row['B'] = 'CHECK TM'
+        rows.append(row)
+    rows.append({})
+    return rows
+
+
+def block_IF(rng):
+    rows = [{'B': 'IF $MODE == {VALUE} THEN'.format(VALUE=rng.randint(0, 3))}]
+    rows.extend(block_CHECKTM(rng))
+    rows.append({'B': 'ELSE'})
+    rows.extend(block_SEND(rng))
+    rows.append({'B': 'END IF'})
+    return rows
+
+
+def block_CASE(rng):
+    rows = [{'B': 'SELECT CASE $MODE'}]
+    for value in range(rng.randint(1, 3)):
+        rows.append({'B': 'CASE: {VALUE}'.format(VALUE=value)})
+        rows.append({'B': '$COUNTER = {VALUE}'.format(VALUE=value)})
+    rows.append({'B': 'CASE ELSE:'})
+    rows.append({'B': '$COUNTER = 0'})
+    rows.append({'B': 'END CASE'})
+    return rows
+
+
+def block_CALL_PROCEDURE(rng):
+    rows = [{'B': 'CALL PROCEDURE'},
+            {'B': 'ID: ' + rng.choice(_PROCEDURE_IDS)},
+            {'B': 'TITLE: Synthetic called procedure'},
+            {'B': 'REASON: Benchmarking nested procedure calls'},
+            {'B': 'PARAMETERS:'}]
+    for argument_number in range(rng.randint(0, 2)):
+        rows.append({'B': '{NUMBER}. $ARG_{NUMBER} = {VALUE}'.format(NUMBER=argument_number + 1, VALUE=rng.randint(0, 9))})
+    rows.append({'B': 'THEN RETURN'})
+    return rows
+
+
+def block_WAIT(rng):
+    return [{'B': 'WAIT FOR {SECONDS}s'.format(SECONDS=rng.randint(1, 30))}]
+
+
+def get_operation_topic_rows(rng, number_of_rows):
+    '''
+    Returns a mix of operation blocks of roughly the given number of rows.
+    :param rng, number_of_rows:
+    :return rows:
+    '''
+    rows = [{}]
+    while len(rows) < number_of_rows:
+        rows.extend(rng.choices(_BLOCKS, weights=_BLOCK_WEIGHTS)[0](rng))
+    return rows
+
+
+def generate_procedure_sheet(ws_procedure, rng, number_of_rows, parameter_rows):
+    '''
+    Writes a synthetic procedure into the given work sheet.
+    :param ws_procedure, rng, number_of_rows, parameter_rows:
+    :return :
+    '''
+    divider_fill = PatternFill(fill_type='solid', start_color=_COLOR_DIVIDING_OPERATION_STEPS, end_color=_COLOR_DIVIDING_OPERATION_STEPS)
+    rows = [{'A': 'STEP', 'B': 'OPERATIONS', 'C': 'ID', 'D': 'DESCRIPTION', 'E': 'TYPE', 'F': 'RAW', 'G': 'ENG', 'H': 'UNIT'}]
+    rows.extend(parameter_rows)
+    rows.append({})
+    number_of_topics = max(2, number_of_rows // 40)
+    rows_per_topic = max(1, (number_of_rows - len(rows)) // number_of_topics)
+    divider_rows = []
+    for topic_number in range(number_of_topics):
+        divider_rows.append(len(rows) + 1)
+        if topic_number == 0:
+            rows.append({'A': 1, 'B': 'PREPARATION'})
+            rows.extend([{}, {'B': 'DECLARE VARIABLES', 'C': '$MODE', 'D': 'Mode', 'E': 'U8'},
+                         {'C': '$COUNTER', 'D': 'Counter', 'E': 'U16'}])
+        else:
+            rows.append({'A': topic_number + 1, 'B': 'OPERATION {NUMBER}'.format(NUMBER=topic_number)})
+        rows.extend(get_operation_topic_rows(rng, rows_per_topic))
+    divider_rows.append(len(rows) + 1)
+    rows.append({'A': number_of_topics + 1, 'B': 'END OF PROCEDURE'})
+    for row_number, row in enumerate(rows, 1):
+        for column, value in row.items():
+            ws_procedure[column + str(row_number)] = value
+    for row_number in divider_rows:
+        for column in 'ABCDEFGHIJKLMNOPQ':
+            ws_procedure[column + str(row_number)].fill = divider_fill
+    return
+
+
+def generate_workbook(file_path, rng, procedure_ID, number_of_rows):
+    '''
+    Generates one synthetic Excel procedure.
+    :param file_path, rng, procedure_ID, number_of_rows:
+    :return :
+    '''
+    wb = op.Workbook()
+    ws_front_page = wb.active
+    ws_front_page.title = 'Front Page'
+    generate_front_page(ws_front_page, procedure_ID, 'Synthetic procedure ' + procedure_ID)
+    parameter_rows, _ = get_parameter_block(rng, rng.randint(0, 4))
+    generate_procedure_sheet(wb.create_sheet('Procedure'), rng, number_of_rows, parameter_rows)
+    wb.save(file_path)
+    wb.close()
+    return
+
+
+def generate_excel_tree(workspace, number_of_workbooks, rows_per_workbook, number_of_folders, seed=0):
+    '''
+    Generates an "Excel" folder with synthetic procedures inside the workspace.
+    Workbooks are distributed round robin over <number_of_folders> subsystem folders.
+    :param workspace, number_of_workbooks, rows_per_workbook, number_of_folders, seed:
+    :return list_of_workbook_paths:
+    '''
+    rng = random.Random(seed)
+    list_of_workbook_paths = []
+    subsystems = sorted(_SUBSYSTEMS)[:max(1, number_of_folders)]
+    for workbook_number in range(number_of_workbooks):
+        subsystem = subsystems[workbook_number % len(subsystems)]
+        procedure_ID = 'R-{SUBSYSTEM}-N{NUMBER:03d}'.format(SUBSYSTEM=subsystem, NUMBER=100 + workbook_number)
+        directory = os.path.join(workspace, 'Excel', 'Routine_nominal', subsystem)
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(directory, '{ID}_Synthetic_procedure_{NUMBER}.xlsx'.format(ID=procedure_ID, NUMBER=workbook_number))
+        generate_workbook(file_path, rng, procedure_ID, rows_per_workbook)
+        list_of_workbook_paths.append(file_path)
+    return list_of_workbook_paths
+
+
+def generate_dyn_file(file_path, number_of_lines, seed=0):
+    '''
+    Generates a synthetic MISCcontext.dyn file with commented parameter blocks.
+    :param file_path, number_of_lines, seed:
+    :return :
+    '''
+    rng = random.Random(seed)
+    fo = open(file_path, 'w')
+    fo.write('# Synthetic MISC context\n')
+    line_number = 1
+    while line_number < number_of_lines:
+        fo.write('####################################################\n')
+        fo.write('# {DESCRIPTION}\n'.format(DESCRIPTION='Synthetic MISC parameter used for benchmarking'))
+        fo.write('# ==========\n' if rng.random() < 0.1 else '# unit: none\n')
+        fo.write('MISC_{NUMBER:06d}\t{VALUE}\t0\n'.format(NUMBER=line_number, VALUE=rng.randint(0, 1000)))
+        line_number += 4
+    fo.close()
+    return
+
+
+##############################
+# Definitions of global variables
+_COLOR_DIVIDING_OPERATION_STEPS = 'FF92CDDC'
+_TYPES = ['U8', 'U16', 'U32', 'S16', 'S32', 'Float', 'Boolean', 'Enum', 'Char Str', 'Abs Time', 'Del Time']
+_TC_PREFIXES = ['M4A0', 'M4B1', 'M040', 'CFDPTC0', 'G2A0101s']
+_TM_PREFIXES = ['EPS', 'ADCS', 'CCS', 'GPS', 'UHF', 'SBD', 'TIME', 'CAM']
+_SUBSYSTEMS = ['ADC', 'CAM', 'CCS', 'DHS', 'EPS', 'GPS', 'OBC', 'SDR', 'SEP', 'UHF']
+_PROCEDURE_IDS = ['R-EPS-N110', 'R-ADC-N210', 'R-OBC-N150', 'LEOP-SYS-N200', 'R-UHF-C110']
+_BLOCKS = [block_SEND, block_CHECKTM, block_IF, block_CASE, block_CALL_PROCEDURE, block_WAIT]
+_BLOCK_WEIGHTS = [30, 35, 8, 5, 7, 15]
+##############################
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-o', '--output_folder', required=True, help='workspace folder to generate the "Excel" and "MISC" folders in')
+    ap.add_argument('--workbooks', type=int, default=20, help='number of generated Excel procedures')
+    ap.add_argument('--rows', type=int, default=200, help='approximate number of rows per Procedure sheet')
+    ap.add_argument('--folders', type=int, default=4, help='number of subsystem folders (and therefore se.xml files)')
+    ap.add_argument('--dyn-files', type=int, default=1, help='number of generated .dyn files')
+    ap.add_argument('--dyn-lines', type=int, default=1000, help='number of lines per .dyn file')
+    ap.add_argument('--seed', type=int, default=0, help='seed for reproducible output')
+    args = vars(ap.parse_args())
+    generate_excel_tree(args['output_folder'], args['workbooks'], args['rows'], args['folders'], args['seed'])
+    os.makedirs(os.path.join(args['output_folder'], 'MISC'), exist_ok=True)
+    for dyn_number in range(args['dyn_files']):
+        generate_dyn_file(os.path.join(args['output_folder'], 'MISC', 'MISCcontext{NUMBER}.dyn'.format(NUMBER=dyn_number)), args['dyn_lines'], args['seed'] + dyn_number)
+    print('Synthetic workspace created in ' + args['output_folder'])